@@ -0,0 +1,175 @@
+"""
+Optional Apache Arrow and Parquet input and output of close approach data, requires pyarrow.
+
+Arrow IPC (.arrow, .feather) and Parquet (.parquet) files with the columns of the NASA close approach csv export are
+read with column projection: only the columns read by NearEarthObject and OrbitPath are loaded from the file. Search
+results are written column-wise, in record batches of the fields of NEOWriter.to_dict.
+"""
+
+import pathlib
+
+from exceptions import UnsupportedFeature
+from models import LOADED_COLUMNS, Aggregate, NearEarthObject
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.ipc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+# File extensions of the Arrow IPC and Parquet files
+ArrowExtensions = ('.arrow', '.feather')
+ParquetExtensions = ('.parquet',)
+
+# Columns read from the files, in the order of the NASA csv export
+LoadedColumns = list(LOADED_COLUMNS)
+
+# Number of results converted to a record batch at once when writing
+BatchRows = 65536
+
+
+def require_pyarrow():
+    """
+    :return: None, raises UnsupportedFeature if pyarrow is not installed
+    """
+    if pa is None:
+        raise UnsupportedFeature('Arrow and Parquet files require pyarrow, please install pyarrow')
+
+
+def is_arrow_file(filename):
+    """
+    :param filename: str representing the pathway of a data file
+    :return: bool representing if the file is an Arrow IPC or Parquet file, from its extension
+    """
+    return pathlib.Path(str(filename)).suffix.lower() in ArrowExtensions + ParquetExtensions
+
+
+def read_table(filename, columns=LoadedColumns):
+    """
+    Reads the projected columns of an Arrow IPC or Parquet file. Parquet only decodes the requested column chunks,
+    and Arrow IPC files are memory-mapped so that the other columns are never read.
+
+    :param filename: str representing the pathway of the file
+    :param columns: list of the names of the columns to read
+    :return: pyarrow.Table of the columns
+    """
+    require_pyarrow()
+    if pathlib.Path(str(filename)).suffix.lower() in ParquetExtensions:
+        return pq.read_table(filename, columns=columns)
+    # The memory map stays open for as long as the buffers of the table are referenced
+    return pyarrow.ipc.open_file(pa.memory_map(str(filename))).read_all().select(columns)
+
+
+def iter_entries(filename):
+    """
+    Reads the close approaches of an Arrow IPC or Parquet file as the entries read from the csv export: dicts of the
+    loaded columns, with the values accepted by NearEarthObject and OrbitPath.
+
+    :param filename: str representing the pathway of the file
+    :return: generator of dict of attributes about a given close approach
+    """
+    for values in iter_rows(filename):
+        yield dict(zip(LoadedColumns, values))
+
+
+def iter_rows(filename):
+    """
+    :param filename: str representing the pathway of the file
+    :return: generator of tuples of the values of the LoadedColumns of each close approach
+    """
+    table = read_table(filename)
+    for name in ('id', 'name', 'orbiting_body', 'close_approach_date'):
+        # Ids stored as integers and dates stored as date32 are read as their csv strings, YYYY-MM-DD for dates
+        column = table.column(name)
+        if pa.types.is_timestamp(column.type):
+            column = pc.cast(column, pa.date32())
+        if not pa.types.is_string(column.type):
+            table = table.set_column(table.schema.get_field_index(name), name, pc.cast(column, pa.string()))
+
+    for batch in table.to_batches():
+        yield from zip(*[batch.column(name).to_pylist() for name in LoadedColumns])
+
+
+def result_schema(output_type):
+    """
+    :param output_type: str representing the type of the results, NearEarthObject, OrbitPath or Aggregate
+    :return: pyarrow.Schema of the written results, the fields of NEOWriter.to_dict
+    """
+    require_pyarrow()
+    if output_type == 'Aggregate':
+        return pa.schema([
+            ('group', pa.string()),
+            ('approaches', pa.int64()),
+            ('neos', pa.int64()),
+            ('hazardous_neos', pa.int64()),
+            ('hazardous_share', pa.float64()),
+            ('min_distance_km', pa.float64()),
+        ])
+    orbit_fields = [
+        ('neo_id', pa.string()),
+        ('neo_name', pa.string()),
+        ('orbiting_body', pa.string()),
+        ('close_approach_date', pa.string()),
+        ('miss_distance_kilometers', pa.float64()),
+        ('miss_distance_miles', pa.float64()),
+    ]
+    if output_type == 'OrbitPath':
+        return pa.schema(orbit_fields)
+    return pa.schema([
+        ('id', pa.string()),
+        ('name', pa.string()),
+        ('diameter_min_km', pa.float64()),
+        ('diameter_max_km', pa.float64()),
+        ('is_potentially_hazardous_asteroid', pa.bool_()),
+        ('orbits', pa.list_(pa.struct(orbit_fields))),
+    ])
+
+
+def record_batch(rows, schema, to_dict):
+    """
+    :param rows: list of NearEarthObject, OrbitPath or Aggregate results
+    :param schema: pyarrow.Schema of the results
+    :param to_dict: function of a result returning the dict of its fields, used for the nested orbits
+    :return: pyarrow.RecordBatch of the results, built column by column
+    """
+    arrays = []
+    for field in schema:
+        if field.name == 'orbits':
+            values = [list(map(to_dict, row.orbits)) for row in rows]
+        else:
+            values = [getattr(row, field.name) for row in rows]
+        arrays.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def write_results(output, format, rows, first_row, to_dict):
+    """
+    Writes results column-wise to an Arrow IPC or Parquet file, one record batch per BatchRows results.
+
+    :param output: binary file object to write to
+    :param format: str representing the OutputFormat, arrow or parquet
+    :param rows: iterator of the NearEarthObject, OrbitPath or Aggregate results, starting with first_row
+    :param first_row: NearEarthObject, OrbitPath or Aggregate, the first of the results
+    :param to_dict: function of a result returning the dict of its fields, used for the nested orbits
+    :return: None
+    """
+    require_pyarrow()
+    if isinstance(first_row, Aggregate):
+        schema = result_schema('Aggregate')
+    else:
+        schema = result_schema('NearEarthObject' if isinstance(first_row, NearEarthObject) else 'OrbitPath')
+    if format == 'parquet':
+        writer = pq.ParquetWriter(output, schema)
+    else:
+        writer = pyarrow.ipc.new_file(output, schema)
+    with writer:
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == BatchRows:
+                writer.write_batch(record_batch(batch, schema, to_dict))
+                batch = []
+        if batch:
+            writer.write_batch(record_batch(batch, schema, to_dict))
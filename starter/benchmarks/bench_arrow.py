@@ -0,0 +1,72 @@
+"""
+Benchmark of the csv, Arrow IPC and Parquet inputs, reporting the file size, the time to read the columns used by the
+models and the NEODatabase.load_data time of the same close approach rows in each format. Requires pyarrow.
+
+The Arrow IPC and Parquet files hold every column of the csv export, as converted by the analytics stack, so the
+projection of the loaded columns is part of the measure.
+
+Run from the `/starter` directory with: python -m benchmarks.bench_arrow [--rows 1000000]
+"""
+
+import argparse
+import csv
+import os
+import tempfile
+import time
+
+import arrow_io
+from benchmarks.synthetic import write_neo_csv
+from database import NEODatabase
+
+APPROACHES_PER_NEO = 10
+
+
+def read_columns(filename):
+    """
+    :param filename: str representing the pathway of the data file
+    :return: int representing the number of rows read, reading the loaded columns only
+    """
+    if arrow_io.is_arrow_file(filename):
+        return arrow_io.read_table(filename).num_rows
+    with open(filename, 'r') as neo_data_file:
+        return sum(1 for _ in csv.DictReader(neo_data_file))
+
+
+def timed(function, *args):
+    """
+    :return: float representing the wall time in seconds of function(*args)
+    """
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='csv, Arrow IPC and Parquet input benchmark')
+    parser.add_argument('--rows', type=int, default=1000000, help='Number of close approach rows')
+    args = parser.parse_args()
+    arrow_io.require_pyarrow()
+    from pyarrow import csv as arrow_csv, feather, parquet
+
+    with tempfile.TemporaryDirectory() as directory:
+        csv_filename = os.path.join(directory, 'neo_data.csv')
+        write_neo_csv(csv_filename, neo_count=max(args.rows // APPROACHES_PER_NEO, 1),
+                      approaches_per_neo=APPROACHES_PER_NEO)
+        table = arrow_csv.read_csv(csv_filename)
+        rows = table.num_rows
+        filenames = {
+            'csv': csv_filename,
+            'arrow': os.path.join(directory, 'neo_data.arrow'),
+            'parquet': os.path.join(directory, 'neo_data.parquet'),
+        }
+        feather.write_feather(table, filenames['arrow'])
+        parquet.write_table(table, filenames['parquet'])
+        del table
+
+        print(f'{rows} rows')
+        print(f'{"format":>8} {"size (MB)":>10} {"read (s)":>9} {"load (s)":>9} {"rows/sec":>10}')
+        for name, filename in filenames.items():
+            read_seconds = timed(read_columns, filename)
+            load_seconds = timed(NEODatabase(filename=filename).load_data)
+            print(f'{name:>8} {os.path.getsize(filename) / 1e6:>10.1f} {read_seconds:>9.2f} {load_seconds:>9.2f} '
+                  f'{rows / load_seconds:>10,.0f}')
@@ -0,0 +1,73 @@
+"""
+Benchmark of NEOSearcher.get_objects_batch against one NEOSearcher.get_objects call per query, on a report of per day
+windows crossed with diameter and distance thresholds, as the nightly report runs. Both run without result cache, and
+the batch results are checked to be the results of the single queries.
+
+Run from the `/starter` directory with: python -m benchmarks.bench_batch [--rows 1000000] [--days 40]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+
+from benchmarks.synthetic import write_neo_csv
+from database import NEODatabase
+from search import Query, NEOSearcher
+
+APPROACHES_PER_NEO = 10
+
+THRESHOLDS = [
+    [],
+    ['diameter:>:0.05'],
+    ['diameter:>:0.2'],
+    ['distance:<:30000000'],
+    ['diameter:>:0.05', 'distance:<:30000000'],
+]
+
+
+def report_queries(days):
+    """
+    :param days: int representing the number of daily windows of the report
+    :return: list of the Query.Selectors of the report
+    """
+    queries = []
+    for day in range(days):
+        close_approach_date = (date(2020, 1, 1) + timedelta(days=day)).isoformat()
+        for filters in THRESHOLDS:
+            for return_object in ['NEO', 'Path']:
+                queries.append(Query(date=close_approach_date, return_object=return_object,
+                                     filter=filters or None).build_query())
+    return queries
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Batch query benchmark')
+    parser.add_argument('--rows', type=int, default=1000000, help='Number of close approach rows')
+    parser.add_argument('--days', type=int, default=20, help='Number of daily windows of the report')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, 'neo_data.csv')
+        write_neo_csv(filename, neo_count=max(args.rows // APPROACHES_PER_NEO, 1),
+                      approaches_per_neo=APPROACHES_PER_NEO)
+        db = NEODatabase(filename=filename, snapshot=False)
+        db.load_data()
+
+    queries = report_queries(args.days)
+    searcher = NEOSearcher(db, cache_entries=0)
+
+    start = time.perf_counter()
+    single_results = [searcher.get_objects(query) for query in queries]
+    single_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch_results = searcher.get_objects_batch(queries)
+    batch_seconds = time.perf_counter() - start
+
+    assert [list(map(str, results)) for results in single_results] == \
+        [list(map(str, results)) for results in batch_results]
+    print(f'{len(queries)} queries, {sum(map(len, batch_results))} results')
+    print(f'{"single queries":>16} {single_seconds:>8.3f} s')
+    print(f'{"batch":>16} {batch_seconds:>8.3f} s {single_seconds / batch_seconds:>6.1f}x')
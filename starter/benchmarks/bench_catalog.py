@@ -0,0 +1,56 @@
+"""
+Benchmark of a query over a few days of a multi-year dataset, loading the whole csv file with NEODatabase.load_data
+or only the partitions of a date-partitioned catalog overlapping the query window, first from disk and then from the
+partition cache of the catalog.
+
+Run from the `/starter` directory with: python -m benchmarks.bench_catalog [--rows 1000000] [--years 10]
+"""
+
+import argparse
+import gc
+import os
+import tempfile
+import time
+
+from benchmarks.synthetic import write_neo_csv
+from catalog import Catalog, build_catalog
+from database import NEODatabase
+from search import Query, NEOSearcher
+
+APPROACHES_PER_NEO = 10
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Date-partitioned catalog benchmark')
+    parser.add_argument('--rows', type=int, default=1000000, help='Number of close approach rows')
+    parser.add_argument('--years', type=int, default=10, help='Number of years of close approaches')
+    parser.add_argument('--granularity', choices=['month', 'year'], default='month',
+                        help='Period of the close approach dates of each partition')
+    args = parser.parse_args()
+
+    query = Query(start_date='2020-03-01', end_date='2020-03-07', return_object='Path').build_query()
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, 'neo_data.csv')
+        write_neo_csv(filename, neo_count=max(args.rows // APPROACHES_PER_NEO, 1),
+                      approaches_per_neo=APPROACHES_PER_NEO, start_date='2015-01-01', days=365 * args.years)
+        start = time.perf_counter()
+        partitions = build_catalog(filename, os.path.join(directory, 'catalog'), args.granularity)
+        print(f'{args.rows} rows, {len(partitions)} partitions built in {time.perf_counter() - start:.2f} s')
+
+        print(f'{"source":>16} {"load + query (s)":>17} {"results":>8}')
+        start = time.perf_counter()
+        db = NEODatabase(filename=filename)
+        db.load_data()
+        results = NEOSearcher(db).get_objects(query)
+        print(f'{"whole csv":>16} {time.perf_counter() - start:>17.3f} {len(results):>8}')
+        del db
+
+        catalog = Catalog(os.path.join(directory, 'catalog'))
+        del results
+        for name in ('catalog', 'catalog (cached)'):
+            # Free the previous results first, so that their collection is not part of the measure
+            gc.collect()
+            start = time.perf_counter()
+            results = NEOSearcher(catalog.database(query.date_search)).get_objects(query)
+            print(f'{name:>16} {time.perf_counter() - start:>17.3f} {len(results):>8}')
+        print(catalog.stats())
@@ -0,0 +1,70 @@
+"""
+Benchmark for the date search of NEOSearcher.apply_date_filter.
+
+The database is grown from 10k to 10M close approach rows while the query window is kept the same, so the query
+latency is expected to stay flat as the dataset grows.
+
+Run from the `/starter` directory with: python -m benchmarks.bench_date_index [--sizes 10000 100000 ...]
+"""
+
+import argparse
+import timeit
+from datetime import date, timedelta
+
+from database import NEODatabase
+from models import NearEarthObject
+from search import Query, NEOSearcher
+
+ROWS_PER_DAY = 50
+FIRST_DATE = date(1900, 1, 1)
+
+
+def build_database(rows):
+    """
+    Builds a NEODatabase of `rows` close approach rows, spread over consecutive days with ROWS_PER_DAY rows per day.
+
+    :param rows: int representing the number of close approach rows in the database
+    :return: NEODatabase
+    """
+    neos = [NearEarthObject(**{
+        "id": str(index),
+        "name": f'({index} BENCH)',
+        "estimated_diameter_min_kilometers": 0.1,
+        "estimated_diameter_max_kilometers": 0.2,
+        "is_potentially_hazardous_asteroid": "False",
+    }) for index in range(ROWS_PER_DAY)]
+
+    db = NEODatabase(filename=None)
+    for day in range(max(rows // ROWS_PER_DAY, 1)):
+        db.date_neo_db[(FIRST_DATE + timedelta(days=day)).isoformat()] = neos
+    db.build_date_index()
+    return db
+
+
+def time_query(db, date_search, repeat):
+    """
+    :param db: NEODatabase to search
+    :param date_search: list with the Query.DateSearch to run
+    :param repeat: int representing the number of timed runs
+    :return: float representing the best query time in microseconds
+    """
+    run = lambda: NEOSearcher.apply_date_filter(db.date_neo_db, date_search, db.sorted_dates)
+    return min(timeit.repeat(run, number=1, repeat=repeat)) * 1e6
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Date index search benchmark')
+    parser.add_argument('--sizes', nargs='+', type=int, default=[10000, 100000, 1000000, 10000000],
+                        help='Number of close approach rows in each benchmarked database')
+    parser.add_argument('--repeat', type=int, default=50, help='Number of timed runs per query')
+    args = parser.parse_args()
+
+    print(f'{"rows":>10} {"dates":>8} {"equals (us)":>12} {"between 7d (us)":>16}')
+    for rows in args.sizes:
+        db = build_database(rows)
+        middle = date.fromisoformat(db.sorted_dates[len(db.sorted_dates) // 2])
+        equals = Query(date=middle.isoformat()).build_query().date_search
+        between = Query(start_date=middle.isoformat(),
+                        end_date=(middle + timedelta(days=6)).isoformat()).build_query().date_search
+        print(f'{rows:>10} {len(db.sorted_dates):>8} {time_query(db, equals, args.repeat):>12.1f} '
+              f'{time_query(db, between, args.repeat):>16.1f}')
@@ -0,0 +1,88 @@
+"""
+Micro-benchmark of the filters, comparing the compiled and combined predicates of Filter with the previous chain of
+Filter.apply calls, which converted the filter value on every row and copied the results once per filter.
+
+Run from the `/starter` directory with: python -m benchmarks.bench_filters [--neos 20000] [--approaches 10] [--repeat 5]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.synthetic import write_neo_csv
+from database import NEODatabase
+from search import Filter
+
+FILTERS = ["diameter:>:0.042", "is_hazardous:=:False", "distance:>:10000000"]
+
+
+def legacy_apply(_filter, results):
+    """
+    Filter.apply before the filters were compiled: one list per filter, and the value converted on every row.
+
+    :param _filter: Filter to apply
+    :param results: list of Near Earth Object results
+    :return: filtered list of Near Earth Object results
+    """
+    if _filter.field == "diameter":
+        return list(filter(lambda n: _filter.operation(n.diameter_min_km, float(_filter.value)), results))
+    elif _filter.field == "is_hazardous":
+        return list(filter(lambda n: _filter.operation(str(n.is_potentially_hazardous_asteroid).lower(),
+                                                       str(_filter.value).lower()), results))
+    filtered = []
+    for neo in results:
+        orbits = list(filter(lambda orbit: _filter.operation(orbit.miss_distance_kilometers, float(_filter.value)),
+                             neo.orbits))
+        if orbits:
+            filtered.append(neo.with_orbits(orbits))
+    return filtered
+
+
+def legacy_chain(filters, neos):
+    for _filter in [*[f for f in filters if f.object == "NEO"], *[f for f in filters if f.object == "Path"]]:
+        neos = legacy_apply(_filter, neos)
+    return neos
+
+
+def compiled(filters, neos):
+    return list(Filter.iter_apply_all(filters, neos))
+
+
+def best_time(function, repeat, *args):
+    """
+    :return: tuple of the best wall time in seconds over repeat runs and the result of the last run
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compiled filter predicates micro-benchmark')
+    parser.add_argument('--neos', type=int, default=20000, help='Number of unique Near Earth Objects')
+    parser.add_argument('--approaches', type=int, default=10, help='Average number of close approaches per NEO')
+    parser.add_argument('--repeat', type=int, default=5, help='Number of runs, the best run is reported')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, 'neo_data.csv')
+        write_neo_csv(filename, neo_count=args.neos, approaches_per_neo=args.approaches)
+        db = NEODatabase(filename=filename)
+        db.load_data()
+    neos = list(db.neo_object_db.values())
+
+    print(f'{len(neos)} NEOs, filters: {" ".join(FILTERS)}')
+    print(f'{"filters":>10} {"legacy (ms)":>12} {"compiled (ms)":>14} {"speedup":>8}')
+    for count in range(1, len(FILTERS) + 1):
+        filters = Filter.create_filter_options(FILTERS[:count])
+        filters = filters["NEO"] + filters["Path"]
+        legacy_time, legacy_results = best_time(legacy_chain, args.repeat, filters, neos)
+        compiled_time, compiled_results = best_time(compiled, args.repeat, filters, neos)
+        assert list(map(str, legacy_results)) == list(map(str, compiled_results))
+        print(f'{count:>10} {legacy_time * 1000:>12.1f} {compiled_time * 1000:>14.1f} '
+              f'{legacy_time / compiled_time:>7.1f}x')
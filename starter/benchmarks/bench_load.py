@@ -0,0 +1,63 @@
+"""
+Benchmark for NEODatabase.load_data, reporting the ingest rate in rows/sec and the peak resident memory.
+
+Each size is loaded in a fresh Python process, so the peak RSS of one load is not hidden by an earlier, larger load.
+
+Run from the `/starter` directory with: python -m benchmarks.bench_load [--sizes 10000 100000 ...]
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic import write_neo_csv
+from database import NEODatabase
+
+APPROACHES_PER_NEO = 10
+
+
+def load(filename):
+    """
+    Loads filename into a NEODatabase and measures the load.
+
+    :param filename: str representing the pathway of the csv file to load
+    :return: dict with the load time in seconds and the peak RSS of the process in MiB
+    """
+    start = time.perf_counter()
+    db = NEODatabase(filename=filename)
+    db.load_data()
+    seconds = time.perf_counter() - start
+    # ru_maxrss is in KiB on Linux
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return {'seconds': seconds, 'peak_rss_mib': peak_rss, 'neos': len(db.neo_object_db)}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='NEODatabase.load_data benchmark')
+    parser.add_argument('--sizes', nargs='+', type=int, default=[10000, 100000, 1000000],
+                        help='Number of close approach rows in each benchmarked csv file')
+    parser.add_argument('--load', type=str, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # Child process: load a single file and report the measures to the parent
+    if args.load:
+        print(json.dumps(load(args.load)))
+        sys.exit()
+
+    print(f'{"rows":>10} {"neos":>8} {"seconds":>9} {"rows/sec":>10} {"peak RSS (MiB)":>15}')
+    with tempfile.TemporaryDirectory() as directory:
+        for rows in args.sizes:
+            filename = os.path.join(directory, f'neo_{rows}.csv')
+            write_neo_csv(filename, neo_count=max(rows // APPROACHES_PER_NEO, 1),
+                          approaches_per_neo=APPROACHES_PER_NEO, days=365)
+            output = subprocess.run([sys.executable, '-m', 'benchmarks.bench_load', '--load', filename],
+                                    check=True, capture_output=True, text=True).stdout
+            measures = json.loads(output)
+            print(f'{rows:>10} {measures["neos"]:>8} {measures["seconds"]:>9.2f} '
+                  f'{rows / measures["seconds"]:>10.0f} {measures["peak_rss_mib"]:>15.1f}')
+            os.remove(filename)
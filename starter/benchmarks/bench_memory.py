@@ -0,0 +1,94 @@
+"""
+Memory benchmark of the NearEarthObject and OrbitPath representations, reporting the bytes allocated per NEO and per
+orbit for the compact __slots__ models and for the previous models with a per-instance __dict__.
+
+Run from the `/starter` directory with: python -m benchmarks.bench_memory [--neos 10000] [--approaches 10]
+"""
+
+import argparse
+import csv
+import gc
+import os
+import tempfile
+import tracemalloc
+
+from benchmarks.synthetic import write_neo_csv
+from models import NearEarthObject, OrbitPath
+
+
+class DictNearEarthObject(object):
+    """
+    The NearEarthObject before the compact representation: a per-instance __dict__ with every diameter variant.
+    """
+
+    def __init__(self, **kwargs):
+        self.id = kwargs["id"]
+        self.name = kwargs["name"]
+        self.diameter_min_km = float(kwargs["estimated_diameter_min_kilometers"])
+        self.diameter_max_km = float(kwargs["estimated_diameter_max_kilometers"])
+        self.diameter_min_meter = float(kwargs["estimated_diameter_min_meters"])
+        self.diameter_max_meter = float(kwargs["estimated_diameter_max_meters"])
+        self.diameter_min_miles = float(kwargs["estimated_diameter_min_miles"])
+        self.diameter_max_miles = float(kwargs["estimated_diameter_max_miles"])
+        self.is_potentially_hazardous_asteroid = kwargs["is_potentially_hazardous_asteroid"] == "True"
+        self.orbits = []
+
+
+class DictOrbitPath(object):
+    """
+    The OrbitPath before the compact representation: a per-instance __dict__ copying the id and name of its NEO.
+    """
+
+    def __init__(self, **kwargs):
+        self.neo_id = kwargs["id"]
+        self.neo_name = kwargs["name"]
+        self.orbiting_body = kwargs["orbiting_body"]
+        self.close_approach_date = kwargs["close_approach_date"]
+        self.miss_distance_kilometers = float(kwargs["miss_distance_kilometers"])
+        self.miss_distance_miles = float(kwargs["miss_distance_miles"])
+
+
+def measure(entries, neo_class, orbit_class, compact):
+    """
+    Builds the NEOs of entries first, then their orbits, measuring the memory allocated by each step.
+
+    :param entries: list of csv rows
+    :param neo_class: class of the Near Earth Objects
+    :param orbit_class: class of the orbits
+    :param compact: bool flag for the compact models, whose orbits reference their NEO
+    :return: tuple of the bytes per NEO and the bytes per orbit
+    """
+    gc.collect()
+    tracemalloc.start()
+    neos = {}
+    for entry in entries:
+        if entry["name"] not in neos:
+            neos[entry["name"]] = neo_class(**entry)
+    neo_bytes = tracemalloc.get_traced_memory()[0]
+
+    for entry in entries:
+        neo = neos[entry["name"]]
+        orbit = orbit_class(neo=neo, **entry) if compact else orbit_class(**entry)
+        neo.orbits.append(orbit)
+    orbit_bytes = tracemalloc.get_traced_memory()[0] - neo_bytes
+    tracemalloc.stop()
+    return neo_bytes / len(neos), orbit_bytes / len(entries)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='NearEarthObject and OrbitPath memory benchmark')
+    parser.add_argument('--neos', type=int, default=10000, help='Number of unique Near Earth Objects')
+    parser.add_argument('--approaches', type=int, default=10, help='Number of close approaches per NEO')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, 'neo.csv')
+        write_neo_csv(filename, neo_count=args.neos, approaches_per_neo=args.approaches)
+        with open(filename, 'r') as neo_file:
+            entries = list(csv.DictReader(neo_file))
+
+    print(f'{"models":>10} {"bytes/NEO":>10} {"bytes/orbit":>12}')
+    for label, neo_class, orbit_class, compact in [('__dict__', DictNearEarthObject, DictOrbitPath, False),
+                                                   ('__slots__', NearEarthObject, OrbitPath, True)]:
+        neo_bytes, orbit_bytes = measure(entries, neo_class, orbit_class, compact)
+        print(f'{label:>10} {neo_bytes:>10.0f} {orbit_bytes:>12.0f}')
@@ -0,0 +1,75 @@
+"""
+Benchmark of ordered top 10 queries over a whole year: the 10 closest approaches, the 10 largest NEOs and the 10 last
+approaches. Each query is timed when its results are sorted in full, with the top-K heap of NEOSearcher, and reading
+the sorted indexes of a database loaded with --indexes. The results of the three are checked to be the same.
+
+Run from the `/starter` directory with: python -m benchmarks.bench_order [--rows 1000000]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.synthetic import write_neo_csv
+from database import NEODatabase
+from models import OrbitPath
+from search import Query, NEOSearcher
+
+APPROACHES_PER_NEO = 10
+
+QUERIES = {
+    '10 closest approaches': dict(return_object='Path', order_by='distance'),
+    '10 largest NEOs': dict(return_object='NEO', order_by='diameter', order='desc'),
+    '10 last approaches': dict(return_object='Path', order_by='date', order='desc'),
+}
+
+
+def full_sort(searcher, query_selectors):
+    """
+    :param searcher: NEOSearcher of the database
+    :param query_selectors: Query.Selectors of the ordered query
+    :return: list of the first results of the query, sorting all the results of the query without order
+    """
+    date_window = searcher.date_window(query_selectors.date_search)
+    results = searcher.get_objects(query_selectors._replace(number=None, order=None))
+    if query_selectors.return_object == OrbitPath:
+        # Only the close approaches in the date window are ordered
+        results = [orbit for orbit in results if date_window[0] <= orbit.close_approach_date <= date_window[1]]
+    key = NEOSearcher.order_key(query_selectors.order, query_selectors.return_object, date_window)
+    return sorted(results, key=key, reverse=query_selectors.order.descending)[:query_selectors.number]
+
+
+def timed(function, *args):
+    """
+    :return: tuple of the seconds taken by function, and its results as str
+    """
+    start = time.perf_counter()
+    results = function(*args)
+    return time.perf_counter() - start, list(map(str, results))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Ordered top 10 query benchmark')
+    parser.add_argument('--rows', type=int, default=1000000, help='Number of close approach rows')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, 'neo_data.csv')
+        write_neo_csv(filename, neo_count=max(args.rows // APPROACHES_PER_NEO, 1),
+                      approaches_per_neo=APPROACHES_PER_NEO)
+        db = NEODatabase(filename=filename, snapshot=False)
+        db.load_data()
+        indexed_db = NEODatabase(filename=filename, snapshot=False, indexes=True)
+        indexed_db.load_data()
+
+    searcher = NEOSearcher(db, cache_entries=0)
+    indexed_searcher = NEOSearcher(indexed_db, cache_entries=0)
+    print(f'{"query":>22} {"full sort (s)":>14} {"top-K heap (s)":>15} {"sorted index (s)":>17}')
+    for name, query in QUERIES.items():
+        query_selectors = Query(number=10, start_date='2020-01-01', end_date='2020-12-31', **query).build_query()
+        sort_seconds, sorted_results = timed(full_sort, searcher, query_selectors)
+        heap_seconds, heap_results = timed(searcher.get_objects, query_selectors)
+        index_seconds, index_results = timed(indexed_searcher.get_objects, query_selectors)
+        assert sorted_results == heap_results == index_results
+        print(f'{name:>22} {sort_seconds:>14.3f} {heap_seconds:>15.3f} {index_seconds:>17.3f}')
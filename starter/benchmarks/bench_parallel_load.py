@@ -0,0 +1,58 @@
+"""
+Benchmark of the parallel NEODatabase.load_data, reporting the load time and the speedup over the serial load for an
+increasing number of worker processes.
+
+The speedup is bounded by the number of available cores and by the serial part of the load: the workers send back
+columns of parsed values, from which the main process builds the objects. The time the main process takes to unpickle
+the columns and build the objects is reported with the speedup it allows, with as many cores as workers.
+
+Run from the `/starter` directory with: python -m benchmarks.bench_parallel_load [--rows 1000000] [--workers 1 2 4 8]
+"""
+
+import argparse
+import os
+import pickle
+import tempfile
+import time
+
+from benchmarks.synthetic import write_neo_csv
+from database import NEODatabase, load_chunk, paused_garbage_collection, split_csv
+
+APPROACHES_PER_NEO = 10
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Parallel load_data benchmark')
+    parser.add_argument('--rows', type=int, default=1000000, help='Number of close approach rows of the csv file')
+    parser.add_argument('--workers', nargs='+', type=int, default=[1, 2, 4, 8], help='Numbers of worker processes')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, 'neo.csv')
+        write_neo_csv(filename, neo_count=max(args.rows // APPROACHES_PER_NEO, 1), approaches_per_neo=APPROACHES_PER_NEO)
+
+        print(f'cores: {os.cpu_count()}')
+        print(f'{"workers":>8} {"seconds":>9} {"rows/sec":>10} {"speedup":>8}')
+        serial_seconds = None
+        for workers in args.workers:
+            start = time.perf_counter()
+            NEODatabase(filename=filename).load_data(workers=workers)
+            seconds = time.perf_counter() - start
+            serial_seconds = serial_seconds or seconds
+            print(f'{workers:>8} {seconds:>9.2f} {args.rows / seconds:>10.0f} {serial_seconds / seconds:>8.2f}')
+
+        # The chunks parsed one after the other, as the workers would, then the objects built from their columns
+        header, ranges = split_csv(filename, max(args.workers) * 4)
+        start = time.perf_counter()
+        chunks = [pickle.dumps(load_chunk(filename, header, *byte_range)) for byte_range in ranges]
+        parse_seconds = time.perf_counter() - start
+        db = NEODatabase(filename=filename)
+        start = time.perf_counter()
+        with paused_garbage_collection():
+            for chunk in chunks:
+                db.add_columns(*pickle.loads(chunk))
+        build_seconds = time.perf_counter() - start
+        print(f'workers parse {parse_seconds:.2f} s, main process build {build_seconds:.2f} s')
+        for workers in args.workers:
+            print(f'{workers:>8} workers on {workers} cores: speedup up to '
+                  f'{serial_seconds / (parse_seconds / workers + build_seconds):.2f}')
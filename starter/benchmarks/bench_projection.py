@@ -0,0 +1,76 @@
+"""
+Benchmark of the csv loaders of NEODatabase, reporting the load time and the peak of the memory allocated while
+loading of the projecting loader, NEODatabase.add_rows building the models from the row tuples of csv.reader, and of
+the previous loader, NEODatabase.add_entry called with the dict of each row read by csv.DictReader.
+
+Run from the `/starter` directory with: python -m benchmarks.bench_projection [--rows 1000000]
+"""
+
+import argparse
+import csv
+import os
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.synthetic import write_neo_csv
+from database import NEODatabase
+
+APPROACHES_PER_NEO = 10
+
+
+def load_entries(filename):
+    """
+    Loader before the projection: a dict per row, all the columns of the row being read.
+    """
+    db = NEODatabase(filename=filename)
+    with open(filename, 'r') as neo_data_file:
+        for entry in csv.DictReader(neo_data_file):
+            db.add_entry(entry)
+    return db
+
+
+def load_rows(filename):
+    """
+    Projecting loader, used by NEODatabase.load_data.
+    """
+    db = NEODatabase(filename=filename)
+    db.add_file_rows(filename)
+    return db
+
+
+def measure(load, filename, trace):
+    """
+    :param load: function of the filename loading it
+    :param filename: str representing the pathway of the csv file
+    :param trace: bool representing if the allocations are traced, which slows the load down
+    :return: tuple of the wall time in seconds and the peak traced memory in bytes, 0 when not traced
+    """
+    if trace:
+        tracemalloc.start()
+    start = time.perf_counter()
+    db = load(filename)
+    seconds = time.perf_counter() - start
+    peak = 0
+    if trace:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    del db
+    return seconds, peak
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Projecting csv loader benchmark')
+    parser.add_argument('--rows', type=int, default=1000000, help='Number of close approach rows')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, 'neo_data.csv')
+        write_neo_csv(filename, neo_count=max(args.rows // APPROACHES_PER_NEO, 1),
+                      approaches_per_neo=APPROACHES_PER_NEO)
+
+        print(f'{"loader":>10} {"load (s)":>9} {"rows/sec":>10} {"peak (MB)":>10}')
+        for name, load in (('dict', load_entries), ('projection', load_rows)):
+            seconds, _ = measure(load, filename, trace=False)
+            _, peak = measure(load, filename, trace=True)
+            print(f'{name:>10} {seconds:>9.2f} {args.rows / seconds:>10,.0f} {peak / 1e6:>10.1f}')
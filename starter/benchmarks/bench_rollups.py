@@ -0,0 +1,79 @@
+"""
+Benchmark of the aggregates of a year of close approaches by day, month and year: counting the NEOs returned by
+NEOSearcher.get_objects for each group, scanning the NEOs of the year with NEOSearcher.scan_aggregates, and reading
+the DateRollups of a database loaded with --rollups. The time the rollups add to the load is reported as well.
+
+Run from the `/starter` directory with: python -m benchmarks.bench_rollups [--rows 1000000]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.synthetic import write_neo_csv
+from database import NEODatabase
+from rollups import DateRollups
+from search import Query, NEOSearcher
+
+APPROACHES_PER_NEO = 10
+
+FILTERS = [[], ['is_hazardous:=:True']]
+
+
+def count_objects(searcher, query_selectors, filters, group_by):
+    """
+    :param searcher: NEOSearcher of the database
+    :param query_selectors: Query.Selectors of the date search
+    :param filters: list of the filter options of the query
+    :param group_by: str representing the group of dates, day, month or year
+    :return: list of the (group, number of unique NEOs) of each group, counted from the NEOs of get_objects
+    """
+    prefix = DateRollups.Groups[group_by]
+    groups = sorted({date[:prefix] for date in searcher.selected_dates(query_selectors.date_search)})
+    counts = []
+    for group in groups:
+        # The dates of a group are the dates starting with the group, `~` sorts after their last characters
+        group_query = Query(start_date=group, end_date=group + '~', filter=filters or None).build_query()
+        counts.append((group, len(searcher.get_objects(group_query))))
+    return counts
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Rollup aggregates benchmark')
+    parser.add_argument('--rows', type=int, default=1000000, help='Number of close approach rows')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, 'neo_data.csv')
+        write_neo_csv(filename, neo_count=max(args.rows // APPROACHES_PER_NEO, 1),
+                      approaches_per_neo=APPROACHES_PER_NEO)
+        start = time.perf_counter()
+        db = NEODatabase(filename=filename, snapshot=False)
+        db.load_data()
+        load_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        rollups_db = NEODatabase(filename=filename, snapshot=False, rollups=True)
+        rollups_db.load_data()
+        rollups_load_seconds = time.perf_counter() - start
+    print(f'load {load_seconds:.2f} s, with rollups {rollups_load_seconds:.2f} s')
+
+    searcher = NEOSearcher(db, cache_entries=0)
+    rollups_searcher = NEOSearcher(rollups_db, cache_entries=0)
+    print(f'{"group":>6} {"filters":>22} {"get_objects (s)":>16} {"scan (s)":>9} {"rollups (ms)":>13}')
+    for group_by in DateRollups.Groups:
+        for filters in FILTERS:
+            query_selectors = Query(start_date='2020-01-01', end_date='2020-12-31', filter=filters or None).build_query()
+            start = time.perf_counter()
+            counts = count_objects(searcher, query_selectors, filters, group_by)
+            objects_seconds = time.perf_counter() - start
+            start = time.perf_counter()
+            scanned = searcher.scan_aggregates(query_selectors, group_by)
+            scan_seconds = time.perf_counter() - start
+            start = time.perf_counter()
+            aggregates = rollups_searcher.get_aggregates(query_selectors, group_by)
+            rollups_seconds = time.perf_counter() - start
+            assert scanned == aggregates
+            assert counts == [(aggregate.group, aggregate.neos) for aggregate in aggregates]
+            print(f'{group_by:>6} {", ".join(filters) or "-":>22} {objects_seconds:>16.3f} {scan_seconds:>9.3f} '
+                  f'{rollups_seconds * 1000:>13.2f}')
@@ -0,0 +1,52 @@
+"""
+Scaling benchmark of NEOSearcher.get_objects over a whole year of close approaches.
+
+Every query returns all the NEOs or all the OrbitPaths of the year, so the number of results grows with the dataset.
+The search time per result staying flat as the dataset grows shows that the date join and the orbit flattening are
+linear in the number of results.
+
+Run from the `/starter` directory with: python -m benchmarks.bench_search_scaling [--sizes 10000 100000 ...]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.synthetic import write_neo_csv
+from database import NEODatabase
+from search import Query, NEOSearcher
+
+APPROACHES_PER_NEO = 10
+
+QUERIES = {
+    'NEO': dict(start_date='2020-01-01', end_date='2020-12-31', return_object='NEO'),
+    'Path': dict(start_date='2020-01-01', end_date='2020-12-31', return_object='Path'),
+    'Path, distance': dict(start_date='2020-01-01', end_date='2020-12-31', return_object='Path',
+                           filter=['distance:<=:30000000']),
+}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Search scaling benchmark')
+    parser.add_argument('--sizes', nargs='+', type=int, default=[10000, 100000, 1000000],
+                        help='Number of close approach rows in each benchmarked database')
+    args = parser.parse_args()
+
+    print(f'{"rows":>10} {"query":>15} {"results":>10} {"seconds":>9} {"us/result":>10}')
+    with tempfile.TemporaryDirectory() as directory:
+        for rows in args.sizes:
+            filename = os.path.join(directory, f'neo_{rows}.csv')
+            write_neo_csv(filename, neo_count=max(rows // APPROACHES_PER_NEO, 1),
+                          approaches_per_neo=APPROACHES_PER_NEO, start_date='2020-01-01', days=366)
+            db = NEODatabase(filename=filename)
+            db.load_data()
+            os.remove(filename)
+
+            searcher = NEOSearcher(db)
+            for name, query in QUERIES.items():
+                start = time.perf_counter()
+                results = searcher.get_objects(Query(**query).build_query())
+                seconds = time.perf_counter() - start
+                print(f'{rows:>10} {name:>15} {len(results):>10} {seconds:>9.3f} '
+                      f'{seconds / max(len(results), 1) * 1e6:>10.2f}')
@@ -0,0 +1,91 @@
+"""
+Benchmark of the dict and sqlite backends of NEODatabase, reporting the load time, the median latency of a set of
+queries and the peak resident memory of the process after the load and after the queries, which materialize their
+results.
+
+Each backend runs in a fresh Python process, so the peak RSS of one backend is not hidden by the other. The sqlite
+backend is measured twice: building its database file from the csv file, then reusing the database file.
+
+Run from the `/starter` directory with: python -m benchmarks.bench_sqlite [--rows 1000000]
+"""
+
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic import write_neo_csv
+from database import NEODatabase
+from search import Query, NEOSearcher
+
+APPROACHES_PER_NEO = 10
+
+QUERIES = [
+    dict(date='2020-06-01', number=10),
+    dict(start_date='2020-01-01', end_date='2020-01-31', number=100, filter=['diameter:>:0.2']),
+    dict(start_date='2020-01-01', end_date='2020-03-31', filter=['diameter:>:1', 'is_hazardous:=:True']),
+    dict(start_date='2020-01-01', end_date='2020-12-31', number=50, return_object='Path',
+         filter=['distance:<:2000000']),
+    dict(start_date='2020-03-01', end_date='2020-03-07', return_object='Path'),
+]
+
+
+def measure(filename, backend):
+    """
+    Loads filename with the backend and runs the QUERIES.
+
+    :param filename: str representing the pathway of the csv file to load
+    :param backend: str representing the backend, dict or sqlite
+    :return: dict with the load time in seconds, the median query latency in milliseconds and the peak RSS in MiB
+             after the load and after the queries
+    """
+    start = time.perf_counter()
+    db = NEODatabase(filename=filename, snapshot=backend == 'sqlite', sqlite=backend == 'sqlite')
+    db.load_data()
+    load_seconds = time.perf_counter() - start
+    # ru_maxrss is in KiB on Linux
+    load_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    searcher = NEOSearcher(db, cache_entries=0)
+    latencies = []
+    results = 0
+    for query in QUERIES:
+        query_selectors = Query(**query).build_query()
+        for _ in range(5):
+            start = time.perf_counter()
+            found = searcher.get_objects(query_selectors)
+            latencies.append((time.perf_counter() - start) * 1000)
+        results += len(found)
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return {'load_seconds': load_seconds, 'query_ms': statistics.median(latencies), 'results': results,
+            'load_rss_mib': load_rss, 'peak_rss_mib': peak_rss}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='dict and sqlite backend benchmark')
+    parser.add_argument('--rows', type=int, default=1000000, help='Number of close approach rows')
+    parser.add_argument('--measure', nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # Child process: measure a single backend and report the measures to the parent
+    if args.measure:
+        print(json.dumps(measure(*args.measure)))
+        sys.exit()
+
+    print(f'{"backend":>16} {"load (s)":>9} {"query (ms)":>11} {"results":>8} {"load RSS (MiB)":>15} '
+          f'{"peak RSS (MiB)":>15}')
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, 'neo_data.csv')
+        write_neo_csv(filename, neo_count=max(args.rows // APPROACHES_PER_NEO, 1),
+                      approaches_per_neo=APPROACHES_PER_NEO)
+        for name, backend in (('dict', 'dict'), ('sqlite (build)', 'sqlite'), ('sqlite (reuse)', 'sqlite')):
+            output = subprocess.run([sys.executable, '-m', 'benchmarks.bench_sqlite', '--measure', filename, backend],
+                                    check=True, capture_output=True, text=True).stdout
+            measures = json.loads(output)
+            print(f'{name:>16} {measures["load_seconds"]:>9.2f} {measures["query_ms"]:>11.2f} '
+                  f'{measures["results"]:>8} {measures["load_rss_mib"]:>15.1f} {measures["peak_rss_mib"]:>15.1f}')
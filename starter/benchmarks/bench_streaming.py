@@ -0,0 +1,85 @@
+"""
+Benchmark of the streaming search, scanning the csv file, against loading the csv file into a NEODatabase then
+searching it, for one-off queries. Reports the time to the results, the rows read by the scans and the peak resident
+memory of the process.
+
+Each mode runs in a fresh Python process, so the peak RSS of one mode is not hidden by the other. The synthetic file is
+sorted by close approach date, the streaming search is measured with and without --sorted_by_date.
+
+Run from the `/starter` directory with: python -m benchmarks.bench_streaming [--rows 1000000]
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic import write_neo_csv
+from database import NEODatabase
+from search import Query, NEOSearcher
+from streaming import StreamingSearcher
+
+APPROACHES_PER_NEO = 10
+
+QUERIES = {
+    'first 10 on a date': dict(date='2020-01-05', number=10),
+    'month, diameter': dict(start_date='2020-01-01', end_date='2020-01-31', number=100, filter=['diameter:>:0.2']),
+    'month paths, distance': dict(start_date='2020-03-01', end_date='2020-03-31', number=50, return_object='Path',
+                                  filter=['distance:<:2000000']),
+}
+
+
+def measure(filename, mode, name):
+    """
+    Runs the query name of QUERIES on filename in the mode.
+
+    :param filename: str representing the pathway of the csv file
+    :param mode: str representing the mode, load, scan or sorted_scan
+    :param name: str representing the name of the query in QUERIES
+    :return: dict with the seconds to the results, the number of results, the rows read and the peak RSS in MiB
+    """
+    query_selectors = Query(**QUERIES[name]).build_query()
+    start = time.perf_counter()
+    if mode == 'load':
+        db = NEODatabase(filename=filename, snapshot=False)
+        db.load_data()
+        results = NEOSearcher(db, cache_entries=0).get_objects(query_selectors)
+        rows_read = None
+    else:
+        searcher = StreamingSearcher(filename, sorted_by_date=mode == 'sorted_scan')
+        results = searcher.get_objects(query_selectors)
+        rows_read = searcher.rows_read
+    seconds = time.perf_counter() - start
+    # ru_maxrss is in KiB on Linux
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return {'seconds': seconds, 'results': len(results), 'rows_read': rows_read, 'peak_rss_mib': peak_rss}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Streaming search benchmark')
+    parser.add_argument('--rows', type=int, default=1000000, help='Number of close approach rows')
+    parser.add_argument('--measure', nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # Child process: measure a single mode and report the measures to the parent
+    if args.measure:
+        print(json.dumps(measure(*args.measure)))
+        sys.exit()
+
+    print(f'{"query":>22} {"mode":>12} {"seconds":>8} {"results":>8} {"rows read":>10} {"peak RSS (MiB)":>15}')
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, 'neo_data.csv')
+        write_neo_csv(filename, neo_count=max(args.rows // APPROACHES_PER_NEO, 1),
+                      approaches_per_neo=APPROACHES_PER_NEO)
+        for name in QUERIES:
+            for mode in ('load', 'scan', 'sorted_scan'):
+                output = subprocess.run([sys.executable, '-m', 'benchmarks.bench_streaming', '--measure', filename,
+                                         mode, name], check=True, capture_output=True, text=True).stdout
+                measures = json.loads(output)
+                rows_read = '-' if measures['rows_read'] is None else measures['rows_read']
+                print(f'{name:>22} {mode:>12} {measures["seconds"]:>8.2f} {measures["results"]:>8} {rows_read:>10} '
+                      f'{measures["peak_rss_mib"]:>15.1f}')
@@ -0,0 +1,103 @@
+"""
+Throughput benchmark of NEOWriter, reporting the rows written per second by each output format for a stream of
+OrbitPath results, and by the previous per row display and csv writes.
+
+The results are generated as they are written, so exports of any size run in constant memory, e.g. a 10M row export:
+Run from the `/starter` directory with: python -m benchmarks.bench_writer [--rows 10000000] [--formats csv_file jsonl]
+"""
+
+import argparse
+import contextlib
+import csv
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+
+from models import NearEarthObject, OrbitPath
+from writer import NEOWriter, OutputFormat
+
+
+def iter_orbits(rows, neo_count=1000):
+    """
+    :param rows: int representing the number of OrbitPath results to generate
+    :param neo_count: int representing the number of Near Earth Objects the orbits belong to
+    :return: generator of OrbitPath
+    """
+    neos = [NearEarthObject(**{
+        "id": str(2000000 + index),
+        "name": f'({1900 + index % 120} XY{index})',
+        "estimated_diameter_min_kilometers": 0.1,
+        "estimated_diameter_max_kilometers": 0.2236,
+        "is_potentially_hazardous_asteroid": "False",
+    }) for index in range(neo_count)]
+    dates = [(date(2020, 1, 1) + timedelta(days=day)).isoformat() for day in range(365)]
+    for row in range(rows):
+        miss_distance_kilometers = 1000.0 + row * 7.5
+        yield OrbitPath(neo=neos[row % neo_count], **{
+            "orbiting_body": "Earth",
+            "close_approach_date": dates[row % len(dates)],
+            "miss_distance_kilometers": miss_distance_kilometers,
+            "miss_distance_miles": miss_distance_kilometers * 0.621371,
+        })
+
+
+def legacy_display(data, output):
+    """
+    Display before the streaming writer: one print per row.
+    """
+    for row in data:
+        print(row, file=output)
+
+
+def legacy_csv_file(data, filename):
+    """
+    csv_file before the streaming writer: one writerow per row on a default buffered file.
+    """
+    with open(filename, mode='w') as orbit_file:
+        orbit_writer = csv.writer(orbit_file, delimiter=',')
+        orbit_writer.writerow(NEOWriter.CsvHeaders["OrbitPath"])
+        for row in data:
+            orbit_writer.writerow(NEOWriter.csv_row(row))
+
+
+def measure(write, rows):
+    """
+    :param write: function of the generated results writing them
+    :param rows: int representing the number of results
+    :return: float representing the rows written per second
+    """
+    start = time.perf_counter()
+    write(iter_orbits(rows))
+    return rows / (time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='NEOWriter throughput benchmark')
+    parser.add_argument('--rows', type=int, default=1000000, help='Number of results written by each format')
+    parser.add_argument('--formats', nargs='+', default=['legacy_display', *OutputFormat.list(), 'legacy_csv_file'],
+                        help='Formats to measure, OutputFormat values or legacy_display and legacy_csv_file')
+    args = parser.parse_args()
+
+    # Generating the results is part of every measurement, report its own rate as a reference
+    start = time.perf_counter()
+    for _ in iter_orbits(args.rows):
+        pass
+    print(f'{"generate only":>16} {args.rows / (time.perf_counter() - start):>14,.0f} rows/s')
+
+    writer = NEOWriter()
+    with tempfile.TemporaryDirectory() as directory, open(os.devnull, 'w') as devnull:
+        for output_format in args.formats:
+            filename = os.path.join(directory, f'neo_output.{output_format}')
+            # The writer prints the output filename, keep the report readable
+            with contextlib.redirect_stdout(devnull):
+                if output_format == 'legacy_display':
+                    rate = measure(lambda data: legacy_display(data, devnull), args.rows)
+                elif output_format == 'legacy_csv_file':
+                    rate = measure(lambda data: legacy_csv_file(data, filename), args.rows)
+                elif output_format == 'display':
+                    rate = measure(lambda data: writer.write(output_format, data, filename=devnull), args.rows)
+                else:
+                    rate = measure(lambda data: writer.write(output_format, data, filename=filename), args.rows)
+            size = os.path.getsize(filename) if os.path.exists(filename) else 0
+            print(f'{output_format:>16} {rate:>14,.0f} rows/s {size / 1e6:>10.1f} MB')
@@ -0,0 +1,73 @@
+"""
+Load test of the query server, reporting the p50/p99 latency and the queries per second of concurrent clients.
+
+Start the server first, e.g. python server.py --quiet -f data/neo_data.csv, then run from the `/starter` directory
+with: python -m benchmarks.load_test [--url http://127.0.0.1:8000/query] [--clients 8] [--requests 2000]
+"""
+
+import argparse
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from urllib.parse import urlencode
+from urllib.request import urlopen
+
+FILTERS = [[], ['diameter:>:0.042'], ['is_hazardous:=:True'], ['diameter:>:0.042', 'distance:>:234989']]
+
+
+def random_query(rng, start_date, days):
+    """
+    :param rng: random.Random generating the query
+    :param start_date: date of the first day queried
+    :param days: int representing the number of days queried
+    :return: list of the query string parameters of a dashboard style query
+    """
+    first_date = start_date + timedelta(days=rng.randrange(days))
+    if rng.random() < 0.5:
+        params = [('date', first_date.isoformat())]
+    else:
+        params = [('start_date', first_date.isoformat()),
+                  ('end_date', (first_date + timedelta(days=rng.randrange(1, 10))).isoformat())]
+    params += [('number', rng.choice([10, 50, 100])), ('return_object', rng.choice(['NEO', 'Path']))]
+    params += [('filter', _filter) for _filter in rng.choice(FILTERS)]
+    return params
+
+
+def percentile(sorted_values, fraction):
+    """
+    :param sorted_values: sorted list of values
+    :param fraction: float between 0 and 1
+    :return: value at the fraction of the sorted values
+    """
+    return sorted_values[min(int(len(sorted_values) * fraction), len(sorted_values) - 1)]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Query server load test')
+    parser.add_argument('--url', type=str, default='http://127.0.0.1:8000/query', help='Query endpoint of the server')
+    parser.add_argument('--clients', type=int, default=8, help='Number of concurrent clients')
+    parser.add_argument('--requests', type=int, default=2000, help='Total number of requests')
+    parser.add_argument('--start_date', type=str, default='2020-01-01', help='First date queried')
+    parser.add_argument('--days', type=int, default=30, help='Number of days queried')
+    parser.add_argument('--format', type=str, default='json', choices=['json', 'csv'], help='Response format')
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    urls = [f'{args.url}?{urlencode(random_query(rng, date.fromisoformat(args.start_date), args.days) + [("format", args.format)])}'
+            for _ in range(args.requests)]
+
+    def timed_request(url):
+        start = time.perf_counter()
+        with urlopen(url) as response:
+            response.read()
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.clients) as executor:
+        latencies = sorted(executor.map(timed_request, urls))
+    seconds = time.perf_counter() - start
+
+    print(f'requests: {len(latencies)}  clients: {args.clients}  seconds: {seconds:.2f}')
+    print(f'qps: {len(latencies) / seconds:.1f}  '
+          f'p50: {percentile(latencies, 0.50) * 1000:.2f} ms  p99: {percentile(latencies, 0.99) * 1000:.2f} ms')
@@ -0,0 +1,192 @@
+"""
+Benchmark suite of the load, search and write paths on deterministic synthetic data, to catch performance regressions.
+
+The suite generates a csv with benchmarks.synthetic and times, keeping the best of --repeat runs:
+- load: NEODatabase.load_data of the csv, without snapshot
+- search: NEOSearcher.get_objects for every DateSearch type, every combination of the diameter, is_hazardous and
+  distance filters and both return objects, without result cache
+- write: NEOWriter.write of the NEO and Path results of the whole date span in the display and csv_file formats
+
+The results are saved as JSON with --output. With --baseline, the results are compared to a saved run and the suite
+exits with status 1 when a benchmark is more than --threshold slower than in the baseline. Benchmarks faster than
+--min_seconds in the baseline are reported but not checked, their times being mostly noise.
+
+Run from the `/starter` directory with:
+python -m benchmarks.suite [--neos 10000] [--approaches 10] [--output results.json] [--baseline baseline.json]
+[--threshold 0.2]
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from itertools import combinations
+
+from benchmarks.synthetic import write_neo_csv
+from database import NEODatabase
+from search import DateSearch, Query, NEOSearcher
+from writer import NEOWriter
+
+# Filters selecting part of the synthetic data: the median diameter, the hazardous_ratio and about 40% of the orbits
+FILTERS = ['diameter:>:0.05', 'is_hazardous:=:True', 'distance:<:30000000']
+
+RETURN_OBJECTS = ['NEO', 'Path']
+
+WRITE_FORMATS = ['display', 'csv_file']
+
+
+def best_time(function, repeat):
+    """
+    :param function: function without arguments to time
+    :param repeat: int representing the number of runs
+    :return: tuple of the best wall time in seconds of the runs and the value returned by the last run
+    """
+    best = None
+    value = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        value = function()
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best, value
+
+
+def date_queries(start_date, days):
+    """
+    :param start_date: str representing the first close approach date of the data
+    :param days: int representing the number of days of the data
+    :return: dict of a Query date arguments for each DateSearch type
+    """
+    first_date = date.fromisoformat(start_date)
+    queries = {}
+    for date_search in DateSearch.list():
+        if date_search == 'equals':
+            queries[date_search] = dict(date=(first_date + timedelta(days=days // 2)).isoformat())
+        else:
+            queries[date_search] = dict(start_date=start_date,
+                                        end_date=(first_date + timedelta(days=days - 1)).isoformat())
+    return queries
+
+
+def run_suite(filename, start_date, days, repeat):
+    """
+    :param filename: str representing the pathway of the synthetic csv file
+    :param start_date: str representing the first close approach date of the data
+    :param days: int representing the number of days of the data
+    :param repeat: int representing the number of runs of each benchmark
+    :return: dict of the benchmark names to their best time in seconds and number of result rows
+    """
+    results = {}
+
+    def load():
+        db = NEODatabase(filename=filename, snapshot=False)
+        db.load_data()
+        return db
+
+    seconds, db = best_time(load, repeat)
+    results['load'] = {'seconds': seconds, 'rows': sum(map(len, db.date_neo_db.values()))}
+
+    searcher = NEOSearcher(db, cache_entries=0)
+    queries = date_queries(start_date, days)
+    for date_search, date_arguments in queries.items():
+        for return_object in RETURN_OBJECTS:
+            for count in range(len(FILTERS) + 1):
+                for filters in combinations(FILTERS, count):
+                    query = Query(return_object=return_object, filter=list(filters) or None,
+                                  **date_arguments).build_query()
+                    seconds, found = best_time(lambda: searcher.get_objects(query), repeat)
+                    name = 'search/{}/{}/{}'.format(
+                        date_search, return_object, '+'.join(_filter.split(':')[0] for _filter in filters) or 'none')
+                    results[name] = {'seconds': seconds, 'rows': len(found)}
+
+    with tempfile.TemporaryDirectory() as directory, open(os.devnull, 'w') as devnull:
+        writer = NEOWriter()
+        for return_object in RETURN_OBJECTS:
+            found = searcher.get_objects(Query(return_object=return_object, **queries['between']).build_query())
+            for output_format in WRITE_FORMATS:
+                output = devnull if output_format == 'display' else os.path.join(directory, 'neo_output.csv')
+                # The writer prints the output filename, keep the report readable
+                with contextlib.redirect_stdout(devnull):
+                    seconds, _ = best_time(lambda: writer.write(output_format, found, filename=output), repeat)
+                results[f'write/{output_format}/{return_object}'] = {'seconds': seconds, 'rows': len(found)}
+    return results
+
+
+def compare(results, baseline, threshold, min_seconds):
+    """
+    :param results: dict of the benchmark results of this run
+    :param baseline: dict of the benchmark results of the baseline run
+    :param threshold: float representing the accepted slowdown, e.g. 0.2 for 20% slower
+    :param min_seconds: float representing the baseline time under which a benchmark is not checked
+    :return: list of the names of the benchmarks slower than the baseline by more than threshold
+    """
+    regressions = []
+    print(f'{"benchmark":<50} {"baseline (s)":>13} {"run (s)":>10} {"change":>8}')
+    for name, result in results.items():
+        if name not in baseline:
+            print(f'{name:<50} {"":>13} {result["seconds"]:>10.4f} {"new":>8}')
+            continue
+        baseline_seconds = baseline[name]['seconds']
+        change = result['seconds'] / baseline_seconds - 1 if baseline_seconds else 0.0
+        regressed = change > threshold and baseline_seconds >= min_seconds
+        if regressed:
+            regressions.append(name)
+        print(f'{name:<50} {baseline_seconds:>13.4f} {result["seconds"]:>10.4f} {change:>+8.1%}'
+              f'{"  REGRESSION" if regressed else ""}')
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Near Earth Object database benchmark suite')
+    parser.add_argument('--neos', type=int, default=10000, help='Number of unique Near Earth Objects')
+    parser.add_argument('--approaches', type=int, default=10, help='Average number of close approaches per NEO')
+    parser.add_argument('--start_date', type=str, default='2020-01-01', help='First close approach date, YYYY-MM-DD')
+    parser.add_argument('--days', type=int, default=365, help='Number of days the close approaches are spread over')
+    parser.add_argument('--hazardous_ratio', type=float, default=0.1, help='Share of potentially hazardous NEOs')
+    parser.add_argument('--seed', type=int, default=42, help='Seed of the random generator')
+    parser.add_argument('--repeat', type=int, default=3, help='Number of runs of each benchmark, the best is kept')
+    parser.add_argument('--output', type=str, help='Name of the JSON file to save the results to')
+    parser.add_argument('--baseline', type=str, help='Name of the JSON file of a previous run to compare to')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='Accepted slowdown compared to the baseline, 0.2 for 20%% slower')
+    parser.add_argument('--min_seconds', type=float, default=0.001,
+                        help='Baseline time in seconds under which a benchmark is not checked')
+    args = parser.parse_args()
+
+    config = {'neos': args.neos, 'approaches': args.approaches, 'start_date': args.start_date, 'days': args.days,
+              'hazardous_ratio': args.hazardous_ratio, 'seed': args.seed}
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, 'neo_data.csv')
+        write_neo_csv(filename, neo_count=args.neos, approaches_per_neo=args.approaches, start_date=args.start_date,
+                      days=args.days, hazardous_ratio=args.hazardous_ratio, seed=args.seed)
+        results = run_suite(filename, args.start_date, args.days, args.repeat)
+
+    run = {'config': config, 'python': platform.python_version(), 'platform': platform.platform(),
+           'results': results}
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(run, output_file, indent=2)
+        print(f'Written results to {args.output}')
+
+    if not args.baseline:
+        print(f'{"benchmark":<50} {"seconds":>10} {"rows":>10}')
+        for name, result in results.items():
+            print(f'{name:<50} {result["seconds"]:>10.4f} {result["rows"]:>10}')
+        sys.exit(0)
+
+    with open(args.baseline) as baseline_file:
+        baseline = json.load(baseline_file)
+    if baseline['config'] != config:
+        print(f'The baseline was run on different data: {baseline["config"]}, this run: {config}')
+        sys.exit(2)
+    regressions = compare(results, baseline['results'], args.threshold, args.min_seconds)
+    if regressions:
+        print(f'{len(regressions)} benchmarks slower than the baseline by more than {args.threshold:.0%}: '
+              f'{", ".join(regressions)}')
+        sys.exit(1)
+    print('No regression')
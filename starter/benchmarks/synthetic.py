@@ -0,0 +1,102 @@
+"""
+Deterministic generator of synthetic Near Earth Object data in the shape of the NASA close approach csv export.
+
+The same arguments always generate the same file, so benchmark runs on different machines or commits load the same data.
+
+Run from the `/starter` directory with:
+python -m benchmarks.synthetic data/neo_synthetic.csv [--neos 1000] [--approaches 10] [--start_date 2020-01-01]
+[--days 365] [--hazardous_ratio 0.1] [--seed 42]
+"""
+
+import argparse
+import csv
+import random
+from datetime import date, timedelta
+
+HEADER = [
+    "id", "neo_reference_id", "name", "nasa_jpl_url", "absolute_magnitude_h",
+    "estimated_diameter_min_kilometers", "estimated_diameter_max_kilometers",
+    "estimated_diameter_min_meters", "estimated_diameter_max_meters",
+    "estimated_diameter_min_miles", "estimated_diameter_max_miles",
+    "estimated_diameter_min_feet", "estimated_diameter_max_feet",
+    "is_potentially_hazardous_asteroid", "kilometers_per_second", "kilometers_per_hour", "miles_per_hour",
+    "close_approach_date", "close_approach_date_full", "epoch_date_close_approach", "orbiting_body",
+    "miss_distance_astronomical", "miss_distance_lunar", "miss_distance_kilometers", "miss_distance_miles",
+]
+
+KM_PER_AU = 149597870.7
+KM_PER_LUNAR_DISTANCE = 384400.0
+MILES_PER_KM = 0.621371
+FEET_PER_KM = 3280.84
+
+
+def write_neo_csv(filename, neo_count=1000, approaches_per_neo=10, start_date='2020-01-01', days=365,
+                  hazardous_ratio=0.1, seed=42):
+    """
+    Writes a csv file of close approaches, ordered by close approach date like the NASA export.
+
+    :param filename: str representing the pathway of the csv file to write
+    :param neo_count: int representing the number of unique Near Earth Objects
+    :param approaches_per_neo: int representing the average number of close approaches of a Near Earth Object
+    :param start_date: str representing the first close approach date in YYYY-MM-DD format
+    :param days: int representing the number of days the close approaches are spread over
+    :param hazardous_ratio: float representing the share of potentially hazardous Near Earth Objects
+    :param seed: int seed of the random generator
+    :return: int representing the number of close approach rows written
+    """
+    rng = random.Random(seed)
+    neos = []
+    for index in range(neo_count):
+        diameter_min = rng.lognormvariate(-3.0, 1.2)
+        neos.append((
+            str(2000000 + index),
+            f'({1900 + index % 120} {chr(65 + index % 26)}{chr(65 + index // 26 % 26)}{index})',
+            round(rng.uniform(15.0, 30.0), 2),
+            diameter_min,
+            diameter_min * 2.236,
+            'True' if rng.random() < hazardous_ratio else 'False',
+        ))
+
+    rows = neo_count * approaches_per_neo
+    first_date = date.fromisoformat(start_date)
+    written = 0
+    with open(filename, 'w', newline='') as neo_file:
+        writer = csv.writer(neo_file)
+        writer.writerow(HEADER)
+        for day in range(days):
+            close_approach_date = (first_date + timedelta(days=day)).isoformat()
+            day_rows = rows * (day + 1) // days - written
+            # A Near Earth Object makes at most one close approach a day, as in the NASA export
+            for neo_index in rng.sample(range(neo_count), min(day_rows, neo_count)):
+                neo_id, name, magnitude, diameter_min, diameter_max, hazardous = neos[neo_index]
+                miss_km = rng.uniform(0.01, 0.5) * KM_PER_AU
+                speed = rng.uniform(1.0, 40.0)
+                writer.writerow([
+                    neo_id, neo_id, name, f'http://ssd.jpl.nasa.gov/sbdb.cgi?sstr={neo_id}', magnitude,
+                    diameter_min, diameter_max, diameter_min * 1000, diameter_max * 1000,
+                    diameter_min * MILES_PER_KM, diameter_max * MILES_PER_KM,
+                    diameter_min * FEET_PER_KM, diameter_max * FEET_PER_KM,
+                    hazardous, speed, speed * 3600, speed * 3600 * MILES_PER_KM,
+                    close_approach_date, f'{close_approach_date} 12:00', 0,
+                    'Earth' if rng.random() < 0.95 else 'Mars',
+                    miss_km / KM_PER_AU, miss_km / KM_PER_LUNAR_DISTANCE, miss_km, miss_km * MILES_PER_KM,
+                ])
+            written += min(day_rows, neo_count)
+    return written
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Synthetic Near Earth Object csv generator')
+    parser.add_argument('filename', type=str, help='Name of the csv file to write')
+    parser.add_argument('--neos', type=int, default=1000, help='Number of unique Near Earth Objects')
+    parser.add_argument('--approaches', type=int, default=10, help='Average number of close approaches per NEO')
+    parser.add_argument('--start_date', type=str, default='2020-01-01', help='First close approach date, YYYY-MM-DD')
+    parser.add_argument('--days', type=int, default=365, help='Number of days the close approaches are spread over')
+    parser.add_argument('--hazardous_ratio', type=float, default=0.1, help='Share of potentially hazardous NEOs')
+    parser.add_argument('--seed', type=int, default=42, help='Seed of the random generator')
+    args = parser.parse_args()
+
+    rows = write_neo_csv(args.filename, neo_count=args.neos, approaches_per_neo=args.approaches,
+                         start_date=args.start_date, days=args.days, hazardous_ratio=args.hazardous_ratio,
+                         seed=args.seed)
+    print(f'Written {rows} close approaches of {args.neos} NEOs to {args.filename}')
@@ -0,0 +1,136 @@
+from collections import OrderedDict, namedtuple
+import threading
+
+
+class ResultCache(object):
+    """
+    Least recently used cache of search results, bounded by a number of entries and by the total number of cached
+    result rows, a NearEarthObject counting one row plus one per orbit it holds.
+
+    An entry holds the results of a query without its number: the first `number` results, or all of them when the
+    search returned fewer. A query with a smaller number reuses the first results of an entry.
+
+    Entries are tied to the version of the NEODatabase they were computed on, and the whole cache is cleared as soon
+    as a different version is requested, i.e. after the database loaded or ingested data.
+    """
+
+    Entry = namedtuple('Entry', ['results', 'number', 'rows'])
+
+    def __init__(self, max_entries=128, max_rows=100000):
+        """
+        :param max_entries: int representing the maximum number of cached queries
+        :param max_rows: int representing the maximum number of result rows held by all the cached queries
+        """
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        self.entries = OrderedDict()  # Storing the entries from the least to the most recently used
+        self.rows = 0
+        self.version = None  # Storing the NEODatabase version of the cached entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    @staticmethod
+    def key(query):
+        """
+        Normalizes a Query.Selectors without its number: a date equal to a day is the range from the day to the day,
+        and the order of the filters does not change the results. The first results of an ordered query are the
+        first results of the same query with a greater number, as for the other queries.
+
+        :param query: Query.Selectors object with query information
+        :return: tuple identifying the results of the query
+        """
+        date_window = (None, None)
+        if query.date_search:
+            values = query.date_search[0].values
+            date_window = (values[0], values[0]) if query.date_search[0].type.value == "equals" else tuple(values[0:2])
+        filters = tuple(sorted(((_filter.field, _filter.comparison, _filter.compiled_value)
+                                for _filter in query.filters), key=repr))
+        return date_window, filters, query.return_object.__name__, query.order
+
+    @staticmethod
+    def count_rows(results):
+        """
+        :param results: list of NearEarthObjects or OrbitPaths
+        :return: int representing the number of rows held by the results
+        """
+        return sum(1 + len(getattr(result, "orbits", ())) for result in results)
+
+    @staticmethod
+    def is_complete(entry):
+        """
+        :param entry: ResultCache.Entry
+        :return: bool representing if the entry holds all the results of its query
+        """
+        return entry.number is None or len(entry.results) < entry.number
+
+    def get(self, query, version):
+        """
+        :param query: Query.Selectors object with query information
+        :param version: int representing the version of the searched NEODatabase
+        :return: list of the cached results of the query, or None on a miss
+        """
+        key = ResultCache.key(query)
+        with self.lock:
+            if version != self.version:
+                self.clear_entries(version)
+            entry = self.entries.get(key)
+            if entry is not None and (ResultCache.is_complete(entry)
+                                      or query.number is not None and query.number <= entry.number):
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry.results[:query.number]
+            self.misses += 1
+            return None
+
+    def put(self, query, version, results):
+        """
+        Caches the results of a query, evicting the least recently used entries over the bounds.
+
+        :param query: Query.Selectors object with query information
+        :param version: int representing the version of the NEODatabase the results were computed on
+        :param results: list of the results of the query
+        :return: None
+        """
+        rows = ResultCache.count_rows(results)
+        if rows > self.max_rows or self.max_entries <= 0:
+            return None
+
+        key = ResultCache.key(query)
+        with self.lock:
+            # Results computed while data was added are already out of date
+            if version != self.version:
+                return None
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.rows -= previous.rows
+            self.entries[key] = ResultCache.Entry(list(results), query.number, rows)
+            self.rows += rows
+            while len(self.entries) > self.max_entries or self.rows > self.max_rows:
+                _, evicted = self.entries.popitem(last=False)
+                self.rows -= evicted.rows
+                self.evictions += 1
+        return None
+
+    def clear_entries(self, version):
+        """
+        Drops every entry, the following entries are cached for version. Called with the lock held.
+
+        :param version: int representing the version of the NEODatabase
+        :return: None
+        """
+        self.entries.clear()
+        self.rows = 0
+        self.version = version
+
+    def stats(self):
+        """
+        :return: dict of the counters and the size of the cache
+        """
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'entries': len(self.entries), 'rows': self.rows}
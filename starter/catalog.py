@@ -0,0 +1,282 @@
+#!/usr/bin/env python
+#  -*- coding: utf-8 -*-
+
+"""
+Date-partitioned catalog of close approach data.
+
+A catalog is a directory of csv partitions, one per month or per year of close approach dates, holding the columns
+loaded by NEODatabase, and a manifest.json listing each partition with the first and last close approach dates of its
+rows. A search only reads the partitions overlapping its DateSearch range, so its load cost depends on the query window
+rather than on the size of the catalog. The databases of recently used partitions are kept in memory, up to a memory
+budget.
+
+Near Earth Objects are built from the loaded partitions only: the orbits of a NearEarthObject result, and the orbits
+its orbit filters are checked on, are its close approaches in the partitions overlapping the query window, not every
+close approach of the catalog. They are in the order of the partitions, then of the rows of the data file.
+
+Build a catalog from the `/starter` directory with:
+catalog.py data/neo_data.csv data/catalog [--granularity month]
+"""
+
+import argparse
+from collections import Counter, OrderedDict, namedtuple
+import copy
+import csv
+from itertools import chain
+import json
+import os
+import sys
+import threading
+
+from database import NEODatabase, iter_loaded_rows
+from models import LOADED_COLUMNS
+
+MANIFEST = 'manifest.json'
+
+# Length of the YYYY-MM-DD prefix naming the partition of a close approach date
+Granularities = {'month': 7, 'year': 4}
+
+Partition = namedtuple('Partition', ['key', 'filename', 'first_date', 'last_date', 'rows'])
+
+
+def build_catalog(filename, directory, granularity='month', max_open_files=32):
+    """
+    Writes the close approaches of a csv, Arrow IPC or Parquet file to a catalog directory, one csv partition per
+    month or year, keeping the order of the rows of the file within each partition.
+
+    :param filename: str representing the pathway of the data file
+    :param directory: str representing the pathway of the catalog directory, created if needed
+    :param granularity: str representing the period of a partition, month or year
+    :param max_open_files: int representing the maximum number of partitions written at the same time
+    :return: list of the Partitions of the catalog, by date
+    """
+    if granularity not in Granularities:
+        raise Exception('granularity: `{}` not supported. Available granularities: `{}`'.format(
+            granularity, ', '.join(Granularities)))
+    os.makedirs(directory, exist_ok=True)
+    remove_partitions(directory)
+
+    date_position = LOADED_COLUMNS.index('close_approach_date')
+    prefix = Granularities[granularity]
+    bounds = {}  # Storing a dict of the partition key to its first date, last date and number of rows
+    writers = OrderedDict()  # Storing the open partitions, from the least to the most recently written
+    try:
+        for row in iter_loaded_rows(filename):
+            close_approach_date = row[date_position]
+            key = close_approach_date[:prefix]
+            writer = writers.get(key)
+            if writer is None:
+                new_partition = key not in bounds
+                partition_file = open(os.path.join(directory, f'{key}.csv'), 'w' if new_partition else 'a',
+                                      newline='')
+                writer = writers[key] = (partition_file, csv.writer(partition_file))
+                if new_partition:
+                    writer[1].writerow(LOADED_COLUMNS)
+                    bounds[key] = [close_approach_date, close_approach_date, 0]
+                if len(writers) > max_open_files:
+                    writers.popitem(last=False)[1][0].close()
+            else:
+                writers.move_to_end(key)
+            writer[1].writerow(row)
+            partition_bounds = bounds[key]
+            partition_bounds[0] = min(partition_bounds[0], close_approach_date)
+            partition_bounds[1] = max(partition_bounds[1], close_approach_date)
+            partition_bounds[2] += 1
+    finally:
+        for partition_file, _ in writers.values():
+            partition_file.close()
+
+    partitions = [Partition(key, f'{key}.csv', *bounds[key]) for key in sorted(bounds)]
+    manifest = {'granularity': granularity, 'columns': list(LOADED_COLUMNS),
+                'partitions': [partition._asdict() for partition in partitions]}
+    temporary_filename = os.path.join(directory, f'{MANIFEST}.{os.getpid()}.tmp')
+    with open(temporary_filename, 'w') as manifest_file:
+        json.dump(manifest, manifest_file, indent=2)
+    os.replace(temporary_filename, os.path.join(directory, MANIFEST))
+    return partitions
+
+
+def remove_partitions(directory):
+    """
+    Removes the partitions listed by the manifest of a catalog directory, if any.
+
+    :param directory: str representing the pathway of the catalog directory
+    :return: None
+    """
+    manifest_filename = os.path.join(directory, MANIFEST)
+    if not os.path.exists(manifest_filename):
+        return None
+    with open(manifest_filename) as manifest_file:
+        manifest = json.load(manifest_file)
+    for partition in manifest['partitions']:
+        partition_filename = os.path.join(directory, partition['filename'])
+        if os.path.exists(partition_filename):
+            os.remove(partition_filename)
+    os.remove(manifest_filename)
+    return None
+
+
+class Catalog(object):
+    """
+    Reader of a catalog directory, loading the partitions overlapping a query window into a NEODatabase.
+
+    Each partition is loaded into its own NEODatabase, which is cached from the least to the most recently used
+    partition, so that overlapping query windows share the Near Earth Objects built for their common partitions. A
+    partition database is never modified once loaded, so the searches of several threads can share it. Once the
+    estimated memory of the cached partition databases exceeds memory_budget, the least recently used partitions are
+    dropped.
+
+    The database of a query is the database of its partition, or the merge of the databases of its partitions: only the
+    Near Earth Objects approaching in several of the partitions are copied, to hold the orbits of all of them.
+    """
+
+    def __init__(self, directory, memory_budget=256 * 1024 * 1024):
+        """
+        :param directory: str representing the pathway of the catalog directory
+        :param memory_budget: int representing the estimated bytes of cached partition databases, 0 to disable the
+        cache
+        """
+        self.directory = directory
+        self.memory_budget = memory_budget
+        with open(os.path.join(directory, MANIFEST)) as manifest_file:
+            manifest = json.load(manifest_file)
+        self.granularity = manifest['granularity']
+        self.partitions = [Partition(**partition) for partition in manifest['partitions']]
+        self.cached = OrderedDict()  # Storing a dict of the partition key to its database and its estimated bytes
+        self.cached_bytes = 0
+        self.reads = 0
+        self.hits = 0
+        self.lock = threading.Lock()
+
+    def select_partitions(self, date_search):
+        """
+        Partition pruning: keeps the partitions whose date bounds overlap the DateSearch range.
+
+        :param date_search: list of the DateSearch of a Query.Selectors
+        :return: list of the Partitions overlapping the range, by date
+        """
+        if not date_search:
+            return list(self.partitions)
+        values = date_search[0].values
+        if date_search[0].type.value == "equals":
+            start_date, end_date = values[0], values[0]
+        elif date_search[0].type.value == "between":
+            start_date, end_date = values[0], values[1]
+        else:
+            raise Exception("{} filter not supported for date".format(str(date_search[0].type.value)))
+        return [partition for partition in self.partitions
+                if (start_date is None or partition.last_date >= start_date)
+                and (end_date is None or partition.first_date <= end_date)]
+
+    def read_partition(self, partition):
+        """
+        :param partition: Partition of the catalog
+        :return: NEODatabase loaded with the rows of the partition, shared by the queries on the partition
+        """
+        with self.lock:
+            entry = self.cached.get(partition.key)
+            if entry is not None:
+                self.cached.move_to_end(partition.key)
+                self.hits += 1
+                return entry[0]
+
+        db = NEODatabase(filename=os.path.join(self.directory, partition.filename))
+        db.add_rows(LOADED_COLUMNS, iter_loaded_rows(db.filename))
+        db.build_date_index()
+        db.version += 1
+        # The cache is disabled without a memory budget, the database is not measured
+        size = Catalog.estimate_bytes(db) if self.memory_budget else None
+        with self.lock:
+            self.reads += 1
+            if size is not None and size <= self.memory_budget and partition.key not in self.cached:
+                self.cached[partition.key] = (db, size)
+                self.cached_bytes += size
+                while self.cached_bytes > self.memory_budget:
+                    _, (_, evicted_size) = self.cached.popitem(last=False)
+                    self.cached_bytes -= evicted_size
+        return db
+
+    @staticmethod
+    def estimate_bytes(db):
+        """
+        :param db: NEODatabase of a partition
+        :return: int representing the estimated bytes of its NearEarthObject and OrbitPath instances, with their str
+        and float values and their lists and dicts. The interned dates and orbiting bodies are shared, not counted.
+        """
+        size = sys.getsizeof(db.neo_object_db) + sys.getsizeof(db.date_neo_db) + sys.getsizeof(db.sorted_dates)
+        size += sum(map(sys.getsizeof, db.date_neo_db.values()))
+        for neo in db.neo_object_db.values():
+            size += (sys.getsizeof(neo) + sys.getsizeof(neo.id) + sys.getsizeof(neo.name) + sys.getsizeof(neo.orbits)
+                     + sys.getsizeof(neo.diameter_min_km) + sys.getsizeof(neo.diameter_max_km))
+            size += sum(sys.getsizeof(orbit) + sys.getsizeof(orbit.miss_distance_kilometers)
+                        + sys.getsizeof(orbit.miss_distance_miles) for orbit in neo.orbits)
+        return size
+
+    def database(self, date_search):
+        """
+        :param date_search: list of the DateSearch of a Query.Selectors
+        :return: NEODatabase of the partitions overlapping the DateSearch range
+        """
+        databases = list(map(self.read_partition, self.select_partitions(date_search)))
+        if len(databases) == 1:
+            return databases[0]
+        return Catalog.merge_databases(self.directory, databases)
+
+    @staticmethod
+    def merge_databases(directory, databases):
+        """
+        Merges the databases of partitions, which hold disjoint dates. A Near Earth Object of a single partition is
+        shared with its partition database. A Near Earth Object of several partitions is copied, with copies of its
+        orbits of each partition referring back to the copy, in the order of the partitions.
+
+        :param directory: str representing the pathway of the catalog directory
+        :param databases: list of the NEODatabases of the partitions, by date
+        :return: NEODatabase of the partitions
+        """
+        db = NEODatabase(filename=directory)
+        partition_counts = Counter(chain.from_iterable(partition_db.neo_object_db for partition_db in databases))
+        merged_neos = {}  # Storing a dict of the name of a Near Earth Object of several partitions to its copy
+        merged_dates = set()  # Storing the dates of the orbits of the copied Near Earth Objects
+        for partition_db in databases:
+            for name, neo in partition_db.neo_object_db.items():
+                if partition_counts[name] == 1:
+                    db.neo_object_db[name] = neo
+                    continue
+                merged_neo = merged_neos.get(name)
+                if merged_neo is None:
+                    merged_neo = merged_neos[name] = db.neo_object_db[name] = neo.with_orbits([])
+                for orbit in neo.orbits:
+                    merged_orbit = copy.copy(orbit)
+                    merged_orbit.neo = merged_neo
+                    merged_neo.orbits.append(merged_orbit)
+                    merged_dates.add(orbit.close_approach_date)
+
+        for partition_db in databases:
+            for date, neos in partition_db.date_neo_db.items():
+                if date in merged_dates:
+                    neos = [merged_neos.get(neo.name, neo) for neo in neos]
+                db.date_neo_db[date] = neos
+        db.build_date_index()
+        db.version += 1
+        return db
+
+    def stats(self):
+        """
+        :return: dict of the partition reads and cache hits, and the size of the partition cache
+        """
+        with self.lock:
+            return {'partitions': len(self.partitions), 'reads': self.reads, 'hits': self.hits,
+                    'cached': len(self.cached), 'cached_bytes': self.cached_bytes}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build a date-partitioned catalog of close approach data')
+    parser.add_argument('filename', type=str, help='Name of the input csv, Arrow IPC or Parquet data file')
+    parser.add_argument('directory', type=str, help='Name of the catalog directory to write')
+    parser.add_argument('--granularity', choices=list(Granularities), default='month',
+                        help='Period of the close approach dates of each partition')
+    args = parser.parse_args()
+
+    partitions = build_catalog(args.filename, args.directory, args.granularity)
+    print(f'Written {sum(partition.rows for partition in partitions)} close approaches to {len(partitions)} '
+          f'partitions in {args.directory}')
@@ -0,0 +1,229 @@
+from datetime import date
+from itertools import islice
+
+from exceptions import UnsupportedFeature
+from models import NearEarthObject, OrbitPath
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class ColumnarStore(object):
+    """
+    Optional columnar storage of the Near Earth Objects and their orbits, backed by NumPy arrays.
+
+    Each unique Near Earth Object is a row of the NEO columns, numbered in the order they are first seen in the data,
+    and each close approach is a row of the orbit columns pointing back to the row of its Near Earth Object. Filters
+    are evaluated as boolean masks over whole columns, and NearEarthObject and OrbitPath instances are only built for
+    the rows returned by a search.
+    """
+
+    # Encoding of is_potentially_hazardous_asteroid in the hazardous column
+    Hazardous = {False: 0, True: 1, None: -1}
+
+    def __init__(self):
+        if np is None:
+            raise UnsupportedFeature('The columnar backend requires NumPy, please install numpy')
+
+        self.neo_rows = {}  # Storing a dict of the Near Earth Object name to its NEO row
+
+        # NEO columns
+        self.ids = []
+        self.names = []
+        self.diameter_min_km = []
+        self.diameter_max_km = []
+        self.hazardous = []
+
+        # Orbit columns
+        self.orbit_neo_row = []
+        self.orbit_date = []
+        self.orbit_body = []
+        self.miss_distance_km = []
+        self.miss_distance_miles = []
+
+        self.bodies = {}  # Storing a dict of the orbiting body name to its code in the orbit_body column
+
+    def append(self, entry):
+        """
+        Adds a csv row to the columns, adding its Near Earth Object on the first row of the Near Earth Object.
+
+        :param entry: dict of attributes about a given close approach, as read from the csv file
+        :return: None
+        """
+        neo_row = self.neo_rows.get(entry["name"])
+        if neo_row is None:
+            neo = NearEarthObject(**entry)
+            neo_row = len(self.names)
+            self.neo_rows[neo.name] = neo_row
+            self.ids.append(neo.id)
+            self.names.append(neo.name)
+            self.diameter_min_km.append(neo.diameter_min_km)
+            self.diameter_max_km.append(neo.diameter_max_km)
+            self.hazardous.append(ColumnarStore.Hazardous[neo.is_potentially_hazardous_asteroid])
+
+        body = self.bodies.setdefault(entry["orbiting_body"], len(self.bodies))
+        self.orbit_neo_row.append(neo_row)
+        self.orbit_date.append(date.fromisoformat(entry["close_approach_date"]).toordinal())
+        self.orbit_body.append(body)
+        self.miss_distance_km.append(float(entry["miss_distance_kilometers"]))
+        self.miss_distance_miles.append(float(entry["miss_distance_miles"]))
+
+    def freeze(self):
+        """
+        Converts the appended columns into NumPy arrays and builds the date and NEO orderings of the orbit rows.
+
+        :return: ColumnarStore
+        """
+        for column in ("diameter_min_km", "diameter_max_km", "miss_distance_km", "miss_distance_miles"):
+            setattr(self, column, np.array(getattr(self, column), dtype=np.float64))
+        self.hazardous = np.array(self.hazardous, dtype=np.int8)
+        self.orbit_neo_row = np.array(self.orbit_neo_row, dtype=np.int64)
+        self.orbit_date = np.array(self.orbit_date, dtype=np.int32)
+        self.orbit_body = np.array(self.orbit_body, dtype=np.int16)
+        self.body_names = sorted(self.bodies, key=self.bodies.get)
+
+        # Orbit rows in date order, and the matching sorted dates for binary searches on a date range
+        self.date_order = np.argsort(self.orbit_date, kind="stable")
+        self.sorted_orbit_date = self.orbit_date[self.date_order]
+
+        # Orbit rows grouped by NEO row: the orbits of NEO row `n` are neo_orbits[neo_offsets[n]:neo_offsets[n + 1]]
+        self.neo_orbits = np.argsort(self.orbit_neo_row, kind="stable")
+        self.neo_offsets = np.zeros(len(self.names) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.orbit_neo_row, minlength=len(self.names)), out=self.neo_offsets[1:])
+        return self
+
+    def date_range_rows(self, date_search):
+        """
+        :param date_search: list with the Query.DateSearch to apply
+        :return: array of the orbit rows matching the date search
+        """
+        if not date_search:
+            return self.date_order
+
+        filter_type = date_search[0].type.value
+        filter_values = date_search[0].values
+        if filter_type == "equals":
+            start_date, end_date = filter_values[0], filter_values[0]
+        elif filter_type == "between":
+            start_date, end_date = filter_values[0], filter_values[1]
+        else:
+            raise Exception("{} filter not supported for date".format(str(filter_type)))
+
+        low = 0
+        high = len(self.sorted_orbit_date)
+        if start_date is not None:
+            low = np.searchsorted(self.sorted_orbit_date, date.fromisoformat(start_date).toordinal(), side="left")
+        if end_date is not None:
+            high = np.searchsorted(self.sorted_orbit_date, date.fromisoformat(end_date).toordinal(), side="right")
+        return self.date_order[low:high]
+
+    def neo_mask(self, _filter):
+        """
+        :param _filter: Filter on a NEO field
+        :return: boolean mask over the NEO rows
+        """
+        if _filter.field == "diameter":
+            return _filter.operation(self.diameter_min_km, _filter.typed_value)
+        elif _filter.field == "is_hazardous":
+            # Same compiled test as Filter.apply, evaluated once per hazardous code instead of once per NEO
+            codes = [code for hazardous, code in ColumnarStore.Hazardous.items() if _filter.test(hazardous)]
+            return np.isin(self.hazardous, codes)
+        raise Exception(
+            "Key: `{}` not found or Filter on key: `{}` is currently not supported. Available filter keys: `{}`".
+            format(str(_filter.field), str(_filter.field), "diameter, is_hazardous"))
+
+    def orbit_mask(self, _filter):
+        """
+        :param _filter: Filter on an orbit field
+        :return: boolean mask over the orbit rows
+        """
+        if _filter.field == "distance":
+            return _filter.operation(self.miss_distance_km, _filter.typed_value)
+        raise Exception(
+            "Key: `{}` not found or Filter on key: `{}` is currently not supported. Available filter keys: `{}`".
+            format(str(_filter.field), str(_filter.field), "distance"))
+
+    def neo_object(self, neo_row, orbit_rows):
+        """
+        Materializes a NearEarthObject with the OrbitPaths of orbit_rows.
+
+        :param neo_row: int representing the NEO row
+        :param orbit_rows: array of the orbit rows of the Near Earth Object to include
+        :return: NearEarthObject
+        """
+        neo = NearEarthObject(**{
+            "id": self.ids[neo_row],
+            "name": self.names[neo_row],
+            "estimated_diameter_min_kilometers": self.diameter_min_km[neo_row],
+            "estimated_diameter_max_kilometers": self.diameter_max_km[neo_row],
+            "is_potentially_hazardous_asteroid": {0: False, 1: True}.get(int(self.hazardous[neo_row])),
+        })
+        for orbit_row in orbit_rows:
+            neo.update_orbits(self.orbit_path(orbit_row), False)
+        return neo
+
+    def orbit_path(self, orbit_row):
+        """
+        Materializes the OrbitPath of an orbit row.
+
+        :param orbit_row: int representing the orbit row
+        :return: OrbitPath
+        """
+        neo_row = self.orbit_neo_row[orbit_row]
+        return OrbitPath(**{
+            "id": self.ids[neo_row],
+            "name": self.names[neo_row],
+            "orbiting_body": self.body_names[self.orbit_body[orbit_row]],
+            "close_approach_date": date.fromordinal(int(self.orbit_date[orbit_row])).isoformat(),
+            "miss_distance_kilometers": self.miss_distance_km[orbit_row],
+            "miss_distance_miles": self.miss_distance_miles[orbit_row],
+        })
+
+    def iter_objects(self, query):
+        """
+        Columnar implementation of NEOSearcher.iter_objects, returning the same results. The filters are evaluated
+        over whole columns, then the results are materialized lazily until query.number results have been produced.
+
+        :param query: Query.Selectors object with query information
+        :return: generator of NearEarthObjects or OrbitalPaths
+        """
+        if query.return_object not in (NearEarthObject, OrbitPath):
+            raise Exception("return_object: `{}` not found. Available return_objects: `{}`".
+                            format(str(query.return_object), str(", ".join(["NEO", "Path"]))))
+
+        # 1. NEO rows with an orbit matching the date search, in the chronological order of their first orbit
+        window_neo_rows = self.orbit_neo_row[self.date_range_rows(query.date_search)]
+        candidates, first_index = np.unique(window_neo_rows, return_index=True)
+        candidates = candidates[np.argsort(first_index, kind="stable")]
+
+        # 2. NEO filters as masks over the NEO rows
+        neo_filters = [_filter for _filter in query.filters if _filter.object == "NEO"]
+        orbit_filters = [_filter for _filter in query.filters if _filter.object == "Path"]
+        if neo_filters:
+            neo_mask = np.ones(len(self.names), dtype=bool)
+            for _filter in neo_filters:
+                neo_mask &= self.neo_mask(_filter)
+            candidates = candidates[neo_mask[candidates]]
+
+        # 3. Orbit filters as masks over the orbit rows, keeping the NEOs with at least one matching orbit
+        orbit_mask = None
+        if orbit_filters:
+            orbit_mask = np.ones(len(self.orbit_neo_row), dtype=bool)
+            for _filter in orbit_filters:
+                orbit_mask &= self.orbit_mask(_filter)
+            has_orbit = np.zeros(len(self.names), dtype=bool)
+            has_orbit[self.orbit_neo_row[orbit_mask]] = True
+            candidates = candidates[has_orbit[candidates]]
+
+        # 4. Materialize the requested number of return objects
+        def orbit_rows(neo_row):
+            rows = self.neo_orbits[self.neo_offsets[neo_row]:self.neo_offsets[neo_row + 1]]
+            return rows if orbit_mask is None else rows[orbit_mask[rows]]
+
+        if query.return_object == NearEarthObject:
+            results = (self.neo_object(neo_row, orbit_rows(neo_row)) for neo_row in candidates)
+        else:
+            results = (self.orbit_path(orbit_row) for neo_row in candidates for orbit_row in orbit_rows(neo_row))
+        yield from islice(results, query.number)
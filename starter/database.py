@@ -1,5 +1,21 @@
-from models import OrbitPath, NearEarthObject
+import arrow_io
+from columnar import ColumnarStore
+from indexes import SortedIndex
+from rollups import DateRollups
+from models import LOADED_COLUMNS, OrbitPath, NearEarthObject
+from snapshot import read_snapshot, write_snapshot
+from sqlite_store import SQLiteStore
+from exceptions import MalformedRow, UnsupportedFeature
+from bisect import bisect_left, bisect_right, insort
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from itertools import islice
+from operator import itemgetter
 import csv
+import gc
+import io
+import os
+import sys
 
 class NEODatabase(object):
     """
@@ -8,11 +24,42 @@ class NEODatabase(object):
     To support optimized date searching, a dict mapping of all orbit date paths to the Near Earth Objects
     recorded on a given day is maintained. Additionally, all unique instances of a Near Earth Object
     are contained in a dict mapping the Near Earth Object name to the NearEarthObject instance.
+
+    The orbit dates of date_neo_db are also kept in a sorted list, so that date searches can locate the
+    matching dates with a binary search instead of scanning every date in the database.
+
+    With the optional columnar backend, the data is instead loaded into a ColumnarStore of NumPy arrays, and searches
+    evaluate their filters over whole columns at once. With the optional sqlite backend, the data is loaded into the
+    indexed tables of a SQLiteStore database file, and searches are translated into SQL queries.
+
+    When snapshots are enabled, the parsed state is saved to a binary snapshot next to the csv file the first time
+    it is loaded, and later loads reuse the snapshot until the size or modification time of the csv file changes.
+
+    Once loaded, new close approaches are added in place with ingest, either from a delta csv file or from the rows
+    appended to a csv file since it was last read. Approaches already in the database are skipped. Every load and
+    every ingest adding approaches increments version, so that derived data such as cached results can detect the
+    change.
+
+    Optional secondary indexes keep the Near Earth Objects sorted by diameter_min_km and the orbits sorted by
+    miss_distance_kilometers, so that selective diameter and distance filters can be answered with a binary search.
+
+    Optional rollups keep per date aggregates of the close approaches next to date_neo_db, so that counts and minimum
+    miss distances over a range of dates are answered without reading the Near Earth Objects, see DateRollups.
     """
 
-    def __init__(self, filename):
+    # Attributes holding the parsed state of a csv file, saved to and restored from its snapshot
+    SnapshotAttributes = ('date_neo_db', 'neo_object_db', 'sorted_dates', 'columnar_store')
+
+    def __init__(self, filename, columnar=False, snapshot=False, indexes=False, sqlite=False, rollups=False):
         """
         :param filename: str representing the pathway of the filename containing the Near Earth Object data
+        :param columnar: bool flag to load the data into the NumPy backed ColumnarStore instead of the dicts
+        :param snapshot: bool flag to load from and save to a binary snapshot of the parsed csv file, or with the
+                         sqlite backend to reuse the SQLite database file of an unchanged csv file
+        :param indexes: bool flag to maintain the secondary indexes on diameter and miss distance
+        :param sqlite: bool flag to load the data into the SQLiteStore database file next to the csv file instead of
+                       the dicts
+        :param rollups: bool flag to maintain the DateRollups of the close approaches
         """
         # TODO: What data structures will be needed to store the NearEarthObjects and OrbitPaths? -> dict
         # TODO: Add relevant instance variables for this.
@@ -20,14 +67,39 @@ class NEODatabase(object):
         self.filename = filename
         self.date_neo_db = {} # Storing a dict of orbit date to list of NearEarthObject instances
         self.neo_object_db = {} # Storing a dict of the Near Earth Object name to the single instance of NearEarthObject
+        self.sorted_dates = [] # Storing the sorted list of the orbit dates in date_neo_db
+        self.columnar = columnar
+        self.columnar_store = None # Storing the ColumnarStore of the columnar backend
+        self.snapshot = snapshot
+        self.version = 0 # Incremented each time data is loaded or ingest adds approaches to the loaded data
+        self.approach_keys = None # Storing the set of (id, date, body) keys of the approaches, built by the first ingest
+        self.file_offsets = {} # Storing a dict of the csv filename to the byte offset its rows have been read up to
+        self.indexes = indexes
+        self.diameter_index = None # Storing the SortedIndex of the NearEarthObjects on diameter_min_km
+        self.distance_index = None # Storing the SortedIndex of the OrbitPaths on miss_distance_kilometers
+        self.date_positions = None # Storing a dict of orbit date to the first position of each NearEarthObject
+        self.sqlite = sqlite
+        self.sqlite_store = None # Storing the SQLiteStore of the sqlite backend
+        self.rollups = rollups
+        self.date_rollups = None # Storing the DateRollups of the close approaches
 
-    def load_data(self, filename=None):
+    def load_data(self, filename=None, workers=1):
         """
         Loads data from a .csv file, instantiating Near Earth Objects and their OrbitPaths by:
            - Storing a dict of orbit date to list of NearEarthObject instances -> dict('orbitDate': List[NearEarthObject])
            - Storing a dict of the Near Earth Object name to the single instance of NearEarthObject -> dict('name': NearEarthObject)
 
+        With more than one worker, the csv file is split into byte ranges on row boundaries, the ranges are parsed
+        into columns of values in a pool of processes and the objects are built from the columns in file order, giving
+        the same database as the serial load.
+
+        Arrow IPC (.arrow, .feather) and Parquet (.parquet) files with the columns of the csv export are loaded as
+        well, reading only the columns used by NearEarthObject and OrbitPath. They require pyarrow.
+
+        Loading a csv file into a database already holding data ingests it: see ingest.
+
         :param filename:
+        :param workers: int representing the number of processes parsing the csv file
         :return: None
         """
 
@@ -39,33 +111,578 @@ class NEODatabase(object):
         # TODO: Load data from csv file.
         # TODO: Where will the data be stored?
 
+        # Loading into a database holding data is an ingest, skipping the approaches already loaded
+        if not self.columnar and not self.sqlite and not self.is_empty():
+            self.ingest(filename)
+            return None
+
+        # The options are checked before a snapshot or an existing sqlite database is reused
+        if self.sqlite:
+            if workers > 1:
+                raise UnsupportedFeature('Parallel loading is not supported by the sqlite backend')
+            if self.indexes:
+                raise UnsupportedFeature('Secondary indexes are not supported by the sqlite backend, '
+                                         'its tables are always indexed')
+            if self.rollups:
+                raise UnsupportedFeature('Rollups are not supported by the sqlite backend')
+        elif self.columnar:
+            if workers > 1:
+                raise UnsupportedFeature('Parallel loading is not supported by the columnar backend')
+            if self.indexes:
+                raise UnsupportedFeature('Secondary indexes are not supported by the columnar backend')
+            if self.rollups:
+                raise UnsupportedFeature('Rollups are not supported by the columnar backend')
+        elif workers > 1 and arrow_io.is_arrow_file(filename):
+            raise UnsupportedFeature('Parallel loading is only supported for csv files')
+
+        if self.sqlite:
+            store = SQLiteStore(SQLiteStore.database_filename(filename))
+            # The rows are loaded in a single transaction, unless the database already holds the unchanged file
+            if not (self.snapshot and store.is_loaded_from(filename)):
+                store.load(iter_loaded_rows(filename), filename)
+            if self.sqlite_store is not None:
+                self.sqlite_store.close()
+            self.sqlite_store = store
+            self.version += 1
+            return None
+
+        # Rows appended to the csv file after this offset are read by the next tail ingest. Rows appended during the
+        # load may be read twice, the ingest skips them.
+        offset = os.path.getsize(filename)
+
+        # Snapshots only hold the state of a single csv file, so they are not used when adding to loaded data
+        use_snapshot = self.snapshot and self.is_empty()
+        if use_snapshot:
+            state = read_snapshot(filename, self.backend_kind())
+            if state is not None and set(state) == set(NEODatabase.SnapshotAttributes):
+                self.__dict__.update(state)
+                self.file_offsets[filename] = offset
+                self.build_secondary_indexes()
+                self.build_rollups()
+                self.version += 1
+                return None
+
         """
         Reading neo_data.csv as dictionary and populating NearEarthObject and OrbitPath
         and initialising our two databases declared in __init__
         """
-        with open(filename, 'r') as neo_data_file:
-            reader = csv.DictReader(neo_data_file)
-            for entry in reader:
-                #print entry
-                _orbit_date = entry["close_approach_date"]
-                _neo_name = entry["name"]
-                _neo_object = NearEarthObject(**entry)
-                _orbit_path_object = OrbitPath(**entry)
-
-                # Update date_orbit_db (Here storing neo_objects without orbit details)
-                if _orbit_date in self.date_neo_db:
-                    updated_neo_list = self.date_neo_db[_orbit_date] + [_neo_object]
-                    self.date_neo_db[_orbit_date] = updated_neo_list
-                else:
-                    self.date_neo_db[_orbit_date] = [_neo_object]
-
-                # Update neo_object_db (Here neo_objects are having orbit details)
-                if _neo_name in self.neo_object_db:
-                    curr_neo_obj = self.neo_object_db[_neo_name]
-                    curr_neo_obj.update_orbits(_orbit_path_object, False)
-                    self.neo_object_db[_neo_name] = curr_neo_obj
-                else:
-                    _neo_object.update_orbits(_orbit_path_object, False)
-                    self.neo_object_db[_neo_name] = _neo_object
-
-        return None
\ No newline at end of file
+        if self.columnar:
+            store = ColumnarStore()
+            for entry in iter_entries(filename):
+                store.append(entry)
+            self.columnar_store = store.freeze()
+            self.version += 1
+            if use_snapshot:
+                self.save_snapshot(filename)
+            return None
+
+        with paused_garbage_collection():
+            if workers > 1:
+                for neo_columns, orbit_columns in load_chunks_in_parallel(filename, workers):
+                    self.add_columns(neo_columns, orbit_columns)
+            else:
+                self.add_file_rows(filename)
+
+        self.build_date_index()
+        self.build_secondary_indexes()
+        self.build_rollups()
+        self.file_offsets[filename] = offset
+        self.version += 1
+        if use_snapshot:
+            self.save_snapshot(filename)
+
+        return None
+
+    def ingest(self, filename=None, tail=False):
+        """
+        Adds the close approaches of a csv, Arrow IPC or Parquet file to the loaded database in place. Approaches are identified by their
+        Near Earth Object id, close approach date and orbiting body, and the approaches already in the database are
+        skipped, so the same delta can safely be ingested more than once.
+
+        With tail, only the rows appended to the csv file since it was last loaded or ingested are read, so refreshing
+        a growing csv file costs the size of the appended rows instead of the size of the whole file. A last row still
+        being written, without its line ending, is left for the next ingest. Arrow IPC and Parquet files are always
+        read whole.
+
+        A malformed csv row raises MalformedRow with its byte offset, once the rows before it are added. The next tail
+        ingest resumes after the malformed row, so a single bad row does not hold back the rows appended after it.
+
+        :param filename: str representing the pathway of the data file, the database filename by default
+        :param tail: bool flag to only read the rows appended since the last read of filename
+        :return: int representing the number of approaches added
+        """
+        if not (filename or self.filename):
+            raise Exception('Cannot ingest data, no filename provided')
+
+        filename = filename or self.filename
+
+        if self.columnar:
+            raise UnsupportedFeature('Incremental ingest is not supported by the columnar backend')
+        if self.sqlite:
+            raise UnsupportedFeature('Incremental ingest is not supported by the sqlite backend')
+
+        if self.approach_keys is None:
+            self.approach_keys = {(orbit.neo.id, orbit.close_approach_date, orbit.orbiting_body)
+                                  for neo in self.neo_object_db.values() for orbit in neo.orbits}
+
+        if arrow_io.is_arrow_file(filename):
+            if tail:
+                raise UnsupportedFeature('Tail ingest is only supported for csv files')
+            entries, rows_start, rows = arrow_io.iter_entries(filename), None, None
+        else:
+            entries, rows_start, rows = self.read_csv_rows(filename, tail)
+
+        known_dates = len(self.date_neo_db)
+        known_neos = len(self.neo_object_db)
+        added_orbits = []
+        try:
+            for entry in entries:
+                _orbit_path_object = self.ingest_entry(entry)
+                if _orbit_path_object is not None:
+                    added_orbits.append(_orbit_path_object)
+        except (csv.Error, KeyError, TypeError, ValueError) as e:
+            if rows is None:
+                raise
+            # Rows are single lines, the malformed row is the last line read by the csv reader
+            row_start = rows_start + line_end(rows, entries.line_num - 1)
+            self.file_offsets[filename] = rows_start + line_end(rows, entries.line_num)
+            raise MalformedRow(filename, row_start, e) from e
+        finally:
+            # The rows added before a malformed row are kept, the derived data is updated for them
+            self.update_ingested(known_dates, known_neos, added_orbits)
+
+        if rows is not None:
+            self.file_offsets[filename] = rows_start + len(rows)
+        return len(added_orbits)
+
+    def update_ingested(self, known_dates, known_neos, added_orbits):
+        """
+        Updates the sorted date index, the secondary indexes, the rollups and the version once close approaches are
+        ingested.
+
+        :param known_dates: int representing the number of dates of date_neo_db before the ingest
+        :param known_neos: int representing the number of Near Earth Objects of neo_object_db before the ingest
+        :param added_orbits: list of the OrbitPath instances added by the ingest
+        :return: None
+        """
+        # New dates are the last keys of date_neo_db. They are inserted into a copy of the sorted date index, which
+        # then replaces it at once, so that a search running meanwhile keeps walking a consistent date index.
+        if len(self.date_neo_db) > known_dates:
+            sorted_dates = list(self.sorted_dates)
+            for _orbit_date in islice(self.date_neo_db, known_dates, None):
+                insort(sorted_dates, _orbit_date)
+            self.sorted_dates = sorted_dates
+
+        if added_orbits and self.indexes:
+            # New Near Earth Objects are the last values of neo_object_db. The added objects are merged into the
+            # secondary indexes at once, rather than inserted one row at a time.
+            self.diameter_index.add_all(islice(self.neo_object_db.values(), known_neos, None))
+            self.distance_index.add_all(added_orbits)
+
+        if added_orbits:
+            if self.date_rollups is not None:
+                # The added approaches are counted into a copy of the rollups, which then replaces them at once
+                self.date_rollups = self.date_rollups.added(added_orbits)
+            self.version += 1
+        return None
+
+    def read_csv_rows(self, filename, tail=False):
+        """
+        :param filename: str representing the pathway of the csv file
+        :param tail: bool flag to only read the rows appended since the last read of filename
+        :return: tuple of the csv.DictReader of the complete rows read, the byte offset of the first of them and their
+        bytes
+        """
+        with open(filename, 'rb') as neo_data_file:
+            header = next(csv.reader([neo_data_file.readline().decode('utf-8')]))
+            start = self.file_offsets.get(filename, 0) if tail else 0
+            if start > os.fstat(neo_data_file.fileno()).st_size:
+                # The csv file was replaced by a shorter one, read it again from its first row
+                start = 0
+            if start > neo_data_file.tell():
+                # Resume at the first row starting at or after the offset
+                neo_data_file.seek(start - 1)
+                neo_data_file.readline()
+            rows_start = neo_data_file.tell()
+            rows = neo_data_file.read()
+
+        # Leave a partially written last row for the next ingest
+        rows = rows[:rows.rfind(b'\n') + 1]
+        entries = csv.DictReader(io.StringIO(rows.decode('utf-8'), newline=''), fieldnames=header)
+        return entries, rows_start, rows
+
+    def ingest_entry(self, entry):
+        """
+        Adds a csv row to the database unless its approach is already in the database. The sorted date index and the
+        secondary indexes are updated by ingest once the rows are added. The approach is only recorded as ingested once its row is added,
+        so that a malformed row leaves the database unchanged and its corrected row can be ingested later.
+
+        :param entry: dict of attributes about a given close approach, as read from the csv file
+        :return: OrbitPath of the added approach, or None if the approach was already in the database
+        """
+        _orbit_date = sys.intern(entry["close_approach_date"])
+        _approach_key = (entry["id"], _orbit_date, entry["orbiting_body"])
+        if _approach_key in self.approach_keys:
+            return None
+
+        _orbit_path_object = self.add_entry(entry)
+        self.approach_keys.add(_approach_key)
+        _neo_object = _orbit_path_object.neo
+        if self.indexes:
+            _date_neo_objects = self.date_neo_db[_orbit_date]
+            self.date_positions.setdefault(_orbit_date, {}).setdefault(_neo_object, len(_date_neo_objects) - 1)
+        return _orbit_path_object
+
+    def add_file_rows(self, filename):
+        """
+        Adds the rows of a csv, Arrow IPC or Parquet file to the database, read as tuples: see add_rows.
+
+        :param filename: str representing the pathway of the data file
+        :return: None
+        """
+        if arrow_io.is_arrow_file(filename):
+            self.add_rows(LOADED_COLUMNS, arrow_io.iter_rows(filename))
+            return None
+        with open(filename, 'r', newline='') as neo_data_file:
+            reader = csv.reader(neo_data_file)
+            self.add_rows(next(reader, []), reader)
+        return None
+
+    def add_rows(self, header, rows):
+        """
+        Adds rows to the database the same way as add_entry, from tuples of column values instead of dicts. The
+        positions of the columns used by NearEarthObject and OrbitPath are resolved once from the header, the other
+        columns are never read, and the columns of a Near Earth Object are only parsed on its first row.
+
+        :param header: list of the column names of the rows
+        :param rows: iterable of lists or tuples of column values
+        :return: None
+        """
+        (_id, _name, _diameter_min, _diameter_max, _hazardous,
+         _orbiting_body, _close_approach_date, _miss_kilometers, _miss_miles) = column_positions(header)
+        neo_object_db = self.neo_object_db
+        date_neo_db = self.date_neo_db
+
+        for row in rows:
+            _neo_name = row[_name]
+            _neo_object = neo_object_db.get(_neo_name)
+            if _neo_object is None:
+                _neo_object = NearEarthObject.from_values(
+                    row[_id], _neo_name, float(row[_diameter_min]), float(row[_diameter_max]),
+                    NearEarthObject.parse_hazardous(row[_hazardous]))
+                neo_object_db[_neo_name] = _neo_object
+            _orbit_path_object = OrbitPath.from_values(
+                _neo_object, row[_orbiting_body], row[_close_approach_date],
+                float(row[_miss_kilometers]), float(row[_miss_miles]))
+            _neo_object.orbits.append(_orbit_path_object)
+
+            _orbit_date = _orbit_path_object.close_approach_date
+            _date_neo_objects = date_neo_db.get(_orbit_date)
+            if _date_neo_objects is None:
+                date_neo_db[_orbit_date] = [_neo_object]
+            else:
+                _date_neo_objects.append(_neo_object)
+        return None
+
+    def add_entry(self, entry):
+        """
+        Adds a csv row to the database: its OrbitPath is added to the single NearEarthObject instance of its
+        name, built on the first row of the name, and the NearEarthObject is added to the list of its orbit date.
+        The row is parsed before the database is updated, so a malformed row raises and leaves the database unchanged.
+
+        :param entry: dict of attributes about a given close approach, as read from the csv file
+        :return: OrbitPath of the row
+        """
+        _neo_name = entry["name"]
+
+        # A NearEarthObject is only built for the first row of a Near Earth Object, the following rows
+        # only add their OrbitPath to this single instance
+        _neo_object = self.neo_object_db.get(_neo_name)
+        _is_new_neo = _neo_object is None
+        if _is_new_neo:
+            _neo_object = NearEarthObject(**entry)
+        _orbit_path_object = OrbitPath(neo=_neo_object, **entry)
+
+        if _is_new_neo:
+            self.neo_object_db[_neo_name] = _neo_object
+        _neo_object.update_orbits(_orbit_path_object, False)
+
+        # The interned date of the OrbitPath is shared by the orbits and the date_neo_db key
+        _orbit_date = _orbit_path_object.close_approach_date
+
+        # Update date_neo_db in place with the single instance of the NearEarthObject
+        if _orbit_date in self.date_neo_db:
+            self.date_neo_db[_orbit_date].append(_neo_object)
+        else:
+            self.date_neo_db[_orbit_date] = [_neo_object]
+        return _orbit_path_object
+
+    def add_columns(self, neo_columns, orbit_columns):
+        """
+        Adds the columns parsed from a chunk of a csv file by load_chunk to the database, the same way as add_rows.
+        Adding the columns of the chunks in file order gives the same database as the serial load of the whole file:
+        a Near Earth Object seen in several chunks is built from its first chunk, and the orbits of the following
+        chunks are appended to it in order.
+
+        :param neo_columns: tuple of the id, name, diameters and hazardous flag lists of the Near Earth Objects
+        :param orbit_columns: tuple of the name, orbiting body, close approach date and miss distances lists of the
+                              orbits
+        :return: None
+        """
+        neo_object_db = self.neo_object_db
+        date_neo_db = self.date_neo_db
+
+        for _neo_values in zip(*neo_columns):
+            if _neo_values[1] not in neo_object_db:
+                neo_object_db[_neo_values[1]] = NearEarthObject.from_values(*_neo_values)
+
+        for _neo_name, _orbiting_body, _close_approach_date, _miss_kilometers, _miss_miles in zip(*orbit_columns):
+            _neo_object = neo_object_db[_neo_name]
+            _orbit_path_object = OrbitPath.from_values(_neo_object, _orbiting_body, _close_approach_date,
+                                                       _miss_kilometers, _miss_miles)
+            _neo_object.orbits.append(_orbit_path_object)
+
+            _orbit_date = _orbit_path_object.close_approach_date
+            _date_neo_objects = date_neo_db.get(_orbit_date)
+            if _date_neo_objects is None:
+                date_neo_db[_orbit_date] = [_neo_object]
+            else:
+                _date_neo_objects.append(_neo_object)
+        return None
+
+    def backend_kind(self):
+        """
+        :return: str representing the backend holding the data, `columnar`, `sqlite` or `dict`
+        """
+        if self.sqlite:
+            return 'sqlite'
+        return 'columnar' if self.columnar else 'dict'
+
+    def is_empty(self):
+        """
+        :return: bool representing if no data has been loaded yet
+        """
+        return not self.neo_object_db and self.columnar_store is None and self.sqlite_store is None
+
+    def save_snapshot(self, filename):
+        """
+        Saves the parsed state of filename to its snapshot
+
+        :param filename: str representing the pathway of the loaded csv file
+        :return: None
+        """
+        write_snapshot(filename, {attribute: getattr(self, attribute) for attribute in NEODatabase.SnapshotAttributes},
+                       self.backend_kind())
+        return None
+
+    def build_date_index(self):
+        """
+        Rebuilds the sorted list of orbit dates from date_neo_db. Dates are stored in YYYY-MM-DD format,
+        so the string order is also the chronological order.
+
+        :return: None
+        """
+        self.sorted_dates = sorted(self.date_neo_db)
+
+    def build_secondary_indexes(self):
+        """
+        Rebuilds the secondary indexes on diameter and miss distance, when they are enabled, and the position of each
+        Near Earth Object in the lists of date_neo_db, which orders the Near Earth Objects read from the indexes as the
+        date index does.
+
+        :return: None
+        """
+        if not self.indexes:
+            return None
+        neo_objects = self.neo_object_db.values()
+        self.diameter_index = SortedIndex('diameter_min_km').build(neo_objects)
+        self.distance_index = SortedIndex('miss_distance_kilometers').build(
+            orbit for neo in neo_objects for orbit in neo.orbits)
+        # A Near Earth Object approaching twice on a date is listed twice, the first of its positions is kept
+        self.date_positions = {date: dict(zip(reversed(neos), range(len(neos) - 1, -1, -1)))
+                               for date, neos in self.date_neo_db.items()}
+        return None
+
+    def build_rollups(self):
+        """
+        Rebuilds the DateRollups of the close approaches, when they are enabled.
+
+        :return: None
+        """
+        if not self.rollups:
+            return None
+        self.date_rollups = DateRollups(self.date_neo_db, self.sorted_dates, self.neo_object_db.values())
+        return None
+
+    def dates_between(self, start_date=None, end_date=None):
+        """
+        Finds the orbit dates between start_date and end_date (both inclusive) with a binary search
+        on the sorted date index. A missing start_date or end_date leaves that side of the range open.
+
+        :param start_date: str representing the first date in YYYY-MM-DD format
+        :param end_date: str representing the last date in YYYY-MM-DD format
+        :return: list of orbit dates in chronological order
+        """
+        return NEODatabase.search_sorted_dates(self.sorted_dates, start_date, end_date)
+
+    @staticmethod
+    def search_sorted_dates(sorted_dates, start_date=None, end_date=None):
+        """
+        :param sorted_dates: sorted list of orbit dates in YYYY-MM-DD format
+        :param start_date: str representing the first date, None for no lower bound
+        :param end_date: str representing the last date, None for no upper bound
+        :return: slice of sorted_dates between start_date and end_date (both inclusive)
+        """
+        low = 0 if start_date is None else bisect_left(sorted_dates, start_date)
+        high = len(sorted_dates) if end_date is None else bisect_right(sorted_dates, end_date)
+        return sorted_dates[low:high]
+
+
+@contextmanager
+def paused_garbage_collection():
+    """
+    Pauses the cyclic garbage collector while a load builds its objects. Every object built by a load is kept, so
+    the collections triggered by the allocations would only scan the growing database again and again.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def column_positions(header):
+    """
+    :param header: list of the column names of a data file
+    :return: list of the positions in header of the LOADED_COLUMNS
+    """
+    positions = {name: position for position, name in enumerate(header)}
+    missing = [name for name in LOADED_COLUMNS if name not in positions]
+    if missing:
+        raise Exception('Columns: `{}` not found. Available columns: `{}`'.format(
+            ", ".join(missing), ", ".join(header)))
+    return [positions[name] for name in LOADED_COLUMNS]
+
+
+def iter_loaded_rows(filename):
+    """
+    :param filename: str representing the pathway of a csv, Arrow IPC or Parquet file
+    :return: generator of the tuples of the LOADED_COLUMNS values of each close approach
+    """
+    if arrow_io.is_arrow_file(filename):
+        yield from arrow_io.iter_rows(filename)
+        return
+    with open(filename, 'r', newline='') as neo_data_file:
+        reader = csv.reader(neo_data_file)
+        yield from map(itemgetter(*column_positions(next(reader, []))), reader)
+
+
+def line_end(rows, lines):
+    """
+    :param rows: bytes of csv rows
+    :param lines: int representing a number of lines
+    :return: int representing the byte offset in rows after the first lines
+    """
+    position = 0
+    for _ in range(lines):
+        position = rows.index(b'\n', position) + 1
+    return position
+
+
+def iter_entries(filename):
+    """
+    :param filename: str representing the pathway of a csv, Arrow IPC or Parquet file
+    :return: generator of dict of attributes about a given close approach, one per row of the file
+    """
+    if arrow_io.is_arrow_file(filename):
+        yield from arrow_io.iter_entries(filename)
+        return
+    with open(filename, 'r') as neo_data_file:
+        yield from csv.DictReader(neo_data_file)
+
+
+def split_csv(filename, chunks):
+    """
+    Splits the rows of a csv file into byte ranges ending on row boundaries. Rows are expected to be single lines,
+    as in the NASA csv exports.
+
+    :param filename: str representing the pathway of the csv file
+    :param chunks: int representing the number of byte ranges to split the rows into
+    :return: tuple of the header fieldnames and the list of (start, end) byte ranges of the rows
+    """
+    with open(filename, 'rb') as neo_data_file:
+        header = next(csv.reader([neo_data_file.readline().decode('utf-8')]))
+        rows_start = neo_data_file.tell()
+        size = os.fstat(neo_data_file.fileno()).st_size
+
+        boundaries = [rows_start]
+        for index in range(1, chunks):
+            position = rows_start + (size - rows_start) * index // chunks
+            if position <= boundaries[-1]:
+                continue
+            neo_data_file.seek(position - 1)
+            neo_data_file.readline()
+            if boundaries[-1] < neo_data_file.tell() < size:
+                boundaries.append(neo_data_file.tell())
+        boundaries.append(size)
+
+    return header, list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def load_chunk(filename, header, start, end):
+    """
+    Parses the csv rows in a byte range of a csv file into flat columns of parsed values. Runs in the worker processes
+    of load_chunks_in_parallel: the workers only send back lists of str, float and bool values, cheap to pickle, and
+    the main process builds each NearEarthObject and OrbitPath once from them, see add_columns.
+
+    The repeated names, dates and orbiting bodies are interned, so that pickle sends each distinct value of the chunk
+    once.
+
+    :param filename: str representing the pathway of the csv file
+    :param header: list of the fieldnames of the csv file
+    :param start: int representing the offset of the first byte of the rows
+    :param end: int representing the offset after the last byte of the rows
+    :return: tuple of the NEO columns, the id, name, diameters and hazardous flag of each Near Earth Object of the
+             chunk on its first row, and of the orbit columns, the name, orbiting body, close approach date and miss
+             distances of every row
+    """
+    with open(filename, 'rb') as neo_data_file:
+        neo_data_file.seek(start)
+        rows = neo_data_file.read(end - start).decode('utf-8')
+
+    with paused_garbage_collection():
+        rows = list(map(itemgetter(*column_positions(header)), csv.reader(io.StringIO(rows, newline=''))))
+        if not rows:
+            return ([],) * 5, ([],) * 5
+        (_ids, _names, _diameters_min, _diameters_max, _hazardous,
+         _orbiting_bodies, _close_approach_dates, _miss_kilometers, _miss_miles) = zip(*rows)
+        _names = list(map(sys.intern, _names))
+
+        # The first row of each name, in the order of the first rows: the rows are assigned in reverse order, so the
+        # last assignment of a name is its first row
+        first_rows = dict(zip(reversed(_names), reversed(rows)))
+        _neo_names = list(dict.fromkeys(_names))
+        _neo_rows = list(map(first_rows.__getitem__, _neo_names))
+        neo_columns = (list(map(itemgetter(0), _neo_rows)), _neo_names, [float(row[2]) for row in _neo_rows],
+                       [float(row[3]) for row in _neo_rows],
+                       [NearEarthObject.parse_hazardous(row[4]) for row in _neo_rows])
+        orbit_columns = (_names, list(map(sys.intern, _orbiting_bodies)),
+                         list(map(sys.intern, _close_approach_dates)), list(map(float, _miss_kilometers)),
+                         list(map(float, _miss_miles)))
+    return neo_columns, orbit_columns
+
+
+def load_chunks_in_parallel(filename, workers):
+    """
+    :param filename: str representing the pathway of the csv file
+    :param workers: int representing the number of worker processes
+    :return: generator of the NEO and orbit columns of the chunks of the csv file, in file order
+    """
+    # More chunks than workers balance the load between the workers and bound the memory of each chunk
+    header, ranges = split_csv(filename, workers * 4)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(load_chunk, filename, header, start, end) for start, end in ranges]
+        for future in futures:
+            yield future.result()
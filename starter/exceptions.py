@@ -5,3 +5,20 @@ class UnsupportedFeature(Exception):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+
+
+class MalformedRow(ValueError):
+    """
+    Custom exception for a row of a data file that cannot be parsed
+    """
+
+    def __init__(self, filename, offset, error):
+        """
+        :param filename: str representing the pathway of the data file
+        :param offset: int representing the byte offset of the row in the data file
+        :param error: Exception raised when the row was parsed
+        """
+        super().__init__('Malformed row at byte {} of {}: {}'.format(offset, filename, error))
+        self.filename = filename
+        self.offset = offset
+        self.error = error
@@ -0,0 +1,111 @@
+from bisect import bisect_left, bisect_right
+from operator import eq, ge, gt, itemgetter, le, lt
+
+
+class SortedIndex(object):
+    """
+    Secondary index of a numeric attribute: the keys are kept in a sorted list, with the indexed objects in a parallel
+    list, so that the objects matching a range of comparisons on the attribute are a slice found by binary searches.
+    """
+
+    # Number of objects from which add_all merges them into new lists instead of inserting them one at a time
+    MERGE_THRESHOLD = 64
+
+    def __init__(self, attribute):
+        """
+        :param attribute: str representing the name of the indexed attribute of the objects
+        """
+        self.attribute = attribute
+        self.keys = []  # Storing the sorted list of the attribute values
+        self.objects = []  # Storing the objects, in the order of their keys
+
+    def __len__(self):
+        return len(self.keys)
+
+    def build(self, objects):
+        """
+        Rebuilds the index from objects.
+
+        :param objects: iterable of the objects to index
+        :return: SortedIndex
+        """
+        # The sort is stable, so objects with the same key stay in the order they were given
+        pairs = sorted(((getattr(_object, self.attribute), _object) for _object in objects), key=lambda pair: pair[0])
+        self.keys = [key for key, _ in pairs]
+        self.objects = [_object for _, _object in pairs]
+        return self
+
+    def add(self, _object):
+        """
+        Inserts an object after the objects with the same key. The insertion moves the objects after it, so adding
+        objects one at a time costs O(N) each for an index of N objects: see add_all to add many objects.
+
+        :param _object: object to index
+        :return: None
+        """
+        key = getattr(_object, self.attribute)
+        position = bisect_right(self.keys, key)
+        self.keys.insert(position, key)
+        self.objects.insert(position, _object)
+
+    def add_all(self, objects):
+        """
+        Inserts objects after the objects with the same key, in the order they are given, as add would one at a time.
+        From MERGE_THRESHOLD objects, they are sorted and merged with the index in a single pass, costing
+        O(N + k log N) for k objects into an index of N objects instead of O(k N). The merged lists then replace the
+        lists of the index.
+
+        :param objects: iterable of the objects to index
+        :return: None
+        """
+        pairs = sorted(((getattr(_object, self.attribute), _object) for _object in objects), key=itemgetter(0))
+        if len(pairs) < SortedIndex.MERGE_THRESHOLD:
+            for key, _object in pairs:
+                position = bisect_right(self.keys, key)
+                self.keys.insert(position, key)
+                self.objects.insert(position, _object)
+            return None
+
+        # The runs of the index between the positions of the sorted objects are copied as slices
+        keys, objects = [], []
+        start = 0
+        for key, _object in pairs:
+            position = bisect_right(self.keys, key, start)
+            keys += self.keys[start:position]
+            keys.append(key)
+            objects += self.objects[start:position]
+            objects.append(_object)
+            start = position
+        keys += self.keys[start:]
+        objects += self.objects[start:]
+        self.keys, self.objects = keys, objects
+        return None
+
+    def positions(self, comparisons):
+        """
+        :param comparisons: list of (operation, value) tuples, with operation one of gt, ge, eq, lt and le
+        :return: tuple of the first and past the last positions of the keys matching all the comparisons
+        """
+        low, high = 0, len(self.keys)
+        for operation, value in comparisons:
+            if operation in (gt, eq, ge):
+                low = max(low, (bisect_right if operation == gt else bisect_left)(self.keys, value))
+            if operation in (lt, eq, le):
+                high = min(high, (bisect_left if operation == lt else bisect_right)(self.keys, value))
+        return low, max(low, high)
+
+    def count(self, comparisons):
+        """
+        :param comparisons: list of (operation, value) tuples
+        :return: int representing the number of objects matching all the comparisons
+        """
+        low, high = self.positions(comparisons)
+        return high - low
+
+    def range(self, comparisons):
+        """
+        :param comparisons: list of (operation, value) tuples
+        :return: list of the objects matching all the comparisons, in the order of their keys
+        """
+        low, high = self.positions(comparisons)
+        return self.objects[low:high]
@@ -15,6 +15,12 @@ Search options:
 Output options: Required.
 - display: prints to stdout
 - csv_file: exports data to a csv
+- jsonl: exports data to a JSON Lines file, one JSON object per result
+- csv_gz: exports data to a gzip compressed csv
+- arrow, parquet: exports data column-wise to an Arrow IPC or Parquet file, requires pyarrow
+
+Output file: Optional, with -o/--output_file the results are written to the given file instead of data/neo_output.csv
+(.jsonl, .csv.gz, .arrow, .parquet), or to stdout for display. -f is the input csv file.
 
 Filters options: Optional. Input as: option:operation:value e.g. diameter:>=:0.042
 - is_hazardous:[=]:bool
@@ -25,7 +31,54 @@ Return objects options: Optional, defaults to NEO if not specified.
 - NEO
 - Path
 
+Order: Optional, with --order_by date|diameter|distance the first N results in that order are returned, ascending or
+with --order desc descending, e.g. the 10 closest approaches of a month:
+main.py display -r Path -n 10 -s 2020-01-01 -e 2020-01-31 --order_by distance
+A NEO is ordered on its first close approach date and its smallest miss distance in the date search.
+An ordered Path query only returns the close approaches in the date search, while an unordered one returns every close
+approach of the NEOs found, including those outside of the date search. An ordered NEO query only returns the NEOs
+with a close approach matching the filters in the date search, with the same orbits as an unordered one.
+
+Aggregate: Optional, with --aggregate day|month|year the number of close approaches, of unique NEOs and of hazardous
+NEOs and the minimum miss distance of each day, month or year of the date search are output instead of the NEOs, e.g.
+main.py display -s 2020-01-01 -e 2020-12-31 --aggregate month --rollups
+With --rollups the per date aggregates are computed at load time, so aggregates without filters or with is_hazardous
+filters are read from them; other filters scan the NEOs of the date search. With --explain the source of the aggregates
+is printed.
+
+Stream: Optional, with --stream the results are written as the search produces them instead of once the search ends.
+
 Filename: Optional, used for specifying a filename for a csv to load data from. By default project looks for a csv in: data/neo_data.csv.
+Arrow IPC (.arrow, .feather) and Parquet (.parquet) files with the columns of the csv are loaded too, requires pyarrow.
+
+Snapshot: Optional, with --snapshot the parsed csv file is saved to a binary snapshot next to it (e.g.
+data/neo_data.csv.snapshot), which is reused by later runs with --snapshot until the csv file changes. Only enable it
+for a data directory no one else can write to.
+
+Workers: Optional, with --workers N the csv file is parsed by N processes in parallel.
+
+Catalog: Optional, with --catalog DIR the data is read from a date-partitioned catalog built with catalog.py, loading
+only the monthly or yearly partitions overlapping the date search. NEOs only hold their orbits of the loaded partitions.
+The partitions are loaded in memory, --columnar, --sqlite, --snapshot, --indexes, --rollups and --workers are not
+supported with --catalog.
+
+Scan: Optional, with --scan the query is answered by scanning the input file, twice, without loading it, so the memory
+does not grow with the size of the file. Add --sorted_by_date for a file sorted by close approach date, as the NASA
+export, to stop the first scan at the end of the date search or once enough NEOs are found.
+
+Columnar: Optional, loads the data into NumPy arrays and evaluates the filters over whole columns, requires numpy.
+
+SQLite: Optional, with --sqlite the data is loaded into an indexed SQLite database file next to the csv file (e.g.
+data/neo_data.csv.sqlite) and searches run as SQL queries. With --snapshot, the database file is reused by later runs
+until the csv file changes.
+
+Indexes: Optional, with --indexes the Near Earth Objects are also indexed by diameter and the orbits by miss distance,
+and a search starts from the index giving the fewest rows. With --explain the chosen plan is printed before the search.
+
+Profile: Optional, with --profile the wall time, CPU time and peak memory of the load, search and write phases and the
+rows in and out of each search stage are printed to stderr, with the functions taking the most time under cProfile and
+the lines allocating the most memory under tracemalloc. The cProfile statistics are saved to data/neo_profile.pstats,
+or to the file given to --profile, e.g. main.py display -d 2020-01-10 --profile run.pstats
 """
 
 import argparse
@@ -34,8 +87,11 @@ import sys
 from datetime import datetime
 
 from exceptions import UnsupportedFeature
+from catalog import Catalog
 from database import NEODatabase
+from profiler import NULL_PROFILER, Profiler
 from search import Query, NEOSearcher
+from streaming import StreamingSearcher
 from writer import OutputFormat, NEOWriter
 
 PROJECT_ROOT = pathlib.Path(__file__).parent.absolute()
@@ -86,12 +142,47 @@ if __name__ == '__main__':
                         help='YYYY-MM-DD format to find NEOs up to the end date')
     parser.add_argument('-n', '--number', type=int, help='Int representing max number of NEOs to return')
     parser.add_argument('-f', '--filename', type=str, help='Name of input csv data file')
+    parser.add_argument('-o', '--output_file', type=str,
+                        help='Name of the output file, data/neo_output with the extension of the output by default')
     parser.add_argument('--filter', nargs='+', help='Select filter options with filter value: '
                                                     'is_hazardous:[=]:bool, '
                                                     'diameter:[>=|=|<=]:float, '
                                                     'distance:[>=|=|<=]:float.'
                                                     'Input as: [option:operation:value] '
                                                     'e.g. diameter:>=:0.042')
+    parser.add_argument('--order_by', choices=['date', 'diameter', 'distance'],
+                        help='Return the first results ordered on the given field. Ordered Path results are the close '
+                             'approaches in the date search only, unordered ones every close approach of the NEOs found')
+    parser.add_argument('--order', choices=['asc', 'desc'], default='asc',
+                        help='Direction of --order_by, ascending by default')
+    parser.add_argument('--aggregate', choices=['day', 'month', 'year'],
+                        help='Output the aggregates of the close approaches of each day, month or year')
+    parser.add_argument('--rollups', action='store_true',
+                        help='Maintain per date rollups of the close approaches to answer aggregates without filters '
+                             'or with is_hazardous filters only, other filters scan the NEOs of the date search')
+    parser.add_argument('--stream', action='store_true',
+                        help='Write the results as they are found instead of after the search completes')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Number of processes parsing the csv file in parallel')
+    parser.add_argument('--catalog', type=str,
+                        help='Name of a catalog directory built with catalog.py, read instead of the input file')
+    parser.add_argument('--scan', action='store_true',
+                        help='Answer the query by scanning the input file instead of loading it')
+    parser.add_argument('--sorted_by_date', action='store_true',
+                        help='With --scan, the input file is sorted by close approach date')
+    parser.add_argument('--columnar', action='store_true',
+                        help='Use the NumPy backed columnar backend to load and search the data')
+    parser.add_argument('--sqlite', action='store_true',
+                        help='Use the SQLite backend, loading the data into an indexed database file next to the csv file')
+    parser.add_argument('--snapshot', action='store_true',
+                        help='Save the parsed csv file to a binary snapshot next to it, reused while the csv file is '
+                             'unchanged')
+    parser.add_argument('--indexes', action='store_true',
+                        help='Maintain secondary indexes on diameter and miss distance for selective filters')
+    parser.add_argument('--explain', action='store_true', help='Print the plan chosen for the search')
+    parser.add_argument('--profile', nargs='?', const=f'{PROJECT_ROOT}/data/neo_profile.pstats',
+                        help='Print the metrics of the load, search and write phases and save the cProfile statistics '
+                             'to PROFILE, data/neo_profile.pstats by default')
 
     args = parser.parse_args()
     var_args = vars(args)
@@ -102,38 +193,78 @@ if __name__ == '__main__':
     else:
         filename = f'{PROJECT_ROOT}/data/neo_data.csv'
 
-    db = NEODatabase(filename=filename)
+    db = NEODatabase(filename=filename, columnar=args.columnar, snapshot=args.snapshot, indexes=args.indexes,
+                     sqlite=args.sqlite, rollups=args.rollups)
+    profiler = Profiler(trace_memory=True, cprofile=True) if args.profile else NULL_PROFILER
+    profiler.start()
+
+    # Build Query
+    query_selectors = Query(**var_args).build_query()
 
     try:
-        db.load_data()
+        with profiler.phase("load"):
+            if args.scan:
+                # The file is read by the search, a missing file is reported before the search starts
+                open(filename).close()
+            elif args.catalog:
+                # The partitions of a catalog are loaded into the in-memory backend, without indexes or rollups
+                catalog_options = [f'--{option}' for option in ['columnar', 'sqlite', 'snapshot', 'indexes', 'rollups']
+                                   if var_args[option]] + (['--workers'] if args.workers > 1 else [])
+                if catalog_options:
+                    raise UnsupportedFeature('{} not supported with --catalog'.format(', '.join(catalog_options)))
+                # Only the partitions of the catalog overlapping the date search are loaded
+                db = Catalog(args.catalog).database(query_selectors.date_search)
+            else:
+                db.load_data(workers=args.workers)
     except FileNotFoundError as e:
-        print(f'File {var_args.get("filename")} not found, please try another file name.')
+        print(f'File {args.catalog or var_args.get("filename")} not found, please try another file name.')
+        sys.exit()
+    except UnsupportedFeature as e:
+        print(e)
         sys.exit()
     except Exception as e:
         print(Exception)
         sys.exit()
 
-    # Build Query
-    query_selectors = Query(**var_args).build_query()
-
     # Get Results
     try:
-        results = NEOSearcher(db).get_objects(query_selectors)
+        if args.scan:
+            searcher = StreamingSearcher(filename, sorted_by_date=args.sorted_by_date)
+        else:
+            searcher = NEOSearcher(db, profiler=profiler)
+        if args.explain and not args.scan:
+            print(searcher.explain(query_selectors, group_by=args.aggregate))
+        if args.aggregate:
+            if args.scan:
+                raise UnsupportedFeature('Aggregates are not available with --scan')
+            results = searcher.get_aggregates(query_selectors, group_by=args.aggregate)
+        elif args.stream:
+            results = searcher.iter_objects(query_selectors)
+        else:
+            results = searcher.get_objects(query_selectors)
     except UnsupportedFeature as e:
         print('Unsupported Feature; Write unsuccessful')
         sys.exit()
 
     # Output Results
     try:
-        result = NEOWriter().write(
-            data=results,
-            format=args.output,
-        )
+        # With --stream the search runs as the results are written, its time is part of the write phase
+        with profiler.phase("write"):
+            result = NEOWriter().write(
+                data=results,
+                format=args.output,
+                filename=args.output_file,
+            )
     except Exception as e:
         print(e)
         print('Write unsuccessful')
         sys.exit()
 
+    if args.profile:
+        profiler.stop()
+        print(profiler.report(), file=sys.stderr)
+        profiler.dump(args.profile)
+
     if result:
         print('Write successful.')
     else:
@@ -1,10 +1,33 @@
+from collections import namedtuple
+import copy
+import sys
+
+# Kilometers to miles, used for the diameters in miles derived from the diameters in kilometers
+MILES_PER_KILOMETER = 0.621371
+
+# Columns of the NASA close approach export read by NearEarthObject and OrbitPath
+NEAR_EARTH_OBJECT_COLUMNS = ('id', 'name', 'estimated_diameter_min_kilometers', 'estimated_diameter_max_kilometers',
+                             'is_potentially_hazardous_asteroid')
+ORBIT_PATH_COLUMNS = ('id', 'name', 'orbiting_body', 'close_approach_date', 'miss_distance_kilometers',
+                      'miss_distance_miles')
+LOADED_COLUMNS = tuple(dict.fromkeys(NEAR_EARTH_OBJECT_COLUMNS + ORBIT_PATH_COLUMNS))
+
+# Reference to the Near Earth Object of an OrbitPath built without its NearEarthObject instance
+NEOReference = namedtuple('NEOReference', ['id', 'name'])
+
+
 class NearEarthObject(object):
     """
     Object containing data describing a Near Earth Object and it's orbits.
 
+    To keep millions of instances compact, attributes are stored in __slots__ and only the diameters in kilometers are
+    stored: the diameters in meters and in miles are derived from them.
+
     # TODO: You may be adding instance methods to NearEarthObject to help you implement search and output data.
     """
 
+    __slots__ = ('id', 'name', 'diameter_min_km', 'diameter_max_km', 'is_potentially_hazardous_asteroid', 'orbits')
+
     def __init__(self, **kwargs):
         """
         :param kwargs:    dict of attributes about a given Near Earth Object, only a subset of attributes used
@@ -14,19 +37,56 @@ class NearEarthObject(object):
         self.name = kwargs["name"]
         self.diameter_min_km = float(kwargs["estimated_diameter_min_kilometers"])
         self.diameter_max_km = float(kwargs["estimated_diameter_max_kilometers"])
-        self.diameter_min_meter = float(kwargs["estimated_diameter_min_meters"])
-        self.diameter_min_meter = float(kwargs["estimated_diameter_max_meters"])
-        self.diameter_min_miles = float(kwargs["estimated_diameter_min_miles"])
-        self.diameter_max_miles = float(kwargs["estimated_diameter_max_miles"])
 
         # Handling boolean `is_potentially_hazardous_asteroid`
-        self.is_potentially_hazardous_asteroid = None
-        if str(kwargs["is_potentially_hazardous_asteroid"]) in ["False", "FALSE", "false"]:
-            self.is_potentially_hazardous_asteroid = False
-        elif str(kwargs["is_potentially_hazardous_asteroid"]) in ["True", "TRUE", "true"]:
-            self.is_potentially_hazardous_asteroid = True
+        self.is_potentially_hazardous_asteroid = NearEarthObject.parse_hazardous(kwargs["is_potentially_hazardous_asteroid"])
         self.orbits = []  # Storing OrbitPath information
 
+    @staticmethod
+    def parse_hazardous(value):
+        """
+        :param value: is_potentially_hazardous_asteroid value of the data, a bool or its str
+        :return: True, False, or None for a value that is neither
+        """
+        if str(value) in ["False", "FALSE", "false"]:
+            return False
+        elif str(value) in ["True", "TRUE", "true"]:
+            return True
+        return None
+
+    @staticmethod
+    def from_values(id, name, diameter_min_km, diameter_max_km, is_potentially_hazardous_asteroid):
+        """
+        Builds a NearEarthObject from its parsed attribute values, without the dict of keyword arguments of __init__.
+        Used by the loaders reading rows as tuples.
+
+        :return: NearEarthObject, without orbits
+        """
+        neo = NearEarthObject.__new__(NearEarthObject)
+        neo.id = id
+        neo.name = name
+        neo.diameter_min_km = diameter_min_km
+        neo.diameter_max_km = diameter_max_km
+        neo.is_potentially_hazardous_asteroid = is_potentially_hazardous_asteroid
+        neo.orbits = []
+        return neo
+
+    @property
+    def diameter_min_meter(self):
+        return self.diameter_min_km * 1000
+
+    @property
+    def diameter_max_meter(self):
+        return self.diameter_max_km * 1000
+
+    @property
+    def diameter_min_miles(self):
+        return self.diameter_min_km * MILES_PER_KILOMETER
+
+    @property
+    def diameter_max_miles(self):
+        return self.diameter_max_km * MILES_PER_KILOMETER
+
     def __str__(self):
         return "Neo Id: {} Neo Name: {} Orbits: {} Orbit Date: {}".\
             format(str(self.id), str(self.name), str(len(self.orbits)), str(", ".join(map(lambda o: o.close_approach_date, self.orbits))))
@@ -44,28 +104,134 @@ class NearEarthObject(object):
         if overwrite:
             self.orbits = orbit
         else:
+            orbit.neo = self
             self.orbits.append(orbit)
 
+    def __reduce__(self):
+        """
+        Pickles the attributes as a tuple, with the orbits as the state so that the references of the orbits back
+        to this Near Earth Object are pickled once. Used by snapshots.
+        """
+        return restore_near_earth_object, (self.id, self.name, self.diameter_min_km, self.diameter_max_km,
+                                           self.is_potentially_hazardous_asteroid), self.orbits
+
+    def __setstate__(self, orbits):
+        self.orbits = orbits
+
+    def with_orbits(self, orbits):
+        """
+        Creates a lightweight copy of the Near Earth Object holding only the given orbits, leaving the
+        orbits of this Near Earth Object unchanged. Used by searches to return a subset of the orbits.
+
+        :param orbits: list of OrbitPath
+        :return: NearEarthObject
+        """
+        neo = copy.copy(self)
+        neo.orbits = orbits
+        return neo
+
 
 class OrbitPath(object):
     """
     Object containing data describing a Near Earth Object orbit.
 
+    The orbit refers back to its Near Earth Object instead of copying its id and name, and the close approach date
+    and orbiting body strings are interned, as they are repeated across many orbits.
+
     # TODO: You may be adding instance methods to OrbitPath to help you implement search and output data.
     """
 
-    def __init__(self, **kwargs):
+    __slots__ = ('neo', 'orbiting_body', 'close_approach_date', 'miss_distance_kilometers', 'miss_distance_miles')
+
+    def __init__(self, neo=None, **kwargs):
         """
+        :param neo:       NearEarthObject of the orbit, referenced by the id and name of kwargs if not provided
         :param kwargs:    dict of attributes about a given orbit, only a subset of attributes used
         """
         # TODO: What instance variables will be useful for storing on the Near Earth Object?
-        self.neo_id = kwargs["id"]
-        self.neo_name = kwargs["name"]
-        self.orbiting_body = kwargs["orbiting_body"]
-        self.close_approach_date = kwargs["close_approach_date"]
+        self.neo = neo if neo is not None else NEOReference(kwargs["id"], kwargs["name"])
+        self.orbiting_body = sys.intern(kwargs["orbiting_body"])
+        self.close_approach_date = sys.intern(kwargs["close_approach_date"])
         self.miss_distance_kilometers = float(kwargs["miss_distance_kilometers"])
         self.miss_distance_miles = float(kwargs["miss_distance_miles"])
 
+    def __reduce__(self):
+        """
+        Pickles the attributes as a tuple, with the Near Earth Object as the state so that an orbit pickled before
+        its Near Earth Object is not pickled twice. Used by snapshots.
+        """
+        return restore_orbit_path, (self.orbiting_body, self.close_approach_date, self.miss_distance_kilometers,
+                                    self.miss_distance_miles), self.neo
+
+    def __setstate__(self, neo):
+        self.neo = neo
+
+    @staticmethod
+    def from_values(neo, orbiting_body, close_approach_date, miss_distance_kilometers, miss_distance_miles):
+        """
+        Builds an OrbitPath from its parsed attribute values, without the dict of keyword arguments of __init__.
+        Used by the loaders reading rows as tuples.
+
+        :return: OrbitPath
+        """
+        orbit = OrbitPath.__new__(OrbitPath)
+        orbit.neo = neo
+        orbit.orbiting_body = sys.intern(orbiting_body)
+        orbit.close_approach_date = sys.intern(close_approach_date)
+        orbit.miss_distance_kilometers = miss_distance_kilometers
+        orbit.miss_distance_miles = miss_distance_miles
+        return orbit
+
+    @property
+    def neo_id(self):
+        return self.neo.id
+
+    @property
+    def neo_name(self):
+        return self.neo.name
+
     def __str__(self):
         return "Neo Name: {} Miss Distance (km): {} Orbit Date: {}".\
             format(str(self.neo_name), str(self.miss_distance_kilometers), str(self.close_approach_date))
+
+
+class Aggregate(namedtuple('Aggregate', ['group', 'approaches', 'neos', 'hazardous_neos', 'hazardous_share',
+                                         'min_distance_km'])):
+    """
+    Object containing the aggregates of the close approaches of a group of dates: a day (YYYY-MM-DD), a month (YYYY-MM)
+    or a year (YYYY).
+    """
+
+    __slots__ = ()
+
+    @staticmethod
+    def from_counts(group, approaches, neos, hazardous_neos, min_distance_km):
+        """
+        :param group: str representing the group of dates
+        :param approaches: int representing the number of close approaches
+        :param neos: int representing the number of unique Near Earth Objects
+        :param hazardous_neos: int representing the number of unique potentially hazardous Near Earth Objects
+        :param min_distance_km: float representing the minimum miss distance, inf without close approach
+        :return: Aggregate
+        """
+        return Aggregate(group, approaches, neos, hazardous_neos, hazardous_neos / neos if neos else 0.0,
+                         None if min_distance_km == float('inf') else min_distance_km)
+
+    def __str__(self):
+        return "Group: {} Approaches: {} NEOs: {} Hazardous NEOs: {} ({:.1%}) Min Miss Distance (km): {}".format(
+            self.group, self.approaches, self.neos, self.hazardous_neos, self.hazardous_share, self.min_distance_km)
+
+
+def restore_near_earth_object(id, name, diameter_min_km, diameter_max_km, is_potentially_hazardous_asteroid):
+    """
+    :return: unpickled NearEarthObject, without its orbits
+    """
+    return NearEarthObject.from_values(id, name, diameter_min_km, diameter_max_km, is_potentially_hazardous_asteroid)
+
+
+def restore_orbit_path(orbiting_body, close_approach_date, miss_distance_kilometers, miss_distance_miles):
+    """
+    :return: unpickled OrbitPath, without its Near Earth Object
+    """
+    return OrbitPath.from_values(None, orbiting_body, close_approach_date, miss_distance_kilometers,
+                                 miss_distance_miles)
@@ -0,0 +1,281 @@
+"""
+Instrumentation of the load, search and write phases of a run.
+
+A Profiler records the wall time, the CPU time and the peak memory of each phase, and the rows in and out of each
+stage of a search: the rows read from the date or secondary index, the NEO filters, the orbit filters and the
+results. profile also runs cProfile and traces the allocations with tracemalloc, for a dump of the hot functions and
+of the lines allocating the most memory.
+
+The NEOSearcher, the server and the scripts use the NULL_PROFILER by default, whose methods do nothing and return
+the rows as they are, so the instrumentation costs a few calls per search when it is disabled.
+"""
+
+from collections import OrderedDict
+import cProfile
+import io
+import pstats
+import threading
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+class Phase(object):
+    """
+    Timer of a phase, used as a context manager by Profiler.phase. rows_in and rows_out can be set on the timer
+    while it runs.
+    """
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.rows_in = None
+        self.rows_out = None
+
+    def __enter__(self):
+        if self.profiler.trace_memory and tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        self.wall_start = time.perf_counter()
+        self.cpu_start = time.process_time()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        wall_seconds = time.perf_counter() - self.wall_start
+        cpu_seconds = time.process_time() - self.cpu_start
+        self.profiler.record(self.name, wall_seconds, cpu_seconds, self.rows_in, self.rows_out)
+        return False
+
+
+class NullPhase(object):
+    """
+    Phase of the NullProfiler, recording nothing.
+    """
+
+    rows_in = None
+    rows_out = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+class Profiler(object):
+    """
+    Collects the metrics of the phases and of the search stages of a run, see metrics and report.
+
+    Phases run more than once, e.g. the searches of a server, add up their times and rows and keep the highest peak
+    memory. The peak memory of a phase is the peak of the memory traced by tracemalloc during the phase when the
+    allocations are traced, otherwise the peak resident memory of the process at the end of the phase.
+    """
+
+    enabled = True
+
+    def __init__(self, trace_memory=False, cprofile=False):
+        """
+        :param trace_memory: bool flag to trace the allocations with tracemalloc, slows the run down
+        :param cprofile: bool flag to run cProfile while profiling, slows the run down
+        """
+        self.trace_memory = trace_memory
+        self.cprofile = cProfile.Profile() if cprofile else None
+        self.phases = OrderedDict()
+        self.stages = OrderedDict()
+        self.snapshot = None
+        self.lock = threading.Lock()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+        return False
+
+    def start(self):
+        """
+        Starts tracemalloc and cProfile when enabled.
+
+        :return: Profiler
+        """
+        if self.trace_memory:
+            tracemalloc.start()
+        if self.cprofile is not None:
+            self.cprofile.enable()
+        return self
+
+    def stop(self):
+        """
+        Stops cProfile and tracemalloc, keeping a snapshot of the traced allocations for the report.
+
+        :return: None
+        """
+        if self.cprofile is not None:
+            self.cprofile.disable()
+        if self.trace_memory and tracemalloc.is_tracing():
+            self.snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+        return None
+
+    def phase(self, name):
+        """
+        :param name: str representing the phase, e.g. load, search or write
+        :return: Phase context manager timing the phase
+        """
+        return Phase(self, name)
+
+    def record(self, name, wall_seconds, cpu_seconds, rows_in=None, rows_out=None):
+        """
+        Adds a run of a phase to its metrics.
+
+        :param name: str representing the phase
+        :param wall_seconds: float representing the wall time of the run
+        :param cpu_seconds: float representing the CPU time of the process during the run
+        :param rows_in: int representing the rows read by the run, None if not counted
+        :param rows_out: int representing the rows produced by the run, None if not counted
+        :return: None
+        """
+        peak_memory = Profiler.peak_memory(self.trace_memory)
+        with self.lock:
+            metrics = self.phases.setdefault(name, {'calls': 0, 'wall_seconds': 0.0, 'cpu_seconds': 0.0,
+                                                    'rows_in': None, 'rows_out': None, 'peak_memory_bytes': 0})
+            metrics['calls'] += 1
+            metrics['wall_seconds'] += wall_seconds
+            metrics['cpu_seconds'] += cpu_seconds
+            for key, rows in (('rows_in', rows_in), ('rows_out', rows_out)):
+                if rows is not None:
+                    metrics[key] = (metrics[key] or 0) + rows
+            metrics['peak_memory_bytes'] = max(metrics['peak_memory_bytes'], peak_memory)
+        return None
+
+    @staticmethod
+    def peak_memory(trace_memory):
+        """
+        :param trace_memory: bool representing if the allocations are traced
+        :return: int representing the peak memory in bytes, 0 when it can not be measured
+        """
+        if trace_memory and tracemalloc.is_tracing():
+            return tracemalloc.get_traced_memory()[1]
+        if resource is None:
+            return 0
+        # ru_maxrss is in kilobytes on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    def count_rows(self, stage, rows, direction='rows_out'):
+        """
+        Counts the rows going through a stage of a search as they are produced.
+
+        :param stage: str representing the stage, e.g. date or NEO filters
+        :param rows: iterable of the rows of the stage
+        :param direction: str representing the counter of the stage, rows_in or rows_out
+        :return: generator of the rows
+        """
+        # The stage is registered before the rows are read, so that the stages are listed in the order of the search
+        with self.lock:
+            metrics = self.stages.setdefault(stage, {'rows_in': 0, 'rows_out': 0})
+        return Profiler.iter_counted(metrics, direction, rows)
+
+    @staticmethod
+    def iter_counted(metrics, direction, rows):
+        """
+        :param metrics: dict of the counters of a stage
+        :param direction: str representing the counter incremented by each row
+        :param rows: iterable of the rows of the stage
+        :return: generator of the rows
+        """
+        for row in rows:
+            metrics[direction] += 1
+            yield row
+
+    def metrics(self):
+        """
+        :return: dict of the metrics of the phases and of the search stages, by name
+        """
+        with self.lock:
+            return {'phases': {name: dict(metrics) for name, metrics in self.phases.items()},
+                    'stages': {name: dict(metrics) for name, metrics in self.stages.items()}}
+
+    def report(self, limit=10):
+        """
+        :param limit: int representing the number of functions and allocation sites listed from the dumps
+        :return: str representing the metrics, followed by the cProfile and tracemalloc dumps when enabled
+        """
+        metrics = self.metrics()
+        lines = [f'{"phase":<10} {"calls":>6} {"wall (s)":>9} {"cpu (s)":>9} {"rows in":>10} {"rows out":>10} '
+                 f'{"peak (MB)":>10}']
+        for name, phase in metrics['phases'].items():
+            rows_in = '' if phase['rows_in'] is None else phase['rows_in']
+            rows_out = '' if phase['rows_out'] is None else phase['rows_out']
+            lines.append(f'{name:<10} {phase["calls"]:>6} {phase["wall_seconds"]:>9.3f} {phase["cpu_seconds"]:>9.3f} '
+                         f'{rows_in:>10} {rows_out:>10} {phase["peak_memory_bytes"] / 1e6:>10.1f}')
+        if metrics['stages']:
+            lines.append('')
+            lines.append(f'{"stage":<16} {"rows in":>10} {"rows out":>10}')
+            for name, stage in metrics['stages'].items():
+                lines.append(f'{name:<16} {stage["rows_in"]:>10} {stage["rows_out"]:>10}')
+
+        if self.cprofile is not None:
+            stream = io.StringIO()
+            pstats.Stats(self.cprofile, stream=stream).sort_stats('cumulative').print_stats(limit)
+            lines.append(stream.getvalue().rstrip())
+        if self.snapshot is not None:
+            lines.append('')
+            lines.append(f'Top {limit} allocation sites:')
+            for statistic in self.snapshot.statistics('lineno')[:limit]:
+                lines.append(str(statistic))
+        return '\n'.join(lines)
+
+    def dump(self, filename):
+        """
+        Writes the cProfile statistics to filename, to be read with pstats or a profile viewer.
+
+        :param filename: str representing the pathway of the dump
+        :return: None
+        """
+        if self.cprofile is not None:
+            self.cprofile.dump_stats(filename)
+        return None
+
+
+class NullProfiler(object):
+    """
+    Profiler recording nothing, used when profiling is disabled.
+    """
+
+    enabled = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    def start(self):
+        return self
+
+    def stop(self):
+        return None
+
+    def phase(self, name):
+        return NullPhase()
+
+    def record(self, name, wall_seconds, cpu_seconds, rows_in=None, rows_out=None):
+        return None
+
+    def count_rows(self, stage, rows, direction='rows_out'):
+        return rows
+
+    def metrics(self):
+        return {'phases': {}, 'stages': {}}
+
+    def report(self, limit=10):
+        return ''
+
+    def dump(self, filename):
+        return None
+
+
+NULL_PROFILER = NullProfiler()
@@ -0,0 +1,213 @@
+import copy
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from itertools import accumulate
+
+from models import Aggregate
+
+INFINITY = float('inf')
+
+
+class SparseTable(object):
+    """
+    Range minimum table of a list of values: level k holds the minimum of each run of 2 ** k values, so the minimum of
+    any range is the minimum of the two runs of a level covering it, found in constant time.
+    """
+
+    def __init__(self, values):
+        """
+        :param values: list of the values, INFINITY for a missing value
+        """
+        self.levels = [list(values)]
+        step = 1
+        while 2 * step <= len(values):
+            level = self.levels[-1]
+            self.levels.append(list(map(min, level[:len(level) - step], level[step:])))
+            step *= 2
+
+    def minimum(self, low, high):
+        """
+        :param low: int representing the first position of the range
+        :param high: int representing the position after the last position of the range
+        :return: minimum of the values of the range, INFINITY for an empty range
+        """
+        if low >= high:
+            return INFINITY
+        level = (high - low).bit_length() - 1
+        values = self.levels[level]
+        return min(values[low], values[high - (1 << level)])
+
+
+class DateRollups(object):
+    """
+    Per date aggregates of the close approaches of a NEODatabase, computed at load time next to date_neo_db.
+
+    The aggregates are kept for each value of is_potentially_hazardous_asteroid, the hazard class of a Near Earth
+    Object, and aligned on the sorted dates:
+    - the prefix sums of the number of close approaches, giving the approaches of any range of dates in constant time
+    - a SparseTable of the minimum miss distance, giving the minimum of any range of dates in constant time
+    - the number of unique Near Earth Objects of each date, and of each month and year
+
+    Unique Near Earth Objects do not add up across dates, a Near Earth Object approaching twice is counted once: the
+    unique Near Earth Objects of a month or a year cut by the date range are counted from date_neo_db, over the dates
+    of the range in that month or year only.
+
+    The approaches and minimum miss distance of each date are kept as well, so that the close approaches ingested
+    later are added with `added`, at the cost of the number of dates instead of the number of close approaches.
+    """
+
+    Classes = (True, False, None)
+
+    # Length of the YYYY-MM-DD prefix of the close approach dates of each group
+    Groups = {'day': 10, 'month': 7, 'year': 4}
+
+    def __init__(self, date_neo_db, sorted_dates, neo_objects):
+        """
+        :param date_neo_db: dict of orbit date to list of NearEarthObject instances
+        :param sorted_dates: sorted list of the orbit dates of date_neo_db
+        :param neo_objects: iterable of the NearEarthObject instances of the database
+        """
+        self.date_neo_db = date_neo_db
+        self.dates = list(sorted_dates)
+        self.approaches = {hazardous: [0] * len(self.dates) for hazardous in DateRollups.Classes}
+        self.distances = {hazardous: [INFINITY] * len(self.dates) for hazardous in DateRollups.Classes}
+        self.date_neos = {hazardous: [0] * len(self.dates) for hazardous in DateRollups.Classes}
+        self.group_neos = {group: {hazardous: Counter() for hazardous in DateRollups.Classes}
+                           for group in ('month', 'year')}
+        self.count_approaches((neo, neo.orbits, ()) for neo in neo_objects)
+        self.build_ranges()
+
+    def count_approaches(self, neo_approaches):
+        """
+        Adds close approaches to the aggregates of their dates, which must already be in the dates of the rollups.
+
+        :param neo_approaches: iterable of tuples of a NearEarthObject, its OrbitPath instances to add and its
+        OrbitPath instances already counted
+        :return: None
+        """
+        positions = {date: position for position, date in enumerate(self.dates)}
+        for neo, orbits, counted_orbits in neo_approaches:
+            hazardous = neo.is_potentially_hazardous_asteroid
+            class_approaches = self.approaches[hazardous]
+            class_distances = self.distances[hazardous]
+            neo_positions = set()
+            for orbit in orbits:
+                position = positions[orbit.close_approach_date]
+                class_approaches[position] += 1
+                if orbit.miss_distance_kilometers < class_distances[position]:
+                    class_distances[position] = orbit.miss_distance_kilometers
+                neo_positions.add(position)
+            # A Near Earth Object is only counted once on each date, month and year
+            counted_positions = {positions[orbit.close_approach_date] for orbit in counted_orbits}
+            for position in neo_positions - counted_positions:
+                self.date_neos[hazardous][position] += 1
+            for group in ('month', 'year'):
+                prefix = DateRollups.Groups[group]
+                self.group_neos[group][hazardous].update(
+                    {self.dates[position][:prefix] for position in neo_positions}
+                    - {self.dates[position][:prefix] for position in counted_positions})
+        return None
+
+    def build_ranges(self):
+        """
+        Rebuilds the prefix sums of the approaches and the SparseTable of the minimum miss distance of each class.
+
+        :return: None
+        """
+        self.approach_sums = {hazardous: list(accumulate(self.approaches[hazardous], initial=0))
+                              for hazardous in DateRollups.Classes}
+        self.min_distances = {hazardous: SparseTable(self.distances[hazardous]) for hazardous in DateRollups.Classes}
+        return None
+
+    def added(self, orbits):
+        """
+        Adds close approaches ingested after the rollups were computed. The rollups are left unchanged, so that an
+        aggregate running meanwhile reads consistent rollups, and the returned rollups replace them at once.
+
+        :param orbits: iterable of the OrbitPath instances added to the database since the rollups were computed
+        :return: DateRollups with the close approaches of orbits added
+        """
+        neo_orbits = {}
+        for orbit in orbits:
+            neo_orbits.setdefault(orbit.neo, []).append(orbit)
+
+        rollups = copy.copy(self)
+        rollups.dates = sorted(set(self.dates).union(
+            orbit.close_approach_date for orbits in neo_orbits.values() for orbit in orbits))
+        # The aggregates of each date move to the position of the date among the new dates
+        for name, empty in [('approaches', 0), ('distances', INFINITY), ('date_neos', 0)]:
+            values = getattr(self, name)
+            dates_values = {hazardous: dict(zip(self.dates, values[hazardous])) for hazardous in DateRollups.Classes}
+            setattr(rollups, name, {hazardous: [dates_values[hazardous].get(date, empty) for date in rollups.dates]
+                                    for hazardous in DateRollups.Classes})
+        rollups.group_neos = {group: {hazardous: Counter(counter) for hazardous, counter in class_neos.items()}
+                              for group, class_neos in self.group_neos.items()}
+
+        def neo_approaches():
+            for neo, orbits in neo_orbits.items():
+                added_orbits = set(orbits)
+                yield neo, orbits, [orbit for orbit in neo.orbits if orbit not in added_orbits]
+
+        rollups.count_approaches(neo_approaches())
+        rollups.build_ranges()
+        return rollups
+
+    def groups(self, low, high, group_by):
+        """
+        :param low: int representing the position of the first date of the range
+        :param high: int representing the position after the last date of the range
+        :param group_by: str representing the group of dates, day, month or year
+        :return: generator of the key, the first and past the last positions of each group of the range
+        """
+        prefix = DateRollups.Groups[group_by]
+        while low < high:
+            key = self.dates[low][:prefix]
+            # Dates are YYYY-MM-DD strings, `~` sorts after every character following the prefix of a group
+            group_high = bisect_left(self.dates, key + '~', low, high)
+            yield key, low, group_high
+            low = group_high
+
+    def unique_neos(self, key, low, high, group_by, hazardous):
+        """
+        :param key: str representing the group of dates
+        :param low: int representing the position of the first date of the group in the range
+        :param high: int representing the position after the last date of the group in the range
+        :param group_by: str representing the group of dates, day, month or year
+        :param hazardous: hazard class of the Near Earth Objects
+        :return: int representing the number of unique Near Earth Objects of the class on the dates of the group
+        """
+        if group_by == 'day':
+            return self.date_neos[hazardous][low]
+        # A whole month or year is read from its rollup, a group cut by the range from its dates
+        if low == bisect_left(self.dates, key) and high == bisect_left(self.dates, key + '~'):
+            return self.group_neos[group_by][hazardous][key]
+        return len({neo for date in self.dates[low:high] for neo in self.date_neo_db[date]
+                    if neo.is_potentially_hazardous_asteroid is hazardous})
+
+    def aggregate(self, start_date=None, end_date=None, group_by='day', classes=Classes):
+        """
+        :param start_date: str representing the first date of the range, None for no lower bound
+        :param end_date: str representing the last date of the range, None for no upper bound
+        :param group_by: str representing the group of dates, day, month or year
+        :param classes: collection of the hazard classes of the aggregated Near Earth Objects
+        :return: list of the Aggregate of each group of dates of the range with close approaches, by date
+        """
+        if group_by not in DateRollups.Groups:
+            raise Exception('group_by: `{}` not supported. Available groups: `{}`'.format(
+                str(group_by), ', '.join(DateRollups.Groups)))
+        classes = [hazardous for hazardous in DateRollups.Classes if hazardous in classes]
+        low = 0 if start_date is None else bisect_left(self.dates, start_date)
+        high = len(self.dates) if end_date is None else bisect_right(self.dates, end_date)
+
+        aggregates = []
+        for key, group_low, group_high in self.groups(low, high, group_by):
+            approaches = sum(self.approach_sums[hazardous][group_high] - self.approach_sums[hazardous][group_low]
+                             for hazardous in classes)
+            if not approaches:
+                continue
+            neos = {hazardous: self.unique_neos(key, group_low, group_high, group_by, hazardous)
+                    for hazardous in classes}
+            min_distance = min(self.min_distances[hazardous].minimum(group_low, group_high) for hazardous in classes)
+            aggregates.append(Aggregate.from_counts(key, approaches, sum(neos.values()), neos.get(True, 0),
+                                                    min_distance))
+        return aggregates
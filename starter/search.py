@@ -3,9 +3,14 @@ from enum import Enum
 from exceptions import UnsupportedFeature
 from operator import *
 from exceptions import *
-from models import NearEarthObject, OrbitPath
+from database import NEODatabase
+from cache import ResultCache
+from models import Aggregate, NearEarthObject, OrbitPath
+from profiler import NULL_PROFILER
+from rollups import INFINITY, DateRollups
 from collections import defaultdict
-from functools import reduce
+import heapq
+from itertools import chain, islice
 
 class DateSearch(Enum):
     """
@@ -27,9 +32,13 @@ class Query(object):
     to structure the query information into a format the NEOSearcher can use for date search.
     """
 
-    Selectors = namedtuple('Selectors', ['date_search', 'number', 'filters', 'return_object'])
+    Selectors = namedtuple('Selectors', ['date_search', 'number', 'filters', 'return_object', 'order'],
+                           defaults=[None])
     DateSearch = namedtuple('DateSearch', ['type', 'values'])
+    Order = namedtuple('Order', ['field', 'descending'])
     ReturnObjects = {'NEO': NearEarthObject, 'Path': OrbitPath}
+    OrderFields = ['date', 'diameter', 'distance']
+    OrderDirections = ['asc', 'desc']
 
     def __init__(self, **kwargs):
         """
@@ -39,9 +48,9 @@ class Query(object):
 
         # number of output records
         self.output_count = None
-        if "number" in kwargs:
+        if kwargs.get("number") is not None:
             self.output_count = int(kwargs["number"])
-        elif "n" in kwargs:
+        elif kwargs.get("n") is not None:
             self.output_count = int(kwargs["n"])
 
         # date
@@ -78,6 +87,16 @@ class Query(object):
         if "filter" in kwargs:
             self.filters = kwargs["filter"]
 
+        # order_by and order
+        self.order_by = kwargs.get("order_by")
+        if self.order_by is not None and self.order_by not in Query.OrderFields:
+            raise Exception("order_by: `{}` not supported. Available order_by fields: `{}`".
+                            format(str(self.order_by), str(", ".join(Query.OrderFields))))
+        self.order = kwargs.get("order") or "asc"
+        if self.order not in Query.OrderDirections:
+            raise Exception("order: `{}` not supported. Available orders: `{}`".
+                            format(str(self.order), str(", ".join(Query.OrderDirections))))
+
     def build_query(self):
         """
         Transforms the provided query options, set upon initialization, into a set of Selectors that the NEOSearcher
@@ -94,23 +113,30 @@ class Query(object):
             date_filter += [Query.DateSearch(DateSearch.equals, [self.date])]
 
         # Building Filters (diameter, distance, is_hazardous)
+        # The filters are compiled when they are created, the search only runs their predicates
         neo_orbit_filters = []
         if self.filters is not None:
             filter_options = Filter.create_filter_options(self.filters) # defaultdict
-            neo_filters = filter_options["NEO"]
-            orbit_filters = filter_options["Path"]
-            for neo_f in neo_filters:
-                neo_orbit_filters += [Filter(neo_f.field, neo_f.object, neo_f.operation, neo_f.value)]
-            for orbit_f in orbit_filters:
-                neo_orbit_filters += [Filter(orbit_f.field, orbit_f.object, orbit_f.operation, orbit_f.value)]
+            neo_orbit_filters += filter_options["NEO"]
+            neo_orbit_filters += filter_options["Path"]
+
+        # Building Order, the results are in the order of the date search without it
+        order = None
+        if self.order_by is not None:
+            order = Query.Order(self.order_by, self.order == "desc")
 
-        return Query.Selectors(date_filter, self.output_count, neo_orbit_filters, Query.ReturnObjects[self.return_object])
+        return Query.Selectors(date_filter, self.output_count, neo_orbit_filters, Query.ReturnObjects[self.return_object],
+                               order)
 
 
 class Filter(object):
     """
     Object representing optional filter options to be used in the date search for Near Earth Objects.
     Each filter is one of Filter.Operators provided with a field to filter on a value.
+
+    A filter is compiled once, when it is created: its value is validated and converted to the type of its field, and
+    its comparison becomes a predicate on a NearEarthObject or OrbitPath. The predicates of the filters on the same
+    object are combined into a single predicate, so that a search checks all its filters in one pass over the results.
     """
     Options = {
         # TODO: Create a dict of filter name to the NearEarthObject or OrbitalPath property
@@ -119,6 +145,13 @@ class Filter(object):
         "distance": "Path"
     }
 
+    # Attribute of the NearEarthObject or OrbitPath compared by each filter option
+    Attributes = {
+        "diameter": "diameter_min_km",
+        "is_hazardous": "is_potentially_hazardous_asteroid",
+        "distance": "miss_distance_kilometers"
+    }
+
     Operators = {
         # TODO: Create a dict of operator symbol to an Operators method, see README Task 3 for hint
         ">": gt,
@@ -140,9 +173,109 @@ class Filter(object):
         self.operation = operation
         self.value = value
 
+        if field not in Filter.Attributes:
+            raise Exception(
+                "Key: `{}` not found or Filter on key: `{}` is currently not supported. Available filter keys: `{}`".
+                format(str(field), str(field), str(", ".join(Filter.Options.keys()))))
+        self.attribute = Filter.Attributes[field]
+        self.typed_value = Filter.parse_value(field, value)
+        self.comparison, self.compiled_value = Filter.compile_comparison(field, operation, self.typed_value)
+
     def __str__(self):
         return "Field: {}, Object: {}, Operator: {}, Value: {}".format(str(self.field), str(self.object), str(self.operation), str(self.value))
 
+    @staticmethod
+    def parse_value(field, value):
+        """
+        :param field: str representing field to filter on
+        :param value: str representing value to filter for
+        :return: float value of the diameter and distance filters, lowercase str value of the is_hazardous filter
+        """
+        if field == "is_hazardous":
+            typed_value = str(value).lower()
+            if typed_value not in ("true", "false"):
+                raise Exception("Value: `{}` of filter on key: `{}` not supported. Available values: `True, False`".
+                                format(str(value), str(field)))
+            return typed_value
+
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            raise Exception("Value: `{}` of filter on key: `{}` is not a number".format(str(value), str(field)))
+
+    @staticmethod
+    def compile_comparison(field, operation, typed_value):
+        """
+        :param field: str representing field to filter on
+        :param operation: Filter.Operators method of the filter
+        :param typed_value: value of the filter, as returned by parse_value
+        :return: tuple of the function comparing an attribute value with the compiled value, and the compiled value
+        """
+        if field == "is_hazardous":
+            # is_potentially_hazardous_asteroid is True, False or None: the comparison of its lowercase str with the
+            # value is evaluated once for each of them, leaving a membership test
+            return Filter.is_in, frozenset(hazardous for hazardous in (True, False, None)
+                                           if operation(str(hazardous).lower(), typed_value))
+        return operation, typed_value
+
+    @staticmethod
+    def is_in(attribute_value, values):
+        """
+        :param attribute_value: value of the filtered attribute of a NearEarthObject or OrbitPath
+        :param values: frozenset of the matching values
+        :return: bool representing if the value is one of the matching values
+        """
+        return attribute_value in values
+
+    def test(self, attribute_value):
+        """
+        :param attribute_value: value of the filtered attribute of a NearEarthObject or OrbitPath
+        :return: bool representing if the value matches the filter
+        """
+        return self.comparison(attribute_value, self.compiled_value)
+
+    @staticmethod
+    def key(filters):
+        """
+        :param filters: list of Filters
+        :return: tuple identifying the filters, whatever their order
+        """
+        return tuple(sorted(((_filter.field, _filter.comparison, _filter.compiled_value) for _filter in filters),
+                            key=repr))
+
+    @staticmethod
+    def compile_predicate(filters):
+        """
+        Combines filters on the same object into a single predicate: each filter is a closure reading its attribute
+        with an attrgetter and comparing it with its compiled value, and the closures are chained with `and`, so that
+        the filters are checked in order and the first mismatch ends the check.
+
+        :param filters: list of Filters on the same object
+        :return: function of a NearEarthObject or OrbitPath returning if it matches all the filters, None without filters
+        """
+        if not filters:
+            return None
+
+        predicate = None
+        for _filter in reversed(filters):
+            predicate = Filter.chain_comparison(attrgetter(_filter.attribute), _filter.comparison,
+                                                _filter.compiled_value, predicate)
+        return predicate
+
+    @staticmethod
+    def chain_comparison(get_attribute, comparison, value, next_predicate):
+        """
+        :param get_attribute: function reading the filtered attribute of a NearEarthObject or OrbitPath
+        :param comparison: function comparing the attribute value with value
+        :param value: compiled value of the filter
+        :param next_predicate: predicate of the following filters, None for the last filter
+        :return: function of a NearEarthObject or OrbitPath returning if it matches the filter and next_predicate
+        """
+        if next_predicate is None:
+            return lambda result: comparison(get_attribute(result), value)
+        # A generator checked by all() costs more than the comparisons of a query's few filters
+        return lambda result: comparison(get_attribute(result), value) and next_predicate(result)
+
     @staticmethod
     def create_filter_options(filter_options):
 
@@ -162,11 +295,17 @@ class Filter(object):
         # TODO: return a defaultdict of filters with key of NearEarthObject or OrbitPath and value of empty list or list of Filters
         for _filter in filter_options:
             filter_str = _filter.split(":")
+            if len(filter_str) != 3:
+                raise Exception("Filter: `{}` not supported. Filters are in the format `option:operation:value`".
+                                format(str(_filter)))
             _key = filter_str[0]
             if _key not in Filter.Options:
                 raise Exception("Key: `{}` not found or Filter on key: `{}` is currently not supported. Available filter keys: `{}`".
                                 format(str(_key), str(_key), str(", ".join(Filter.Options.keys()))))
             _object = Filter.Options[_key]
+            if filter_str[1] not in Filter.Operators:
+                raise Exception("Operation: `{}` not supported. Available operations: `{}`".
+                                format(str(filter_str[1]), str(", ".join(Filter.Operators.keys()))))
             _operation = Filter.Operators[filter_str[1]]
             _value = filter_str[2]
             if _object == "NEO":
@@ -189,45 +328,99 @@ class Filter(object):
         :return: filtered list of Near Earth Object results
         """
         # TODO: Takes a list of NearEarthObjects and applies the value of its filter operation to the results
-        if self.field == "diameter":
-            return list(filter(lambda n: self.operation(n.diameter_min_km, float(self.value)), results))
-        elif self.field == "is_hazardous":
-            return list(filter(lambda n: self.operation(str(n.is_potentially_hazardous_asteroid).lower(), str(self.value).lower()), results))
-        # Tricky Part
-        elif self.field == "distance":
-            updated_neo_results = []
-            for neo in results:
-                updated_neo_orbit = list(filter(lambda orbit: self.operation(orbit.miss_distance_kilometers, float(self.value)), neo.orbits))
-                neo.update_orbits(updated_neo_orbit, True)
-                if len(neo.orbits) > 0:
-                    updated_neo_results.append(neo)
-            return updated_neo_results
-        else:
-            raise Exception(
-                "Key: `{}` not found or Filter on key: `{}` is currently not supported. Available filter keys: `{}`".
-                format(str(self.field), str(self.field), str(", ".join(Filter.Options.keys()))))
+        return list(self.iter_apply(results))
+
+    def iter_apply(self, results):
+        """
+        Lazy version of apply, filtering the Near Earth Objects one at a time as they are requested
+
+        :param results: iterable of Near Earth Object results
+        :return: generator of the filtered Near Earth Object results
+        """
+        return Filter.iter_apply_all([self], results)
+
+    @staticmethod
+    def iter_apply_all(filters, results, profiler=NULL_PROFILER):
+        """
+        Applies filters to the Near Earth Objects in a single pass: the combined predicate of the NEO filters first,
+        then the combined predicate of the orbit filters on the orbits of the remaining Near Earth Objects.
+
+        :param filters: list of Filters
+        :param results: iterable of Near Earth Object results
+        :param profiler: Profiler counting the Near Earth Objects in and out of the NEO and orbit filters
+        :return: generator of the filtered Near Earth Object results
+        """
+        neo_predicate = Filter.compile_predicate([_filter for _filter in filters if _filter.object == "NEO"])
+        orbit_predicate = Filter.compile_predicate([_filter for _filter in filters if _filter.object == "Path"])
+        if neo_predicate is not None:
+            results = profiler.count_rows("NEO filters", results, "rows_in")
+            results = profiler.count_rows("NEO filters", filter(neo_predicate, results))
+        if orbit_predicate is not None:
+            results = profiler.count_rows("orbit filters", results, "rows_in")
+            results = profiler.count_rows("orbit filters", Filter.iter_apply_orbits(orbit_predicate, results))
+        return results
+
+    @staticmethod
+    def iter_apply_orbits(orbit_predicate, results):
+        """
+        :param orbit_predicate: function of an OrbitPath returning if it matches the orbit filters
+        :param results: iterable of Near Earth Object results
+        :return: generator of copies of the Near Earth Objects holding only their orbits matching the filters
+        """
+        # Tricky Part: the loaded NearEarthObject is shared by every search, so the matching orbits are
+        # returned on a copy of it instead of overwriting its orbits
+        for neo in results:
+            updated_neo_orbit = list(filter(orbit_predicate, neo.orbits))
+            if updated_neo_orbit:
+                yield neo.with_orbits(updated_neo_orbit)
 
 class NEOSearcher(object):
     """
     Object with date search functionality on Near Earth Objects exposed by a generic
     search interface get_objects, which, based on the query specifications, determines
     how to perform the search.
+
+    When the database maintains secondary indexes, a search starts from the index giving the fewest rows, see plan,
+    and the filters are checked on the rows read from it. explain describes the chosen plan.
+
+    The results of get_objects are kept in a ResultCache, cleared whenever the database loads or ingests data.
+
+    A Profiler records the time of get_objects as the search phase and the rows in and out of each stage of the search.
     """
 
-    def __init__(self, db):
+    Plan = namedtuple('Plan', ['index', 'estimate', 'estimates'])
+
+    def __init__(self, db, cache_entries=128, cache_rows=100000, profiler=NULL_PROFILER):
         """
         :param db: NEODatabase holding the NearEarthObject instances and their OrbitPath instances
+        :param cache_entries: int representing the maximum number of queries in the result cache, 0 to disable it
+        :param cache_rows: int representing the maximum number of result rows held by the result cache
+        :param profiler: Profiler recording the metrics of the searches, disabled by default
         """
         # TODO: What kind of an instance variable can we use to connect DateSearch to how we do search?
         self.db = db
-        self.date_neo_db = db.date_neo_db
-        self.neo_object_db = db.neo_object_db
+        self.cache = ResultCache(max_entries=cache_entries, max_rows=cache_rows)
+        self.profiler = profiler
+
+    # The dicts are read from the database on each search, as loading a snapshot replaces them
+    @property
+    def date_neo_db(self):
+        return self.db.date_neo_db
+
+    @property
+    def neo_object_db(self):
+        return self.db.neo_object_db
 
     @staticmethod
-    def apply_date_filter(data_set, date_filter):
+    def apply_date_filter(data_set, date_filter, sorted_dates=None):
         """
+        Finds the unique Near Earth Object names recorded on the dates selected by date_filter. An `equals` search
+        is a single dict lookup and a `between` search is a binary search on the sorted list of dates, so the cost
+        depends on the number of matching dates rather than on the number of dates in the data_set.
+
         :param data_set: input data_set on which date_filter to be applied
         :param date_filter: input date_filter
+        :param sorted_dates: sorted list of the dates in data_set, sorted on demand if not provided
         :return: filtered data_set
         """
         # If date_filter is empty
@@ -238,80 +431,643 @@ class NEOSearcher(object):
             filter_values = date_filter[0].values
 
             if filter_type == "equals":
-                neo_objects = dict(filter(lambda date: eq(date[0], filter_values[0]), data_set.items()))
+                dates = [filter_values[0]] if filter_values[0] in data_set else []
             elif filter_type == "between":
-                neo_objects = dict(filter(lambda date: ge(date[0], filter_values[0]) and le(date[0], filter_values[1]), data_set.items()))
+                if sorted_dates is None:
+                    sorted_dates = sorted(data_set)
+                dates = NEODatabase.search_sorted_dates(sorted_dates, filter_values[0], filter_values[1])
             else:
                 raise Exception("{} filter not supported for date".format(str(filter_type)))
 
-            neo_names = set()
-            for date in neo_objects:
-                for neo in neo_objects[date]:
-                    neo_names.add(neo.name)
-            return list(neo_names)
+            neos = chain.from_iterable(map(data_set.__getitem__, dates))
+            return list(dict.fromkeys(map(attrgetter("name"), neos)))
+
+    def date_window(self, date_filter):
+        """
+        :param date_filter: input date_filter
+        :return: tuple of the first and last dates selected by date_filter, None for an open side
+        """
+        if not date_filter:
+            return None, None
+
+        filter_type = date_filter[0].type.value
+        filter_values = date_filter[0].values
+        if filter_type == "equals":
+            return filter_values[0], filter_values[0]
+        elif filter_type == "between":
+            return filter_values[0], filter_values[1]
+        raise Exception("{} filter not supported for date".format(str(filter_type)))
 
+    def selected_dates(self, date_filter):
+        """
+        :param date_filter: input date_filter
+        :return: list of the dates of date_neo_db selected by date_filter, in chronological order
+        """
+        if not date_filter:
+            return self.db.sorted_dates
+        start_date, end_date = self.date_window(date_filter)
+        if date_filter[0].type.value == "equals":
+            return [start_date] if start_date in self.date_neo_db else []
+        return self.db.dates_between(start_date, end_date)
 
-    def get_objects(self, query):
+    def iter_date_neos(self, date_filter):
         """
-        Generic search interface that, depending on the details in the QueryBuilder (query) calls the
-        appropriate instance search function, then applies any filters, with distance as the last filter.
+        Lazily yields the unique Near Earth Objects recorded on the dates selected by date_filter, in the
+        chronological order of their first close approach in the selected dates.
 
-        Once any filters provided are applied, return the number of requested objects in the query.return_object
-        specified.
+        :param date_filter: input date_filter
+        :return: generator of NearEarthObject
+        """
+        dates = self.selected_dates(date_filter)
+        seen_neos = {}
+        for date in dates:
+            yield from NEOSearcher.new_neos(seen_neos, self.date_neo_db[date])
+
+    @staticmethod
+    def new_neos(seen_neos, date_neos):
+        """
+        Join of a date to its unique NEOs: date_neo_db holds the single instance of each NearEarthObject, so the
+        instances themselves are the keys of an insertion ordered dict. Adding a date is a dict update done in C, and
+        the NEOs added by the date are the last keys of the dict.
+
+        :param seen_neos: dict of the NearEarthObjects of the previous dates, updated with the NEOs of the date
+        :param date_neos: list of the NearEarthObjects recorded on the date
+        :return: list of the NearEarthObjects of the date not in seen_neos, in their order on the date
+        """
+        seen_count = len(seen_neos)
+        seen_neos.update(dict.fromkeys(date_neos))
+        new_count = len(seen_neos) - seen_count
+        if not new_count:
+            return []
+        new_neos = list(islice(reversed(seen_neos), new_count))
+        new_neos.reverse()
+        return new_neos
+
+    def index_comparisons(self, filters, field):
+        """
+        :param filters: list of Filters of the query
+        :param field: str representing the filter field of a secondary index, `diameter` or `distance`
+        :return: list of the (operation, value) comparisons of the filters on field
+        """
+        return [(_filter.operation, _filter.compiled_value) for _filter in filters if _filter.field == field]
+
+    def plan(self, query):
+        """
+        Chooses the index the search starts from: the date index, or the secondary index on diameter or miss distance
+        when the database maintains them and the query filters on them. The estimate of an index is the number of rows
+        the search reads from it: the approaches on the selected dates, the NEOs in the diameter range or the orbits in
+        the distance range. The index with the smallest estimate is chosen, the date index on ties.
 
         :param query: Query.Selectors object with query information
-        :return: Dataset of NearEarthObjects or OrbitalPaths
+        :return: NEOSearcher.Plan of the chosen index, its estimate and the estimates of every usable index
         """
-        # TODO: This is a generic method that will need to understand, using DateSearch, how to implement search
-        # TODO: Write instance methods that get_objects can use to implement the two types of DateSearch your project
-        # TODO: needs to support that then your filters can be applied to. Remember to return the number specified in
-        # TODO: the Query.Selectors as well as in the return_type from Query.Selectors
+        if self.db.columnar_store is not None or self.db.sqlite_store is not None:
+            raise UnsupportedFeature('Query plans are not available for the {} backend'.format(self.db.backend_kind()))
 
-        # 1. Apply Date Filter
-        # 2. Apply Filters (`NEO` and `ORBIT`)
-        # 3. return_object (`NEO` or `ORBIT`) -> default = NEO
-        # 4. number (output count)
+        dates = self.selected_dates(query.date_search)
+        estimates = {"date": sum(map(len, map(self.date_neo_db.__getitem__, dates)))}
+        if self.db.diameter_index is not None:
+            for field, index in (("diameter", self.db.diameter_index), ("distance", self.db.distance_index)):
+                comparisons = self.index_comparisons(query.filters, field)
+                if comparisons:
+                    estimates[field] = index.count(comparisons)
 
-        # unique NEO names list on/between some dates
-        neo_names = NEOSearcher.apply_date_filter(self.date_neo_db, query.date_search)
-
-        # unique NEO Objects list on/between some dates
-        neo_objects = list(dict(filter(lambda neo: neo[0] in neo_names, self.neo_object_db.items())).values())
-
-        # Handling extra filters, return_object and number
-        if not query.filters:
-            if query.return_object == NearEarthObject:
-                return neo_objects[0:query.number]
-            elif query.return_object == OrbitPath:
-                if not neo_objects:
-                    return []
-                orbits = map(lambda n: n.orbits, neo_objects)
-                if not orbits:
-                    return orbits[0:query.number]
-                else:
-                    return reduce(concat, orbits)[0:query.number]
+        # min keeps the first of equal estimates, the date index comes first
+        index = min(estimates, key=estimates.get)
+        return NEOSearcher.Plan(index, estimates[index], estimates)
+
+    def explain(self, query, group_by=None):
+        """
+        :param query: Query.Selectors object with query information
+        :param group_by: str representing the group of dates of the aggregates of the query, None for its results
+        :return: str describing the plan of the query, or of its aggregates with group_by
+        """
+        if group_by is not None:
+            if self.aggregates_from_rollups(query):
+                return "Aggregates by {}: read from the rollups".format(group_by)
+            reason = "only is_hazardous filters are answered by the rollups" if self.db.date_rollups is not None \
+                else "the database has no rollups"
+            return "Aggregates by {}: scan of the date index, {} rows read ({})".format(
+                group_by, self.plan(query).estimates["date"], reason)
+
+        plan = self.plan(query)
+        estimates = ", ".join("{}: {}".format(index, estimate) for index, estimate in plan.estimates.items())
+        explanation = "Plan: {} index, {} rows read (estimated rows per index: {})".format(
+            plan.index, plan.estimate, estimates)
+        if query.order is not None:
+            index = self.order_index(query)
+            direction = "desc" if query.order.descending else "asc"
+            if index is not None:
+                explanation += ", ordered by {} {} reading the {} index".format(query.order.field, direction, index)
+            elif query.number is not None:
+                explanation += ", ordered by {} {} with a top-{} heap".format(query.order.field, direction,
+                                                                             query.number)
             else:
+                explanation += ", ordered by {} {} with a sort of the results".format(query.order.field, direction)
+        return explanation
+
+    def iter_index_neos(self, query, index):
+        """
+        Finds the Near Earth Objects in the range of the filters on a secondary index and recorded on the dates of the
+        query, in the order of iter_date_neos: by their first close approach in the selected dates, then by their
+        position in the list of Near Earth Objects of that date.
+
+        :param query: Query.Selectors object with query information
+        :param index: str representing the secondary index to read, `diameter` or `distance`
+        :return: iterator of NearEarthObject
+        """
+        if index == "diameter":
+            neo_objects = self.db.diameter_index.range(self.index_comparisons(query.filters, "diameter"))
+        else:
+            orbits = self.db.distance_index.range(self.index_comparisons(query.filters, "distance"))
+            neo_objects = dict.fromkeys(map(attrgetter("neo"), orbits))
+
+        start_date, end_date = self.date_window(query.date_search)
+        ordered_neos = []
+        for neo in neo_objects:
+            dates = [orbit.close_approach_date for orbit in neo.orbits
+                     if (start_date is None or orbit.close_approach_date >= start_date)
+                     and (end_date is None or orbit.close_approach_date <= end_date)]
+            if dates:
+                first_date = min(dates)
+                ordered_neos.append(((first_date, self.db.date_positions[first_date][neo]), neo))
+        ordered_neos.sort(key=itemgetter(0))
+        return map(itemgetter(1), ordered_neos)
+
+    def iter_neo_results(self, query):
+        """
+        Lazily yields the Near Earth Objects of the results of a query, before its return_object and number: the
+        Near Earth Objects of the date index or of the most selective secondary index, through the filters.
+
+        :param query: Query.Selectors object with query information
+        :return: generator of NearEarthObjects, holding only their orbits matching the orbit filters
+        """
+        # 1. Apply Date Filter, or read the range of the most selective secondary index
+        plan = self.plan(query)
+        if plan.index == "date":
+            neo_objects = self.iter_date_neos(query.date_search)
+        else:
+            neo_objects = self.iter_index_neos(query, plan.index)
+        neo_objects = self.profiler.count_rows("{} index".format(plan.index), neo_objects)
+
+        # 2. Apply Filters in a single pass, NEO filters first and orbit filters (distance) last
+        return Filter.iter_apply_all(query.filters, neo_objects, self.profiler)
+
+    def iter_objects(self, query):
+        """
+        Lazy version of get_objects: a generator pipeline of the date index, the NEO filters, the orbit filters and
+        the projection to the query.return_object, which stops as soon as query.number results have been produced.
+        An ordered query returns its first query.number results in query.order, see iter_ordered. Unordered OrbitPath
+        results are every orbit of the Near Earth Objects found, matching the orbit filters, including the orbits
+        outside of the date window, while ordered OrbitPath results are only their orbits in the date window, and
+        ordered NearEarthObject results only the Near Earth Objects with one of these orbits in the date window.
+
+        :param query: Query.Selectors object with query information
+        :return: generator of NearEarthObjects or OrbitalPaths
+        """
+        if query.order is not None:
+            if query.return_object not in (NearEarthObject, OrbitPath):
                 raise Exception("return_object: `{}` not found. Available return_objects: `{}`".
                                 format(str(query.return_object), str(", ".join(["NEO", "Path"]))))
+            yield from self.profiler.count_rows("results", self.iter_ordered(query))
+            return
+
+        # The columnar backend evaluates the whole query over its NumPy columns
+        if self.db.columnar_store is not None:
+            yield from self.profiler.count_rows("results", self.db.columnar_store.iter_objects(query))
+            return
+
+        # The sqlite backend answers the whole query with a SQL query
+        if self.db.sqlite_store is not None:
+            yield from self.profiler.count_rows("results", self.db.sqlite_store.iter_objects(query))
+            return
+
+        if query.return_object not in (NearEarthObject, OrbitPath):
+            raise Exception("return_object: `{}` not found. Available return_objects: `{}`".
+                            format(str(query.return_object), str(", ".join(["NEO", "Path"]))))
+
+        # 1. and 2. Date index or secondary index, and Filters
+        neo_objects = self.iter_neo_results(query)
+
+        # 3. return_object (`NEO` or `ORBIT`)
+        if query.return_object == OrbitPath:
+            results = chain.from_iterable(map(attrgetter("orbits"), neo_objects))
         else:
-            neo_filters = filter(lambda f: f.object == "NEO", query.filters)
-            orbit_filters = filter(lambda f: f.object == "Path", query.filters)
-
-            # Adding Orbit Filter at last to filter with distance (object = ORBIT) at last
-            all_filters = [*neo_filters, *orbit_filters]
-            for _filter in all_filters:
-                neo_objects = _filter.apply(neo_objects)
-
-            if query.return_object == NearEarthObject:
-                return list(neo_objects)[0:query.number]
-            elif query.return_object == OrbitPath:
-                if not neo_objects:
-                    return []
-                orbits = map(lambda n: n.orbits, neo_objects)
-                if not orbits:
-                    return orbits[0:query.number]
-                else:
-                    return reduce(concat, orbits)[0:query.number]
+            results = neo_objects
+
+        # 4. number (output count)
+        yield from self.profiler.count_rows("results", islice(results, query.number))
+
+    @staticmethod
+    def window_orbits(neo, start_date, end_date):
+        """
+        :param neo: NearEarthObject of the results
+        :param start_date: str representing the first date of the date window, None for an open side
+        :param end_date: str representing the last date of the date window, None for an open side
+        :return: list of the orbits of neo in the date window
+        """
+        if start_date is None and end_date is None:
+            return neo.orbits
+        return [orbit for orbit in neo.orbits
+                if (start_date is None or orbit.close_approach_date >= start_date)
+                and (end_date is None or orbit.close_approach_date <= end_date)]
+
+    @staticmethod
+    def order_key(order, return_object, date_window):
+        """
+        Sort key of the results ordered on order.field. An orbit is ordered on its close approach date or miss
+        distance, and on the diameter of its Near Earth Object. A Near Earth Object is ordered on its diameter, and on
+        the first date and the smallest miss distance of its close approaches in the date window, of which it has at
+        least one.
+
+        :param order: Query.Order of the query
+        :param return_object: NearEarthObject or OrbitPath, the class of the ordered results
+        :param date_window: tuple of the first and last dates of the date window, None for an open side
+        :return: function of a result returning its sort key
+        """
+        if order.field == "diameter":
+            if return_object == OrbitPath:
+                return lambda orbit: orbit.neo.diameter_min_km
+            return attrgetter("diameter_min_km")
+        if return_object == OrbitPath:
+            return attrgetter("close_approach_date" if order.field == "date" else "miss_distance_kilometers")
+        if order.field == "date":
+            return lambda neo: min(orbit.close_approach_date
+                                   for orbit in NEOSearcher.window_orbits(neo, *date_window))
+        return lambda neo: min(orbit.miss_distance_kilometers
+                               for orbit in NEOSearcher.window_orbits(neo, *date_window))
+
+    @staticmethod
+    def top_results(neo_results, query, date_window):
+        """
+        Top-K selection of the results of an ordered query: the first query.number results in query.order are
+        selected with a heap of query.number results, the results are only sorted without number. Equal results stay
+        in the order of the search, as a stable sort would leave them.
+
+        An ordered query ranks the close approaches in its date window only: the ordered orbits are the orbits of the
+        results in the date window, and the ordered Near Earth Objects are the results with an orbit in the date
+        window. Orbits ordered on the diameter of their Near Earth Object are the orbits in the date window of the
+        Near Earth Objects ordered on diameter, of which at most query.number are needed.
+
+        :param neo_results: iterable of the Near Earth Objects of the results of the query without order and number
+        :param query: Query.Selectors object with query information and order
+        :param date_window: tuple of the first and last dates of the date window, None for an open side
+        :return: iterator of the ordered NearEarthObjects or OrbitalPaths
+        """
+        order = query.order
+        if query.return_object == OrbitPath and order.field != "diameter":
+            results = chain.from_iterable(NEOSearcher.window_orbits(neo, *date_window) for neo in neo_results)
+            key = NEOSearcher.order_key(order, OrbitPath, date_window)
+        else:
+            results = (neo for neo in neo_results if NEOSearcher.window_orbits(neo, *date_window))
+            key = NEOSearcher.order_key(order, NearEarthObject, date_window)
+
+        if query.number is None:
+            ordered = sorted(results, key=key, reverse=order.descending)
+        else:
+            # heapq.nsmallest and nlargest keep the first of equal results, as sorted does
+            ordered = (heapq.nlargest if order.descending else heapq.nsmallest)(query.number, results, key=key)
+
+        if query.return_object == OrbitPath and order.field == "diameter":
+            ordered = chain.from_iterable(NEOSearcher.window_orbits(neo, *date_window) for neo in ordered)
+        return islice(ordered, query.number)
+
+    def order_index(self, query):
+        """
+        Chooses the sorted index an ordered query reads its results from: the distance index for orbits ordered on
+        miss distance and the diameter index for results ordered on diameter, when the database maintains them. The
+        index is read in order until query.number results match the date search and the filters, which reads about
+        query.number divided by the share of orbits in the date window rows, and is chosen when it is fewer than the
+        rows of the date window selected by the top-K heap.
+
+        :param query: Query.Selectors object with query information and order
+        :return: str representing the sorted index to read, `diameter` or `distance`, or None for the top-K heap
+        """
+        if self.db.diameter_index is None or query.number is None or not len(self.db.distance_index):
+            return None
+        if query.order.field == "diameter":
+            index = "diameter"
+        elif query.order.field == "distance" and query.return_object == OrbitPath:
+            index = "distance"
+        else:
+            return None
+
+        window_rows = self.plan(query).estimates["date"]
+        if query.number * len(self.db.distance_index) >= window_rows * window_rows:
+            return None
+        return index
+
+    def iter_ordered(self, query):
+        """
+        Finds the first query.number results of an ordered query, from a sorted index when order_index chooses one,
+        otherwise with top_results over the results of the query.
+
+        :param query: Query.Selectors object with query information and order
+        :return: iterator of the ordered NearEarthObjects or OrbitalPaths
+        """
+        date_window = self.date_window(query.date_search)
+        if query.number == 0:
+            return iter([])
+        if self.db.columnar_store is None and self.db.sqlite_store is None:
+            index = self.order_index(query)
+            if index is not None:
+                return self.iter_index_ordered(query, index)
+            return NEOSearcher.top_results(self.iter_neo_results(query), query, date_window)
+
+        unordered = query._replace(number=None, order=None, return_object=NearEarthObject)
+        store = self.db.columnar_store if self.db.columnar_store is not None else self.db.sqlite_store
+        return NEOSearcher.top_results(store.iter_objects(unordered), query, date_window)
+
+    def iter_index_ordered(self, query, index):
+        """
+        Reads the results of an ordered query from a sorted index, in the order of its keys or in the reverse order,
+        checking the date search and the filters on each Near Earth Object once. As in top_results, only the close
+        approaches in the date window are ranked. The reading stops once query.number results are found, after the
+        results with the same key as the last one; the results with the same key are then put in the order of the
+        search, as top_results does.
+
+        :param query: Query.Selectors object with query information and order
+        :param index: str representing the sorted index to read, `diameter` or `distance`
+        :return: iterator of the ordered NearEarthObjects or OrbitalPaths
+        """
+        start_date, end_date = self.date_window(query.date_search)
+        neo_predicate = Filter.compile_predicate([_filter for _filter in query.filters if _filter.object == "NEO"])
+        orbit_predicate = Filter.compile_predicate([_filter for _filter in query.filters if _filter.object == "Path"])
+        matches = {}  # Storing a dict of the loaded NearEarthObject to its result, None if it does not match
+
+        def in_window(orbit):
+            """
+            :return: bool representing if the close approach of the orbit is in the date window
+            """
+            return ((start_date is None or orbit.close_approach_date >= start_date)
+                    and (end_date is None or orbit.close_approach_date <= end_date))
+
+        def match(neo):
+            """
+            :return: the result of the loaded NearEarthObject, with its orbits matching the orbit filters, or None
+                     when it does not match or none of these orbits is in the date window
+            """
+            if neo not in matches:
+                result = None
+                if neo_predicate is None or neo_predicate(neo):
+                    orbits = neo.orbits if orbit_predicate is None else list(filter(orbit_predicate, neo.orbits))
+                    if any(map(in_window, orbits)):
+                        result = neo if orbit_predicate is None else neo.with_orbits(orbits)
+                matches[neo] = result
+            return matches[neo]
+
+        def position(result, neo):
+            """
+            :return: tuple of the position of the result of the loaded NearEarthObject in the results without order
+            """
+            first_date = min(orbit.close_approach_date
+                             for orbit in NEOSearcher.window_orbits(neo, start_date, end_date))
+            orbit_position = neo.orbits.index(result) if index == "distance" else 0
+            return first_date, self.db.date_positions[first_date][neo], orbit_position
+
+        objects = self.db.distance_index.objects if index == "distance" else self.db.diameter_index.objects
+        if query.order.descending:
+            objects = reversed(objects)
+        # Pairs of a result and of its loaded NearEarthObject
+        if index == "distance":
+            # Orbits in the date window of the matching Near Earth Objects, themselves matching the orbit filters
+            results = ((orbit, orbit.neo) for orbit in objects if in_window(orbit)
+                       and (orbit_predicate is None or orbit_predicate(orbit)) and match(orbit.neo) is not None)
+        else:
+            results = ((matches[neo], neo) for neo in objects if match(neo) is not None)
+        key = NEOSearcher.order_key(query.order, OrbitPath if index == "distance" else NearEarthObject,
+                                    (start_date, end_date))
+
+        selected = []
+        found = 0
+        for result, neo in self.profiler.count_rows("{} order index".format(index), results):
+            if found >= query.number and key(result) != key(selected[-1][0]):
+                break
+            selected.append((result, neo))
+            # Orbits ordered on diameter are the orbits in the date window of the Near Earth Objects ordered on diameter
+            if index == "diameter" and query.return_object == OrbitPath:
+                found += len(NEOSearcher.window_orbits(result, start_date, end_date))
             else:
+                found += 1
+
+        selected.sort(key=lambda pair: position(*pair))
+        selected.sort(key=lambda pair: key(pair[0]), reverse=query.order.descending)
+        selected = map(itemgetter(0), selected)
+        if index == "diameter" and query.return_object == OrbitPath:
+            selected = chain.from_iterable(NEOSearcher.window_orbits(neo, start_date, end_date) for neo in selected)
+        return islice(selected, query.number)
+
+    def get_objects_batch(self, queries):
+        """
+        Batch version of get_objects: answers many queries in a single walk of the date index, see scan_batch. Each
+        query gets its own list of results, the same as get_objects would return for it, and the result cache is
+        read and filled as by get_objects.
+
+        The columnar and sqlite backends, and ordered queries, answer the queries one at a time.
+
+        :param queries: list of Query.Selectors objects with query information
+        :return: list of the Dataset of NearEarthObjects or OrbitalPaths of each query, in the order of queries
+        """
+        version = self.db.version
+        with self.profiler.phase("batch search") as phase:
+            results = [self.cache.get(query, version) for query in queries]
+            pending = [index for index, found in enumerate(results) if found is None]
+            batched = []
+            if self.db.columnar_store is None and self.db.sqlite_store is None:
+                batched = [index for index in pending if queries[index].order is None]
+            scanned = dict(zip(batched, self.scan_batch([queries[index] for index in batched])))
+            for index in pending:
+                found = scanned[index] if index in scanned else list(self.iter_objects(queries[index]))
+                results[index] = found
+                self.cache.put(queries[index], version, found)
+            phase.rows_in = len(queries)
+            phase.rows_out = sum(map(len, results))
+        return results
+
+    def scan_batch(self, queries):
+        """
+        Answers queries in a single walk of the dates of the union of their date windows, in chronological order.
+        Queries with the same date window share the join of each date to its new NEOs, and the filters are evaluated
+        once per NearEarthObject for each distinct set of NEO filters and of orbit filters, whichever queries they
+        come from. A query stops collecting results once it has its number of results, and the walk stops once every
+        query has.
+
+        The results are the results of iter_objects: the NEOs in the order of their first close approach in the date
+        window, with only their orbits matching the orbit filters.
+
+        :param queries: list of Query.Selectors objects with query information
+        :return: list of the list of NearEarthObjects or OrbitalPaths of each query, in the order of queries
+        """
+        for query in queries:
+            if query.return_object not in (NearEarthObject, OrbitPath):
                 raise Exception("return_object: `{}` not found. Available return_objects: `{}`".
-                                format(str(query.return_object), str(", ".join(["NEO", "Path"]))))
\ No newline at end of file
+                                format(str(query.return_object), str(", ".join(["NEO", "Path"]))))
+
+        results = [[] for _ in queries]
+        # Queries grouped by date window, and the distinct NEO and orbit filters of each query
+        windows = {}
+        filter_keys = []
+        predicates = {}
+        for index, query in enumerate(queries):
+            keys = []
+            for object_name in ("NEO", "Path"):
+                filters = [_filter for _filter in query.filters if _filter.object == object_name]
+                key = Filter.key(filters) if filters else None
+                if key is not None and key not in predicates:
+                    predicates[key] = (Filter.compile_predicate(filters), {})
+                keys.append(key)
+            filter_keys.append(keys)
+            if query.number is None or query.number > 0:
+                windows.setdefault(self.date_window(query.date_search), []).append(index)
+
+        def match(neo, neo_key, orbit_key):
+            """
+            :return: the NearEarthObject with its orbits matching the filters, None if it does not match, the same
+                     instance for every query of the same filters
+            """
+            if neo_key is not None:
+                predicate, matches = predicates[neo_key]
+                matched = matches.get(neo)
+                if matched is None:
+                    matched = matches[neo] = predicate(neo)
+                if not matched:
+                    return None
+            if orbit_key is None:
+                return neo
+            predicate, matches = predicates[orbit_key]
+            if neo not in matches:
+                orbits = list(filter(predicate, neo.orbits))
+                matches[neo] = neo.with_orbits(orbits) if orbits else None
+            return matches[neo]
+
+        if not windows:
+            return results
+        start_dates = [start_date for start_date, _ in windows]
+        end_dates = [end_date for _, end_date in windows]
+        dates = self.db.dates_between(None if None in start_dates else min(start_dates),
+                                      None if None in end_dates else max(end_dates))
+        seen_neos = {window: {} for window in windows}
+        for date in dates:
+            if not windows:
+                break
+            date_neos = self.date_neo_db[date]
+            for window, indexes in list(windows.items()):
+                start_date, end_date = window
+                if (start_date is not None and date < start_date) or (end_date is not None and date > end_date):
+                    continue
+                new_neos = NEOSearcher.new_neos(seen_neos[window], date_neos)
+                for index in list(indexes):
+                    query = queries[index]
+                    found = results[index]
+                    neo_key, orbit_key = filter_keys[index]
+                    for neo in new_neos:
+                        neo = match(neo, neo_key, orbit_key)
+                        if neo is None:
+                            continue
+                        if query.return_object == OrbitPath:
+                            found.extend(neo.orbits)
+                        else:
+                            found.append(neo)
+                        if query.number is not None and len(found) >= query.number:
+                            del found[query.number:]
+                            indexes.remove(index)
+                            break
+                if not indexes:
+                    del windows[window]
+        return results
+
+    def get_aggregates(self, query, group_by='day'):
+        """
+        Aggregates of the close approaches on the dates of the date search of a query, by day, month or year: the
+        number of close approaches, of unique Near Earth Objects and of unique potentially hazardous ones, and the
+        minimum miss distance. The query.number first groups are returned, all of them without number.
+
+        A query without filters or with is_hazardous filters only is answered from the DateRollups of the database,
+        when it maintains them. Other filters, or a database without rollups, are answered by scan_aggregates, as
+        reported by explain.
+
+        :param query: Query.Selectors object with query information
+        :param group_by: str representing the group of dates, day, month or year
+        :return: list of the Aggregate of each group of dates with close approaches, by date
+        """
+        if self.db.columnar_store is not None or self.db.sqlite_store is not None:
+            raise UnsupportedFeature('Aggregates are not available for the {} backend'.format(self.db.backend_kind()))
+        if group_by not in DateRollups.Groups:
+            raise Exception("group_by: `{}` not supported. Available groups: `{}`".format(
+                str(group_by), str(", ".join(DateRollups.Groups))))
+
+        with self.profiler.phase("aggregate") as phase:
+            if self.aggregates_from_rollups(query):
+                # The is_hazardous filters select hazard classes of the rollups
+                classes = set(DateRollups.Classes)
+                for _filter in query.filters:
+                    classes &= _filter.compiled_value
+                aggregates = self.db.date_rollups.aggregate(*self.date_window(query.date_search), group_by, classes)
+            else:
+                aggregates = self.scan_aggregates(query, group_by)
+            aggregates = aggregates[:query.number]
+            phase.rows_out = len(aggregates)
+        return aggregates
+
+    def aggregates_from_rollups(self, query):
+        """
+        :param query: Query.Selectors object with query information
+        :return: bool, True when the aggregates of the query are read from the DateRollups of the database
+        """
+        return self.db.date_rollups is not None and all(_filter.field == "is_hazardous" for _filter in query.filters)
+
+    def scan_aggregates(self, query, group_by='day'):
+        """
+        Aggregates of get_aggregates, computed from the Near Earth Objects of the selected dates: a close approach is
+        counted when its Near Earth Object matches the NEO filters and the approach itself matches the orbit filters.
+
+        :param query: Query.Selectors object with query information
+        :param group_by: str representing the group of dates, day, month or year
+        :return: list of the Aggregate of each group of dates with close approaches, by date
+        """
+        neo_predicate = Filter.compile_predicate([_filter for _filter in query.filters if _filter.object == "NEO"])
+        orbit_predicate = Filter.compile_predicate([_filter for _filter in query.filters if _filter.object == "Path"])
+        prefix = DateRollups.Groups[group_by]
+
+        start_date, end_date = self.date_window(query.date_search)
+        groups = {}  # Storing a dict of the group to its approaches, unique NEOs and minimum miss distance
+        for neo in self.iter_date_neos(query.date_search):
+            if neo_predicate is not None and not neo_predicate(neo):
+                continue
+            for orbit in neo.orbits:
+                date = orbit.close_approach_date
+                if ((start_date is not None and date < start_date) or (end_date is not None and date > end_date)
+                        or (orbit_predicate is not None and not orbit_predicate(orbit))):
+                    continue
+                group = groups.get(date[:prefix])
+                if group is None:
+                    group = groups[date[:prefix]] = [0, set(), INFINITY]
+                group[0] += 1
+                group[1].add(neo)
+                if orbit.miss_distance_kilometers < group[2]:
+                    group[2] = orbit.miss_distance_kilometers
+
+        return [Aggregate.from_counts(key, approaches, len(neos),
+                                      sum(neo.is_potentially_hazardous_asteroid is True for neo in neos), min_distance)
+                for key, (approaches, neos, min_distance) in sorted(groups.items())]
+
+    def get_objects(self, query):
+        """
+        Generic search interface that, depending on the details in the QueryBuilder (query) calls the
+        appropriate instance search function, then applies any filters, with distance as the last filter.
+
+        Once any filters provided are applied, return the number of requested objects in the query.return_object
+        specified.
+
+        :param query: Query.Selectors object with query information
+        :return: Dataset of NearEarthObjects or OrbitalPaths
+        """
+        # The version is read before the search, so results computed while data is ingested are not cached
+        version = self.db.version
+        with self.profiler.phase("search") as phase:
+            results = self.cache.get(query, version)
+            if results is None:
+                results = list(self.iter_objects(query))
+                self.cache.put(query, version, results)
+            phase.rows_out = len(results)
+        return results
@@ -0,0 +1,303 @@
+#!/usr/bin/env python
+#  -*- coding: utf-8 -*-
+
+"""
+Query server for the Near Earth Object database.
+
+The database is loaded once and kept in memory, then queries are answered over a local HTTP endpoint. Each request
+is handled on its own thread; searches do not modify the loaded database, so they can run concurrently.
+A refresh modifies the database in place, so it waits for the running searches and holds off new ones while it
+ingests, see ReadWriteLock.
+
+You can run from the commandline with: server.py [args]
+Example: server.py --port 8000 -f data/neo_data.csv
+
+Queries: GET /query with the same fields as main.py, e.g.
+- /query?date=2020-01-01&number=10
+- /query?start_date=2020-01-01&end_date=2020-01-10&filter=diameter:>:0.042&filter=is_hazardous:=:True&return_object=Path
+- /query?date=2020-01-01&format=csv
+- /query?start_date=2020-01-01&end_date=2020-01-31&return_object=Path&number=10&order_by=distance&order=asc
+
+Output format: Optional, json by default.
+- json: {"count": int, "results": [...]}
+- csv: the columns of the csv_file output of main.py
+
+Stats: GET /stats returns the hit, miss and eviction counters and the size of the query result cache. With --profile
+it also returns the time of the load and of the searches, and the rows in and out of each search stage.
+
+Refresh: Optional, with --refresh SECONDS the rows appended to the csv file are ingested into the loaded database
+every SECONDS seconds, so a long running server follows a growing csv file without reloading it.
+"""
+
+import argparse
+import csv
+import io
+import json
+import pathlib
+import sys
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from exceptions import MalformedRow, UnsupportedFeature
+from database import NEODatabase
+from main import verify_date
+from profiler import NULL_PROFILER, Profiler
+from search import Query, NEOSearcher
+from writer import NEOWriter
+
+PROJECT_ROOT = pathlib.Path(__file__).parent.absolute()
+
+ResponseFormats = ['json', 'csv']
+
+
+class ReadWriteLock(object):
+    """
+    Lock held by any number of readers at once, or by a single writer. A waiting writer goes before the readers
+    arriving after it, so that a steady flow of requests cannot hold off a refresh forever.
+    """
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.readers = 0 # Number of readers holding the lock
+        self.writer = False # Flag of a writer holding the lock
+        self.waiting_writers = 0 # Number of writers waiting for the lock
+
+    @contextmanager
+    def reading(self):
+        """
+        Holds the lock for reading, along with the other readers.
+        """
+        with self.condition:
+            while self.writer or self.waiting_writers:
+                self.condition.wait()
+            self.readers += 1
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.readers -= 1
+                if not self.readers:
+                    self.condition.notify_all()
+
+    @contextmanager
+    def writing(self):
+        """
+        Holds the lock for writing, once the readers holding it have released it.
+        """
+        with self.condition:
+            self.waiting_writers += 1
+            while self.writer or self.readers:
+                self.condition.wait()
+            self.waiting_writers -= 1
+            self.writer = True
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.writer = False
+                self.condition.notify_all()
+
+
+class QueryRequestHandler(BaseHTTPRequestHandler):
+    """
+    Request handler translating the query string of a GET /query request into a Query, and the results of the
+    NEOSearcher of the server into a JSON or csv response.
+    """
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == '/stats':
+            stats = {'cache': self.server.searcher.cache.stats()}
+            if self.server.profiler.enabled:
+                stats['profile'] = self.server.profiler.metrics()
+            self.send_text(200, 'application/json', json.dumps(stats))
+            return
+        if url.path != '/query':
+            self.send_text(404, 'text/plain', f'Not found: "{url.path}", queries are served on /query')
+            return
+
+        try:
+            response_format, query_selectors = QueryRequestHandler.parse_query(parse_qs(url.query))
+        except Exception as e:
+            # Invalid dates, numbers, filters or return objects of the request
+            self.send_text(400, 'text/plain', str(e))
+            return
+
+        # The results share the orbits lists of the database, they are written out before a refresh can add to them
+        with self.server.lock.reading():
+            try:
+                results = self.server.searcher.get_objects(query_selectors)
+            except UnsupportedFeature as e:
+                self.send_text(501, 'text/plain', str(e))
+                return
+
+            if response_format == 'csv':
+                content_type = 'text/csv'
+                body = io.StringIO()
+                csv_writer = csv.writer(body, delimiter=',')
+                if results:
+                    csv_writer.writerow(NEOWriter.CsvHeaders[type(results[0]).__name__])
+                    csv_writer.writerows(map(NEOWriter.csv_row, results))
+                body = body.getvalue()
+            else:
+                content_type = 'application/json'
+                body = json.dumps({'count': len(results), 'results': list(map(NEOWriter.to_dict, results))})
+        self.send_text(200, content_type, body)
+
+    @staticmethod
+    def parse_query(params):
+        """
+        :param params: dict of the query string parameters to their list of values
+        :return: tuple of the response format and the Query.Selectors of the request
+        """
+        unknown = set(params) - {'date', 'start_date', 'end_date', 'number', 'filter', 'return_object', 'order_by',
+                                 'order', 'format'}
+        if unknown:
+            raise ValueError(f'Unknown query parameters: "{", ".join(sorted(unknown))}"')
+
+        response_format = params.get('format', ['json'])[-1]
+        if response_format not in ResponseFormats:
+            raise ValueError(f'Not a valid format: "{response_format}", available formats: {", ".join(ResponseFormats)}')
+
+        query = {}
+        for date_param in ('date', 'start_date', 'end_date'):
+            if date_param in params:
+                query[date_param] = verify_date(params[date_param][-1])
+        if 'number' in params:
+            query['number'] = int(params['number'][-1])
+        if 'return_object' in params:
+            query['return_object'] = params['return_object'][-1]
+        for order_param in ('order_by', 'order'):
+            if order_param in params:
+                query[order_param] = params[order_param][-1]
+        if 'filter' in params:
+            query['filter'] = params['filter']
+
+        return response_format, Query(**query).build_query()
+
+    def send_text(self, status, content_type, body):
+        """
+        :param status: int representing the HTTP status code
+        :param content_type: str representing the content type of the body
+        :param body: str representing the response body
+        :return: None
+        """
+        encoded = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', f'{content_type}; charset=utf-8')
+        self.send_header('Content-Length', str(len(encoded)))
+        self.end_headers()
+        self.wfile.write(encoded)
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+
+class NEOServer(ThreadingHTTPServer):
+    """
+    HTTP server holding a loaded NEODatabase, answering each request on a new thread.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, db, quiet=False, profiler=NULL_PROFILER):
+        """
+        :param address: tuple of the host and port to listen on
+        :param db: loaded NEODatabase to search
+        :param quiet: bool flag to disable the logging of each request
+        :param profiler: Profiler recording the metrics of the searches, returned by GET /stats when enabled
+        """
+        super().__init__(address, QueryRequestHandler)
+        self.profiler = profiler
+        self.searcher = NEOSearcher(db, profiler=profiler)
+        self.quiet = quiet
+        self.lock = ReadWriteLock() # Held for reading by the searches and for writing by the refreshes
+        self.stopped = threading.Event() # Set when the server is closed, stopping the refresh thread
+
+    def refresh_every(self, interval):
+        """
+        Starts a daemon thread ingesting the rows appended to the csv file of the database every interval seconds,
+        until the server is closed. Each ingest holds the lock of the server for writing, as it modifies the lists,
+        dicts and secondary indexes the searches read.
+
+        :param interval: float representing the number of seconds between two refreshes
+        :return: threading.Thread
+        """
+        db = self.searcher.db
+
+        def refresh():
+            while not self.stopped.wait(interval):
+                try:
+                    with self.lock.writing():
+                        added = db.ingest(tail=True)
+                except MalformedRow as e:
+                    # The rows before the malformed row are ingested, the next refresh resumes after it
+                    print(f'Refresh of {db.filename} skipped the malformed row at byte {e.offset}: {e.error}')
+                    continue
+                except Exception as e:
+                    # The refresh thread keeps running, a later refresh may succeed
+                    print(f'Refresh of {db.filename} failed: {e!r}')
+                    continue
+                if added and not self.quiet:
+                    print(f'Ingested {added} new approaches from {db.filename}')
+
+        thread = threading.Thread(target=refresh, daemon=True)
+        thread.start()
+        return thread
+
+    def server_close(self):
+        self.stopped.set()
+        super().server_close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Near Earth Objects (NEOs) Database query server')
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='Host to listen on, local only by default')
+    parser.add_argument('--port', type=int, default=8000, help='Port to listen on')
+    parser.add_argument('-f', '--filename', type=str, help='Name of input csv data file')
+    parser.add_argument('--columnar', action='store_true',
+                        help='Use the NumPy backed columnar backend to load and search the data')
+    parser.add_argument('--sqlite', action='store_true',
+                        help='Use the SQLite backend, loading the data into an indexed database file next to the csv file')
+    parser.add_argument('--snapshot', action='store_true',
+                        help='Save the parsed csv file to a binary snapshot next to it, reused while the csv file is '
+                             'unchanged')
+    parser.add_argument('--indexes', action='store_true',
+                        help='Maintain secondary indexes on diameter and miss distance for selective filters')
+    parser.add_argument('--refresh', type=float,
+                        help='Ingest the rows appended to the csv file every REFRESH seconds')
+    parser.add_argument('--profile', action='store_true',
+                        help='Record the time of the load and of the searches, returned by GET /stats')
+    parser.add_argument('--quiet', action='store_true', help='Do not log each request')
+    args = parser.parse_args()
+
+    filename = args.filename or f'{PROJECT_ROOT}/data/neo_data.csv'
+    db = NEODatabase(filename=filename, columnar=args.columnar, snapshot=args.snapshot,
+                     indexes=args.indexes, sqlite=args.sqlite)
+    profiler = Profiler() if args.profile else NULL_PROFILER
+    try:
+        with profiler.phase('load'):
+            db.load_data()
+    except FileNotFoundError:
+        print(f'File {filename} not found, please try another file name.')
+        sys.exit()
+    except UnsupportedFeature as e:
+        print(e)
+        sys.exit()
+
+    server = NEOServer((args.host, args.port), db, quiet=args.quiet, profiler=profiler)
+    if args.refresh:
+        if args.columnar or args.sqlite:
+            print(f'Refresh is not supported by the {db.backend_kind()} backend')
+            sys.exit()
+        server.refresh_every(args.refresh)
+    print(f'Serving Near Earth Object queries on http://{args.host}:{args.port}/query')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,196 @@
+"""
+Binary snapshot cache of a loaded NEODatabase.
+
+When snapshots are enabled, a snapshot is written next to the source csv file and is reused while the size and
+modification time of the csv file are unchanged. The parsed state is stored with pickle protocol 5; NumPy columns of
+the columnar backend are written as raw out-of-band buffers, so that they are memory-mapped on load instead of being
+copied into memory. The NearEarthObject and OrbitPath instances of the dict backend are still rebuilt one by one when
+the state is unpickled, which takes about half the time of parsing the csv file.
+
+A snapshot is checked before any of it is unpickled: its header is JSON, holding the format version, the backend, the
+size and modification time of the source csv file and the offsets of the state and the buffers, which must all match.
+The state is then unpickled with SnapshotUnpickler, which only resolves the functions and classes a snapshot is made of,
+so that a snapshot written by someone else cannot run any other code when it is loaded.
+
+Layout: MAGIC | version | header length | header JSON | state pickle | out-of-band buffers
+"""
+
+import io
+import json
+import mmap
+import os
+import pickle
+import struct
+
+MAGIC = b'NEOSNAP\0'
+VERSION = 2
+PREFIX = struct.Struct('<8sIQ')  # MAGIC, VERSION and the length of the header
+ALIGNMENT = 64
+
+# Module and name of the functions and classes of the pickled state of each backend
+ALLOWED_GLOBALS = {
+    ('models', 'restore_near_earth_object'),
+    ('models', 'restore_orbit_path'),
+    ('columnar', 'ColumnarStore'),
+    ('numpy', 'dtype'),
+    ('numpy', 'ndarray'),
+    ('numpy.core.numeric', '_frombuffer'),
+    ('numpy._core.numeric', '_frombuffer'),
+    ('numpy.core.multiarray', '_reconstruct'),
+    ('numpy._core.multiarray', '_reconstruct'),
+}
+
+
+class SnapshotUnpickler(pickle.Unpickler):
+    """
+    Unpickler of the state of a snapshot, refusing any function or class outside of ALLOWED_GLOBALS.
+    """
+
+    def find_class(self, module, name):
+        if (module, name) not in ALLOWED_GLOBALS:
+            raise pickle.UnpicklingError('Global: `{}.{}` is not allowed in a snapshot'.format(module, name))
+        return super().find_class(module, name)
+
+
+def snapshot_filename(filename):
+    """
+    :param filename: str representing the pathway of the source csv file
+    :return: str representing the pathway of its snapshot
+    """
+    return f'{filename}.snapshot'
+
+
+def source_signature(filename):
+    """
+    :param filename: str representing the pathway of the source csv file
+    :return: list of the size and modification time of the source csv file
+    """
+    stat = os.stat(filename)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def write_snapshot(filename, state, kind):
+    """
+    Writes the snapshot of state for the source csv file. The snapshot is written to a temporary file first and then
+    moved in place, so a concurrent run never reads a partially written snapshot.
+
+    :param filename: str representing the pathway of the source csv file
+    :param state: dict of the parsed state of the NEODatabase
+    :param kind: str representing the backend the state was loaded for
+    :return: bool representing if the snapshot was written or not
+    """
+    buffers = []
+    body = pickle.dumps(state, protocol=5, buffer_callback=buffers.append)
+    raw_buffers = [buffer.raw() for buffer in buffers]
+
+    # Offsets of the out-of-band buffers depend on the header length, which depends on the offsets:
+    # grow the space reserved for the header until the header with the final offsets fits in it
+    reserved = 0
+    while True:
+        offset = PREFIX.size + reserved + len(body)
+        layout = []
+        for raw in raw_buffers:
+            offset += -offset % ALIGNMENT
+            layout.append([offset, raw.nbytes])
+            offset += raw.nbytes
+        header = json.dumps({
+            'source': source_signature(filename),
+            'kind': kind,
+            'body_length': len(body),
+            'buffers': layout,
+        }).encode('utf-8')
+        if len(header) <= reserved:
+            # Whitespace after a JSON document is ignored when it is parsed
+            header = header.ljust(reserved, b' ')
+            break
+        reserved = len(header) + ALIGNMENT
+
+    path = snapshot_filename(filename)
+    temporary_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        with open(temporary_path, 'wb') as snapshot_file:
+            snapshot_file.write(PREFIX.pack(MAGIC, VERSION, len(header)))
+            snapshot_file.write(header)
+            snapshot_file.write(body)
+            for (offset, _), raw in zip(layout, raw_buffers):
+                snapshot_file.write(b'\0' * (offset - snapshot_file.tell()))
+                snapshot_file.write(raw)
+        os.replace(temporary_path, path)
+    except OSError:
+        # The snapshot is only a cache, a read-only data directory must not fail the load
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+        return False
+    return True
+
+
+def read_header(snapshot_file, size):
+    """
+    Reads and checks the header of a snapshot, without unpickling anything.
+
+    :param snapshot_file: binary file of the snapshot, at its start
+    :param size: int representing the size of the snapshot file
+    :return: dict of the header of the snapshot, or None if it is not a valid snapshot header
+    """
+    prefix = snapshot_file.read(PREFIX.size)
+    if len(prefix) != PREFIX.size:
+        return None
+    magic, version, header_length = PREFIX.unpack(prefix)
+    if magic != MAGIC or version != VERSION or header_length > size - PREFIX.size:
+        return None
+    try:
+        header = json.loads(snapshot_file.read(header_length).decode('utf-8'))
+    except ValueError:
+        return None
+
+    if not isinstance(header, dict) or set(header) != {'source', 'kind', 'body_length', 'buffers'}:
+        return None
+    ranges = [[PREFIX.size + header_length, header['body_length']]] + list(header['buffers'])
+    if not all(isinstance(byte_range, list) and len(byte_range) == 2 and all(type(value) is int for value in byte_range)
+               for byte_range in ranges):
+        return None
+    # The state and the buffers follow each other inside the snapshot file
+    end = 0
+    for offset, length in ranges:
+        if offset < end or length < 0 or offset + length > size:
+            return None
+        end = offset + length
+    header['body_offset'] = ranges[0][0]
+    return header
+
+
+def read_snapshot(filename, kind):
+    """
+    Reads the snapshot of the source csv file, if there is an up to date one. A snapshot that is corrupt, stale,
+    written for another backend or referring to a function or class it should not hold is ignored.
+
+    :param filename: str representing the pathway of the source csv file
+    :param kind: str representing the backend the state is loaded for
+    :return: dict of the parsed state of the NEODatabase, or None if there is no usable snapshot
+    """
+    path = snapshot_filename(filename)
+    try:
+        snapshot_file = open(path, 'rb')
+    except OSError:
+        return None
+
+    with snapshot_file:
+        size = os.fstat(snapshot_file.fileno()).st_size
+        header = read_header(snapshot_file, size)
+        if header is None or header['source'] != source_signature(filename) or header['kind'] != kind:
+            return None
+
+        # The mmap stays open for as long as the arrays built on its buffers are alive
+        mapped = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    view = memoryview(mapped)
+    body = view[header['body_offset']:header['body_offset'] + header['body_length']]
+    buffers = [view[offset:offset + length] for offset, length in header['buffers']]
+    try:
+        state = SnapshotUnpickler(io.BytesIO(body), buffers=buffers).load()
+    except Exception:
+        # A snapshot that cannot be unpickled is only a missing cache, the csv file is parsed instead
+        return None
+    if not isinstance(state, dict):
+        return None
+    return state
@@ -0,0 +1,287 @@
+import os
+import sqlite3
+import threading
+from operator import eq, ge, gt, le, lt
+
+from models import NearEarthObject, OrbitPath
+
+
+class SQLiteStore(object):
+    """
+    Optional storage of the Near Earth Objects and their orbits in a SQLite database file, built on the standard
+    library sqlite3 module.
+
+    The Near Earth Objects are the rows of the neo table, numbered in the order they are first seen in the data, and
+    each close approach is a row of the orbit_path table pointing back to the row of its Near Earth Object, numbered in
+    the order of the data. The orbits are indexed on close approach date and miss distance, and the Near Earth Objects
+    on diameter, so that the date search and the filters of a query are answered by SQLite from its indexes.
+
+    The database file is kept next to the source file and reused while the size and modification time of the source
+    file are unchanged, so only the rows returned by a search are read into memory.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS source (size INTEGER, mtime_ns INTEGER);
+        CREATE TABLE IF NOT EXISTS neo (
+            row INTEGER PRIMARY KEY,
+            id TEXT NOT NULL,
+            name TEXT NOT NULL UNIQUE,
+            diameter_min_km REAL NOT NULL,
+            diameter_max_km REAL NOT NULL,
+            is_potentially_hazardous_asteroid INTEGER
+        );
+        CREATE TABLE IF NOT EXISTS orbit_path (
+            row INTEGER PRIMARY KEY,
+            neo_row INTEGER NOT NULL REFERENCES neo (row),
+            orbiting_body TEXT NOT NULL,
+            close_approach_date TEXT NOT NULL,
+            miss_distance_kilometers REAL NOT NULL,
+            miss_distance_miles REAL NOT NULL
+        );
+    """
+
+    # Indexes are created once the rows are loaded, building them in one pass is faster than updating them per row
+    INDEXES = """
+        CREATE INDEX IF NOT EXISTS neo_diameter ON neo (diameter_min_km);
+        CREATE INDEX IF NOT EXISTS orbit_path_date ON orbit_path (close_approach_date, neo_row);
+        CREATE INDEX IF NOT EXISTS orbit_path_neo ON orbit_path (neo_row, close_approach_date);
+        CREATE INDEX IF NOT EXISTS orbit_path_distance ON orbit_path (miss_distance_kilometers);
+    """
+
+    # SQL operators of the Filter.Operators
+    Operators = {gt: ">", ge: ">=", eq: "=", lt: "<", le: "<="}
+
+    BatchRows = 10000  # Number of rows inserted by each executemany of a load
+
+    def __init__(self, path):
+        """
+        :param path: str representing the pathway of the SQLite database file, or `:memory:`
+        """
+        self.path = path
+        # Searches of the server threads share the connection, serialized by the lock
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.connection.executescript(SQLiteStore.SCHEMA)
+
+    @staticmethod
+    def database_filename(filename):
+        """
+        :param filename: str representing the pathway of the source file
+        :return: str representing the pathway of its SQLite database file
+        """
+        return f'{filename}.sqlite'
+
+    @staticmethod
+    def source_signature(filename):
+        """
+        :param filename: str representing the pathway of the source file
+        :return: tuple of the size and modification time of the source file
+        """
+        stat = os.stat(filename)
+        return stat.st_size, stat.st_mtime_ns
+
+    def is_loaded_from(self, filename):
+        """
+        :param filename: str representing the pathway of the source file
+        :return: bool representing if the database holds the rows of the source file as it is now
+        """
+        with self.lock:
+            row = self.connection.execute('SELECT size, mtime_ns FROM source').fetchone()
+        return row is not None and tuple(row) == SQLiteStore.source_signature(filename)
+
+    def load(self, rows, filename=None):
+        """
+        Replaces the content of the database with rows, in a single transaction: a failed load leaves the previous
+        content in place.
+
+        :param rows: iterable of the tuples of the LOADED_COLUMNS values of each close approach
+        :param filename: str representing the pathway of the source file of the rows, recorded to reuse the database
+        :return: SQLiteStore
+        """
+        with self.lock, self.connection:
+            self.connection.execute('DELETE FROM source')
+            self.connection.execute('DELETE FROM orbit_path')
+            self.connection.execute('DELETE FROM neo')
+
+            neo_rows = {}  # Storing a dict of the Near Earth Object name to its neo row
+            neo_batch = []
+            orbit_batch = []
+            for (neo_id, name, diameter_min_km, diameter_max_km, hazardous,
+                 orbiting_body, close_approach_date, miss_distance_kilometers, miss_distance_miles) in rows:
+                neo_row = neo_rows.get(name)
+                if neo_row is None:
+                    neo_row = neo_rows[name] = len(neo_rows) + 1
+                    neo_batch.append((neo_row, neo_id, name, float(diameter_min_km), float(diameter_max_km),
+                                      NearEarthObject.parse_hazardous(hazardous)))
+                orbit_batch.append((neo_row, orbiting_body, close_approach_date, float(miss_distance_kilometers),
+                                    float(miss_distance_miles)))
+                if len(orbit_batch) == SQLiteStore.BatchRows:
+                    self.insert(neo_batch, orbit_batch)
+                    neo_batch, orbit_batch = [], []
+            self.insert(neo_batch, orbit_batch)
+
+            # executescript would commit the transaction, the statements are executed one by one
+            for statement in SQLiteStore.INDEXES.split(';'):
+                if statement.strip():
+                    self.connection.execute(statement)
+            if filename is not None:
+                self.connection.execute('INSERT INTO source VALUES (?, ?)', SQLiteStore.source_signature(filename))
+        with self.lock:
+            self.connection.execute('ANALYZE')
+        return self
+
+    def insert(self, neo_batch, orbit_batch):
+        """
+        :param neo_batch: list of the value tuples of new neo rows
+        :param orbit_batch: list of the value tuples of new orbit_path rows
+        :return: None
+        """
+        self.connection.executemany('INSERT INTO neo VALUES (?, ?, ?, ?, ?, ?)', neo_batch)
+        self.connection.executemany('INSERT INTO orbit_path (neo_row, orbiting_body, close_approach_date, '
+                                    'miss_distance_kilometers, miss_distance_miles) VALUES (?, ?, ?, ?, ?)',
+                                    orbit_batch)
+        return None
+
+    @staticmethod
+    def filter_condition(_filter, table, parameters):
+        """
+        :param _filter: Filter of the query
+        :param table: str representing the table of the filtered attribute, neo or orbit_path
+        :param parameters: list of the query parameters, the values of the condition are appended to it
+        :return: str representing the SQL condition of the filter
+        """
+        column = f'{table}.{_filter.attribute}'
+        if _filter.field == "is_hazardous":
+            # The compiled value is the set of matching values, is_potentially_hazardous_asteroid is stored as 1, 0 or
+            # NULL
+            values = [value for value in _filter.compiled_value if value is not None]
+            conditions = []
+            if values:
+                conditions.append('{} IN ({})'.format(column, ', '.join('?' * len(values))))
+                parameters.extend(values)
+            if None in _filter.compiled_value:
+                conditions.append(f'{column} IS NULL')
+            return '({})'.format(' OR '.join(conditions) or '0')
+        parameters.append(_filter.compiled_value)
+        return f'{column} {SQLiteStore.Operators[_filter.comparison]} ?'
+
+    @staticmethod
+    def build_sql(query):
+        """
+        Translates a query into a parameterized SQL query returning the rows of the results, a neo row joined to each
+        of its returned orbits, in the order of NEOSearcher.iter_objects: the Near Earth Objects by their first close
+        approach in the date window, and their orbits in the order of the data.
+
+        :param query: Query.Selectors object with query information
+        :return: tuple of the str of the SQL query and the list of its parameters
+        """
+        parameters = []
+        date_conditions = []
+        if query.date_search:
+            values = query.date_search[0].values
+            if query.date_search[0].type.value == "equals":
+                date_conditions.append('close_approach_date = ?')
+                parameters.append(values[0])
+            elif query.date_search[0].type.value == "between":
+                # A missing start or end date leaves that side of the range open
+                for operator, value in zip(('>=', '<='), values[0:2]):
+                    if value is not None:
+                        date_conditions.append(f'close_approach_date {operator} ?')
+                        parameters.append(value)
+            else:
+                raise Exception("{} filter not supported for date".format(str(query.date_search[0].type.value)))
+
+        neo_conditions = []
+        orbit_conditions = []
+        for _filter in query.filters:
+            if _filter.object == "NEO":
+                neo_conditions.append(SQLiteStore.filter_condition(_filter, 'neo', parameters))
+        orbit_parameters = []
+        for _filter in query.filters:
+            if _filter.object == "Path":
+                orbit_conditions.append(SQLiteStore.filter_condition(_filter, 'orbit_path', orbit_parameters))
+        if orbit_conditions:
+            neo_conditions.append('EXISTS (SELECT 1 FROM orbit_path WHERE orbit_path.neo_row = neo.row AND {})'.format(
+                ' AND '.join(orbit_conditions)))
+            parameters.extend(orbit_parameters)
+
+        # The first close approach of each Near Earth Object in the date window: its first date, then its first row on
+        # that date, the position of the Near Earth Object in the date_neo_db list of the date
+        sql = """
+            WITH first AS (
+                SELECT neo_row, MIN(close_approach_date) AS first_date
+                FROM orbit_path {}
+                GROUP BY neo_row
+            ), selected AS (
+                SELECT neo.row AS neo_row, first.first_date,
+                       (SELECT MIN(row) FROM orbit_path
+                        WHERE orbit_path.neo_row = first.neo_row
+                        AND orbit_path.close_approach_date = first.first_date) AS first_row
+                FROM first JOIN neo ON neo.row = first.neo_row
+                {}
+                ORDER BY first.first_date, first_row {}
+            )
+            SELECT neo.row, neo.id, neo.name, neo.diameter_min_km, neo.diameter_max_km,
+                   neo.is_potentially_hazardous_asteroid, orbit_path.orbiting_body, orbit_path.close_approach_date,
+                   orbit_path.miss_distance_kilometers, orbit_path.miss_distance_miles
+            FROM selected
+            JOIN neo ON neo.row = selected.neo_row
+            JOIN orbit_path ON orbit_path.neo_row = selected.neo_row {}
+            ORDER BY selected.first_date, selected.first_row, orbit_path.row {}
+        """
+        neo_limit = orbit_limit = ''
+        if query.number is not None:
+            # The number counts Near Earth Objects or orbits, depending on the return object
+            if query.return_object == NearEarthObject:
+                neo_limit = 'LIMIT ?'
+                parameters.append(query.number)
+            else:
+                orbit_limit = 'LIMIT ?'
+        if orbit_conditions:
+            parameters.extend(orbit_parameters)
+        if orbit_limit:
+            parameters.append(query.number)
+        sql = sql.format('WHERE ' + ' AND '.join(date_conditions) if date_conditions else '',
+                         'WHERE ' + ' AND '.join(neo_conditions) if neo_conditions else '', neo_limit,
+                         'AND ' + ' AND '.join(orbit_conditions) if orbit_conditions else '', orbit_limit)
+        return sql, parameters
+
+    def iter_objects(self, query):
+        """
+        SQLite implementation of NEOSearcher.iter_objects, returning the same results.
+
+        :param query: Query.Selectors object with query information
+        :return: generator of NearEarthObjects or OrbitalPaths
+        """
+        if query.return_object not in (NearEarthObject, OrbitPath):
+            raise Exception("return_object: `{}` not found. Available return_objects: `{}`".
+                            format(str(query.return_object), str(", ".join(["NEO", "Path"]))))
+
+        sql, parameters = SQLiteStore.build_sql(query)
+        with self.lock:
+            rows = self.connection.execute(sql, parameters).fetchall()
+
+        neo = None
+        neo_row = None
+        for (row, neo_id, name, diameter_min_km, diameter_max_km, hazardous,
+             orbiting_body, close_approach_date, miss_distance_kilometers, miss_distance_miles) in rows:
+            if row != neo_row:
+                if neo is not None and query.return_object == NearEarthObject:
+                    yield neo
+                neo_row = row
+                neo = NearEarthObject.from_values(neo_id, name, diameter_min_km, diameter_max_km,
+                                                  None if hazardous is None else bool(hazardous))
+            orbit = OrbitPath.from_values(neo, orbiting_body, close_approach_date, miss_distance_kilometers,
+                                          miss_distance_miles)
+            neo.orbits.append(orbit)
+            if query.return_object == OrbitPath:
+                yield orbit
+        if neo is not None and query.return_object == NearEarthObject:
+            yield neo
+
+    def close(self):
+        """
+        :return: None
+        """
+        self.connection.close()
+        return None
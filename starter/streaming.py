@@ -0,0 +1,228 @@
+from itertools import chain, islice
+import heapq
+
+from database import iter_loaded_rows
+from models import LOADED_COLUMNS, NearEarthObject, OrbitPath
+from search import Filter, NEOSearcher
+
+(ID, NAME, DIAMETER_MIN, DIAMETER_MAX, HAZARDOUS,
+ ORBITING_BODY, CLOSE_APPROACH_DATE, MISS_KILOMETERS, MISS_MILES) = range(len(LOADED_COLUMNS))
+
+
+class LastCandidate(object):
+    """
+    Entry of the heap of the candidates of a StreamingSearcher, ordered from the last close approach to the first, so
+    that the heapq min-heap of the entries gives the last candidate.
+    """
+
+    __slots__ = ('key', 'name')
+
+    def __init__(self, key, name):
+        """
+        :param key: tuple of the date and position of the first close approach in the window of the candidate
+        :param name: str representing the name of the candidate Near Earth Object
+        """
+        self.key = key
+        self.name = name
+
+    def __lt__(self, other):
+        return self.key > other.key
+
+
+class StreamingSearcher(object):
+    """
+    Out-of-core search of a data file, answering a query by scanning the rows of the file instead of loading it into
+    a NEODatabase. The results are the results of NEOSearcher on the loaded file.
+
+    A search reads the file twice, with the date search and the filters pushed down into the scans:
+    1. candidates: the rows outside the date window are skipped on a string comparison of their date, before any
+       number is parsed. The NEO filters are evaluated once per Near Earth Object, on its first row in the window,
+       keeping the position of the first close approach in the window of each matching Near Earth Object.
+    2. orbits: only the rows of the candidates are parsed, building them with their orbits matching the orbit filters.
+       The candidates left without orbits are not results.
+
+    Only the state of the candidates is kept, never the rows: with a number and without orbit filter, the candidates
+    are the number Near Earth Objects with the first close approaches so far, otherwise the Near Earth Objects of the
+    window matching the NEO filters. The results of the NEO filters are also kept for each Near Earth Object of the
+    window, so the memory of a search grows with the number of distinct Near Earth Objects in the window, and of all
+    the candidates without number or with orbit filters.
+
+    Only a file sorted by close approach date lets the first scan stop early: at the first row after the date window,
+    or once number Near Earth Objects have been found. A file in any other order is read to its end, and the second
+    scan always reads the whole file, as the orbits of a result can be anywhere in it.
+
+    The NEO filters are evaluated on the Near Earth Object columns of its rows in the window, which are the same on
+    every row of a Near Earth Object in the NASA export.
+    """
+
+    def __init__(self, filename, sorted_by_date=False):
+        """
+        :param filename: str representing the pathway of the csv, Arrow IPC or Parquet data file
+        :param sorted_by_date: bool flag for a file sorted by close approach date, as the NASA export
+        """
+        self.filename = filename
+        self.sorted_by_date = sorted_by_date
+        self.rows_read = 0  # Number of rows read by the scans of the last search
+
+    @staticmethod
+    def date_window(date_search):
+        """
+        :param date_search: list of the DateSearch of a Query.Selectors
+        :return: tuple of the first and last dates of the window, None for an open side
+        """
+        if not date_search:
+            return None, None
+        values = date_search[0].values
+        if date_search[0].type.value == "equals":
+            return values[0], values[0]
+        elif date_search[0].type.value == "between":
+            return values[0], values[1]
+        raise Exception("{} filter not supported for date".format(str(date_search[0].type.value)))
+
+    @staticmethod
+    def neo_from_row(row):
+        """
+        :param row: tuple of the LOADED_COLUMNS values of a close approach
+        :return: NearEarthObject of the row, without orbits
+        """
+        return NearEarthObject.from_values(row[ID], row[NAME], float(row[DIAMETER_MIN]), float(row[DIAMETER_MAX]),
+                                           NearEarthObject.parse_hazardous(row[HAZARDOUS]))
+
+    @staticmethod
+    def orbit_from_row(neo, row):
+        """
+        :param neo: NearEarthObject of the row
+        :param row: tuple of the LOADED_COLUMNS values of a close approach
+        :return: OrbitPath of the row
+        """
+        return OrbitPath.from_values(neo, row[ORBITING_BODY], row[CLOSE_APPROACH_DATE], float(row[MISS_KILOMETERS]),
+                                     float(row[MISS_MILES]))
+
+    def scan_candidates(self, query, neo_predicate):
+        """
+        First scan: finds the Near Earth Objects with a close approach in the date window matching the NEO filters.
+        The orbit filters are left to scan_orbits, they select Near Earth Objects among all their orbits.
+
+        With a number and without orbit filter, the candidates are kept in a heap of the number Near Earth Objects
+        with the first close approaches so far, so that a row is compared with the last candidate in constant time.
+
+        :param query: Query.Selectors object with query information
+        :param neo_predicate: function of a NearEarthObject returning if it matches the NEO filters, or None
+        :return: list of the names of the candidate Near Earth Objects, in the order of the results
+        """
+        start_date, end_date = StreamingSearcher.date_window(query.date_search)
+        # Candidates are bounded by the number when any candidate is a result, without orbit filter
+        has_orbit_filters = any(_filter.object == "Path" for _filter in query.filters)
+        limit = query.number if not has_orbit_filters and query.return_object == NearEarthObject else None
+
+        candidates = {}  # Storing a dict of the candidate name to the position of its first close approach
+        last_candidates = []  # Storing the heap of the candidates with a limit, the last candidate first
+        checked = {}  # Storing a dict of the name to the result of the NEO filters, for the Near Earth Objects checked
+        for position, row in enumerate(iter_loaded_rows(self.filename)):
+            self.rows_read += 1
+            close_approach_date = row[CLOSE_APPROACH_DATE]
+            if start_date is not None and close_approach_date < start_date:
+                continue
+            if end_date is not None and close_approach_date > end_date:
+                # Every following row of a sorted file is after the window
+                if self.sorted_by_date:
+                    break
+                continue
+
+            name = row[NAME]
+            key = (close_approach_date, position)
+            previous = candidates.get(name)
+            if previous is not None:
+                # Only the rows of a file not sorted by date can come before the first row of a candidate
+                if key < previous:
+                    candidates[name] = key
+                    if limit is not None:
+                        heapq.heappush(last_candidates, LastCandidate(key, name))
+                continue
+            if neo_predicate is not None:
+                matches = checked.get(name)
+                if matches is None:
+                    matches = checked[name] = neo_predicate(StreamingSearcher.neo_from_row(row))
+                if not matches:
+                    continue
+            if limit is not None and len(candidates) >= limit:
+                # The candidates are the number Near Earth Objects with the first close approaches so far
+                if limit == 0:
+                    break
+                # Entries of a candidate since moved to an earlier approach, or replaced, are dropped on the way
+                while candidates.get(last_candidates[0].name) != last_candidates[0].key:
+                    heapq.heappop(last_candidates)
+                last_candidate = last_candidates[0]
+                if key > last_candidate.key:
+                    if self.sorted_by_date:
+                        break
+                    continue
+                del candidates[last_candidate.name]
+                heapq.heapreplace(last_candidates, LastCandidate(key, name))
+            elif limit is not None:
+                heapq.heappush(last_candidates, LastCandidate(key, name))
+            candidates[name] = key
+
+        return sorted(candidates, key=candidates.get)
+
+    def scan_orbits(self, names, orbit_predicate):
+        """
+        Second scan: builds the selected Near Earth Objects with their orbits matching the orbit filters.
+
+        :param names: list of the names of the selected Near Earth Objects
+        :param orbit_predicate: function of an OrbitPath returning if it matches the orbit filters, or None
+        :return: dict of the name to the NearEarthObject of the selected Near Earth Objects
+        """
+        neo_objects = dict.fromkeys(names)
+        if not neo_objects:
+            return neo_objects
+        for row in iter_loaded_rows(self.filename):
+            self.rows_read += 1
+            name = row[NAME]
+            if name not in neo_objects:
+                continue
+            neo = neo_objects[name]
+            if neo is None:
+                neo = neo_objects[name] = StreamingSearcher.neo_from_row(row)
+            orbit = StreamingSearcher.orbit_from_row(neo, row)
+            if orbit_predicate is None or orbit_predicate(orbit):
+                neo.orbits.append(orbit)
+        return neo_objects
+
+    def iter_objects(self, query):
+        """
+        Streaming version of NEOSearcher.iter_objects, scanning the data file.
+
+        :param query: Query.Selectors object with query information
+        :return: generator of NearEarthObjects or OrbitalPaths
+        """
+        if query.return_object not in (NearEarthObject, OrbitPath):
+            raise Exception("return_object: `{}` not found. Available return_objects: `{}`".
+                            format(str(query.return_object), str(", ".join(["NEO", "Path"]))))
+
+        if query.order is not None:
+            # The first number results of an ordered query are selected from the results without order and number
+            if query.number != 0:
+                unordered = query._replace(number=None, order=None, return_object=NearEarthObject)
+                yield from NEOSearcher.top_results(self.iter_objects(unordered), query,
+                                                   StreamingSearcher.date_window(query.date_search))
+            return
+
+        self.rows_read = 0
+        neo_predicate = Filter.compile_predicate([_filter for _filter in query.filters if _filter.object == "NEO"])
+        orbit_predicate = Filter.compile_predicate([_filter for _filter in query.filters if _filter.object == "Path"])
+        names = self.scan_candidates(query, neo_predicate)
+        neo_objects = self.scan_orbits(names, orbit_predicate)
+
+        # The candidates without an orbit matching the orbit filters are not results
+        results = (neo for neo in map(neo_objects.__getitem__, names) if neo.orbits)
+        if query.return_object == OrbitPath:
+            results = chain.from_iterable(neo.orbits for neo in results)
+        yield from islice(results, query.number)
+
+    def get_objects(self, query):
+        """
+        :param query: Query.Selectors object with query information
+        :return: list of NearEarthObjects or OrbitalPaths
+        """
+        return list(self.iter_objects(query))
@@ -1,8 +1,33 @@
+import contextlib
+import csv
+import gzip
+import io
+from itertools import chain
+import json
+import os
 import pathlib
+import tempfile
+import threading
+import time
 import unittest
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+from urllib.request import urlopen
 
-from database import NEODatabase
-from search import Query, NEOSearcher
+from arrow_io import pa
+from benchmarks import suite, synthetic
+from catalog import Catalog, build_catalog
+from columnar import np
+from database import NEODatabase, iter_loaded_rows
+from exceptions import UnsupportedFeature
+from indexes import SortedIndex
+from models import LOADED_COLUMNS, MILES_PER_KILOMETER, OrbitPath
+from profiler import Profiler
+from search import DateSearch, Query, NEOSearcher
+from server import NEOServer, ReadWriteLock
+from snapshot import read_snapshot, snapshot_filename, write_snapshot
+from streaming import StreamingSearcher
+from writer import NEOWriter
 
 
 PROJECT_ROOT = pathlib.Path(__file__).parent.parent
@@ -168,6 +193,1097 @@ class TestNEOSearchUseCases(unittest.TestCase):
         orbits = filtered_orbits[0:10]
         self.assertEqual(len(orbits), 10)
 
+    def test_number_returns_first_results_of_search(self):
+        searcher = NEOSearcher(self.db)
+        for return_object in ['NEO', 'Path']:
+            query = dict(start_date=self.start_date, end_date=self.end_date, return_object=return_object,
+                         filter=["diameter:>:0.042", "distance:>:234989"])
+            all_results = searcher.get_objects(Query(**query).build_query())
+            results = list(searcher.iter_objects(Query(number=10, **query).build_query()))
+
+            # Confirm the streamed top 10 are the first 10 results of the full search
+            self.assertEqual(list(map(str, all_results[0:10])), list(map(str, results)))
+
+    def test_date_join_returns_each_neo_once_by_first_date(self):
+        # The NEOs of each selected date, in the order of their first close approach, each NEO once
+        dates = [date for date in sorted(self.db.date_neo_db) if self.start_date <= date <= self.end_date]
+        expected = list(dict.fromkeys(neo for date in dates for neo in self.db.date_neo_db[date]))
+
+        query_selectors = Query(start_date=self.start_date, end_date=self.end_date, return_object='NEO').build_query()
+        results = NEOSearcher(self.db).get_objects(query_selectors)
+        self.assertEqual([neo.name for neo in expected], [neo.name for neo in results])
+        self.assertTrue(all(neo is self.db.neo_object_db[neo.name] for neo in results))
+
+    def test_orbits_of_whole_date_range_are_flattened_in_neo_order(self):
+        sorted_dates = sorted(self.db.date_neo_db)
+        query = dict(start_date=sorted_dates[0], end_date=sorted_dates[-1])
+        neos = NEOSearcher(self.db).get_objects(Query(return_object='NEO', **query).build_query())
+        self.assertEqual(len(self.db.neo_object_db), len(neos))
+
+        # Every orbit of the database, once, in the order of their NEO then of the rows of the csv file
+        orbits = NEOSearcher(self.db).get_objects(Query(return_object='Path', **query).build_query())
+        self.assertEqual([orbit for neo in neos for orbit in neo.orbits], orbits)
+        self.assertEqual(sum(len(neo.orbits) for neo in self.db.neo_object_db.values()), len(set(map(id, orbits))))
+
+    def test_secondary_indexes_return_same_results(self):
+        indexed_db = NEODatabase(filename=self.neo_data_file, indexes=True)
+        indexed_db.load_data()
+        searcher = NEOSearcher(self.db)
+        indexed_searcher = NEOSearcher(indexed_db)
+
+        plans = set()
+        for filters in [["diameter:>:1"], ["diameter:>=:0.042", "diameter:<:0.1"], ["distance:<=:384400"],
+                        ["diameter:>:0.042", "is_hazardous:=:True", "distance:>:234989"]]:
+            for return_object in ['NEO', 'Path']:
+                query_selectors = Query(start_date=self.start_date, end_date=self.end_date,
+                                        return_object=return_object, filter=filters).build_query()
+                plans.add(indexed_searcher.plan(query_selectors).index)
+                self.assertEqual(list(map(str, searcher.get_objects(query_selectors))),
+                                 list(map(str, indexed_searcher.get_objects(query_selectors))))
+
+        # Confirm the selective filters are answered from the secondary indexes
+        self.assertTrue({'diameter', 'distance'} & plans)
+
+    def test_cached_results_are_reused_and_invalidated_on_load(self):
+        searcher = NEOSearcher(self.db)
+        query = dict(start_date=self.start_date, end_date=self.end_date, filter=["diameter:>:0.042"])
+        results = list(map(str, searcher.get_objects(Query(number=10, **query).build_query())))
+
+        # A smaller number is answered from the cached results of the larger number
+        self.assertEqual(results[0:5], list(map(str, searcher.get_objects(Query(number=5, **query).build_query()))))
+        self.assertEqual(searcher.cache.stats()['hits'], 1)
+
+        # Loading data clears the results cached before the load
+        db = NEODatabase(filename=self.neo_data_file)
+        searcher = NEOSearcher(db)
+        self.assertEqual([], searcher.get_objects(Query(number=10, **query).build_query()))
+        db.load_data()
+        self.assertEqual(results, list(map(str, searcher.get_objects(Query(number=10, **query).build_query()))))
+        self.assertEqual(searcher.cache.stats()['hits'], 0)
+
+    def test_batch_results_match_single_queries(self):
+        queries = []
+        for day in range(1, 6):
+            for filters in [None, ["diameter:>:0.042"], ["diameter:>:0.042", "distance:<:50000000"]]:
+                queries.append(Query(date=f'2020-01-0{day}', return_object='NEO', filter=filters).build_query())
+        for number in [None, 0, 3, 25]:
+            for return_object in ['NEO', 'Path']:
+                queries.append(Query(number=number, start_date=self.start_date, end_date=self.end_date,
+                                     return_object=return_object,
+                                     filter=["is_hazardous:=:False", "distance:>:234989"]).build_query())
+        queries.append(Query(number=10, return_object='Path', filter=["diameter:<=:0.1"]).build_query())
+
+        searcher = NEOSearcher(self.db, cache_entries=0)
+        expected = [list(map(str, searcher.get_objects(query))) for query in queries]
+        batch_results = NEOSearcher(self.db).get_objects_batch(queries)
+        self.assertEqual(expected, [list(map(str, results)) for results in batch_results])
+
+    def test_ordered_results_are_first_results_of_sorted_search(self):
+        indexed_db = NEODatabase(filename=self.neo_data_file, indexes=True)
+        indexed_db.load_data()
+        searcher = NEOSearcher(self.db, cache_entries=0)
+        # The index is read whenever the query allows it, whatever the estimated rows
+        indexed_searcher = NEOSearcher(indexed_db, cache_entries=0)
+        indexed_searcher.order_index = lambda query: query.order.field if query.number is not None and (
+            query.order.field == 'diameter' or query.order.field == 'distance' and query.return_object == OrbitPath) \
+            else None
+
+        keys = {
+            ('NEO', 'diameter'): lambda neo: neo.diameter_min_km,
+            ('NEO', 'distance'): lambda neo: min(orbit.miss_distance_kilometers for orbit in neo.orbits
+                                                 if self.start_date <= orbit.close_approach_date <= self.end_date),
+            ('Path', 'diameter'): lambda orbit: orbit.neo.diameter_min_km,
+            ('Path', 'distance'): lambda orbit: orbit.miss_distance_kilometers,
+            ('Path', 'date'): lambda orbit: orbit.close_approach_date,
+        }
+        for (return_object, order_by), key in keys.items():
+            for order in ['asc', 'desc']:
+                query = dict(start_date=self.start_date, end_date=self.end_date, return_object=return_object,
+                             filter=["diameter:>:0.042"])
+                # The results of the query without number, in the date window, sorted on the field, equal results
+                # staying in order
+                results = searcher.get_objects(Query(**query).build_query())
+                if return_object == 'Path':
+                    results = [orbit for orbit in results
+                               if self.start_date <= orbit.close_approach_date <= self.end_date]
+                expected = sorted(results, key=key, reverse=order == 'desc')
+                for number in [1, 10, None]:
+                    query_selectors = Query(number=number, order_by=order_by, order=order, **query).build_query()
+                    self.assertEqual(list(map(str, expected[:number])),
+                                     list(map(str, searcher.get_objects(query_selectors))))
+                    self.assertEqual(list(map(str, expected[:number])),
+                                     list(map(str, indexed_searcher.get_objects(query_selectors))))
+
+    def test_ordered_orbits_are_close_approaches_in_date_window(self):
+        indexed_db = NEODatabase(filename=self.neo_data_file, indexes=True)
+        indexed_db.load_data()
+        indexed_searcher = NEOSearcher(indexed_db)
+        # The index is read whenever the query allows it, whatever the estimated rows
+        indexed_searcher.order_index = lambda query: query.order.field if query.order.field != 'date' else None
+        searchers = [NEOSearcher(self.db), indexed_searcher]
+        if np is not None:
+            columnar_db = NEODatabase(filename=self.neo_data_file, columnar=True)
+            columnar_db.load_data()
+            searchers.append(NEOSearcher(columnar_db))
+
+        # The NEOs of the date window also have close approaches after it
+        query = dict(start_date=self.start_date, end_date=self.end_date, return_object='Path')
+        self.assertTrue(any(orbit.close_approach_date > self.end_date
+                            for orbit in NEOSearcher(self.db).get_objects(Query(**query).build_query())))
+
+        for order_by in ['date', 'diameter', 'distance']:
+            for order in ['asc', 'desc']:
+                for filters in [None, ["distance:>:234989"]]:
+                    query_selectors = Query(number=10, order_by=order_by, order=order, filter=filters,
+                                            **query).build_query()
+                    for searcher in searchers:
+                        results = searcher.get_objects(query_selectors)
+                        self.assertEqual(len(results), 10)
+                        self.assertTrue(all(self.start_date <= orbit.close_approach_date <= self.end_date
+                                            for orbit in results))
+
+        # The closest approaches of the window are the closest of the orbits in the window
+        orbits = [orbit for neo in self.db.neo_object_db.values() for orbit in neo.orbits
+                  if self.start_date <= orbit.close_approach_date <= self.end_date]
+        closest = sorted(orbit.miss_distance_kilometers for orbit in orbits)[:5]
+        query_selectors = Query(number=5, order_by='distance', **query).build_query()
+        for searcher in searchers:
+            self.assertEqual(closest, [orbit.miss_distance_kilometers for orbit in searcher.get_objects(query_selectors)])
+
+    def test_ordered_and_unordered_orbits(self):
+        query = dict(start_date=self.start_date, end_date=self.end_date, filter=["distance:>:234989"])
+        searcher = NEOSearcher(self.db)
+        neos = searcher.get_objects(Query(return_object='NEO', **query).build_query())
+        window_orbits = [orbit for neo in neos for orbit in neo.orbits
+                         if self.start_date <= orbit.close_approach_date <= self.end_date]
+
+        # The unordered orbits are every orbit of the NEOs found, the ordered orbits only their orbits in the window
+        unordered_orbits = searcher.get_objects(Query(return_object='Path', **query).build_query())
+        self.assertEqual(list(map(str, chain.from_iterable(neo.orbits for neo in neos))),
+                         list(map(str, unordered_orbits)))
+        self.assertGreater(len(unordered_orbits), len(window_orbits))
+        self.assertGreater(len(neos), len({orbit.neo.name for orbit in window_orbits}))
+        for order_by in ['date', 'diameter', 'distance']:
+            ordered_orbits = searcher.get_objects(Query(return_object='Path', order_by=order_by, **query).build_query())
+            self.assertEqual(sorted(map(str, window_orbits)), sorted(map(str, ordered_orbits)))
+
+            # The ordered NEOs are the NEOs found with an orbit matching the filters in the window, with the same orbits
+            ordered_neos = searcher.get_objects(Query(return_object='NEO', order_by=order_by, **query).build_query())
+            self.assertEqual(sorted((str(neo), list(map(str, neo.orbits))) for neo in neos
+                                    if any(orbit.neo.name == neo.name for orbit in window_orbits)),
+                             sorted((str(neo), list(map(str, neo.orbits))) for neo in ordered_neos))
+
+    def test_aggregates_from_rollups_match_searched_neos(self):
+        rollups_db = NEODatabase(filename=self.neo_data_file, rollups=True)
+        rollups_db.load_data()
+        searcher = NEOSearcher(self.db)
+        rollups_searcher = NEOSearcher(rollups_db)
+
+        # The aggregates of a day are the counts of the NEOs found on the day
+        query_selectors = Query(date=self.start_date).build_query()
+        neos = searcher.get_objects(query_selectors)
+        aggregate, = rollups_searcher.get_aggregates(query_selectors, group_by='day')
+        self.assertEqual(aggregate.group, self.start_date)
+        self.assertEqual(aggregate.neos, len(neos))
+        self.assertEqual(aggregate.hazardous_neos, sum(neo.is_potentially_hazardous_asteroid is True for neo in neos))
+        self.assertEqual(aggregate.min_distance_km, min(orbit.miss_distance_kilometers for neo in neos
+                                                        for orbit in neo.orbits
+                                                        if orbit.close_approach_date == self.start_date))
+
+        # The rollups give the aggregates of the scan of the NEOs, for ranges cutting the groups of dates
+        for query in [dict(start_date=self.start_date, end_date=self.end_date),
+                      dict(start_date='2019-12-15', end_date='2020-01-20', filter=["is_hazardous:=:True"]),
+                      dict(end_date='2020-01-05', filter=["is_hazardous:=:False"])]:
+            for group_by in ['day', 'month', 'year']:
+                query_selectors = Query(**query).build_query()
+                self.assertEqual(searcher.get_aggregates(query_selectors, group_by),
+                                 rollups_searcher.get_aggregates(query_selectors, group_by))
+
+        # Explain reports the aggregates falling back to a scan of the date index
+        query_selectors = Query(start_date=self.start_date, end_date=self.end_date).build_query()
+        self.assertIn('read from the rollups', rollups_searcher.explain(query_selectors, group_by='month'))
+        self.assertIn('the database has no rollups', searcher.explain(query_selectors, group_by='month'))
+        query_selectors = Query(start_date=self.start_date, end_date=self.end_date,
+                                filter=["diameter:>:0.042"]).build_query()
+        self.assertIn('scan of the date index', rollups_searcher.explain(query_selectors, group_by='month'))
+        self.assertEqual(searcher.get_aggregates(query_selectors, 'month'),
+                         rollups_searcher.get_aggregates(query_selectors, 'month'))
+
+    def test_profiler_counts_rows_of_each_search_stage(self):
+        query_selectors = Query(number=5, start_date=self.start_date, end_date=self.end_date,
+                                filter=["diameter:>:0.042", "distance:>:234989"]).build_query()
+        results = NEOSearcher(self.db).get_objects(query_selectors)
+        profiler = Profiler()
+        self.assertEqual(list(map(str, results)),
+                         list(map(str, NEOSearcher(self.db, profiler=profiler).get_objects(query_selectors))))
+
+        # Confirm each stage reads the rows produced by the previous one, up to the requested number of results
+        metrics = profiler.metrics()
+        stages = metrics['stages']
+        self.assertEqual(list(stages), ['date index', 'NEO filters', 'orbit filters', 'results'])
+        self.assertEqual(stages['date index']['rows_out'], stages['NEO filters']['rows_in'])
+        self.assertEqual(stages['NEO filters']['rows_out'], stages['orbit filters']['rows_in'])
+        self.assertEqual(stages['results']['rows_out'], len(results))
+        self.assertEqual(metrics['phases']['search']['calls'], 1)
+        self.assertEqual(metrics['phases']['search']['rows_out'], len(results))
+
+    def test_invalid_filter_values_are_rejected_when_query_is_built(self):
+        for invalid_filter in ["diameter:>:big", "distance:<:", "is_hazardous:=:maybe", "diameter:~:1", "diameter:>"]:
+            with self.assertRaises(Exception):
+                Query(start_date=self.start_date, end_date=self.end_date, filter=[invalid_filter]).build_query()
+
+    def test_repeated_filtered_search_leaves_database_unchanged(self):
+        orbit_counts = {name: len(neo.orbits) for name, neo in self.db.neo_object_db.items()}
+        searcher = NEOSearcher(self.db)
+
+        results = []
+        for _ in range(3):
+            for return_object in ['NEO', 'Path']:
+                query_selectors = Query(
+                    number=10, start_date=self.start_date, end_date=self.end_date, return_object=return_object,
+                    filter=["diameter:>:0.042", "is_hazardous:=:True", "distance:>:234989"]
+                ).build_query()
+                results.append(list(map(str, searcher.get_objects(query_selectors))))
+
+        # Confirm the same results on every run and no orbit removed from the loaded Near Earth Objects
+        self.assertEqual(results[0:2] * 3, results)
+        self.assertEqual(orbit_counts, {name: len(neo.orbits) for name, neo in self.db.neo_object_db.items()})
+
+
+class TestNEOWriter(unittest.TestCase):
+    """
+    Test Class checking that the output formats of NEOWriter write every streamed result to the requested file.
+    """
+
+    def setUp(self):
+        self.db = NEODatabase(filename=f'{PROJECT_ROOT}/data/neo_data.csv')
+        self.db.load_data()
+        self.query_selectors = Query(start_date='2020-01-01', end_date='2020-01-10', return_object='Path').build_query()
+        self.results = NEOSearcher(self.db).get_objects(self.query_selectors)
+
+    def test_formats_write_streamed_results_to_filename(self):
+        with tempfile.TemporaryDirectory() as directory:
+            for output_format in ['csv_file', 'csv_gz', 'jsonl']:
+                filename = f'{directory}/output.{output_format}'
+                results = NEOSearcher(self.db).iter_objects(self.query_selectors)
+                self.assertTrue(NEOWriter().write(output_format, results, filename=filename))
+
+                opener = gzip.open if output_format == 'csv_gz' else open
+                with opener(filename, 'rt', newline='') as output_file:
+                    if output_format == 'jsonl':
+                        rows = [[row['neo_name'], str(row['miss_distance_kilometers']), row['close_approach_date']]
+                                for row in map(json.loads, output_file)]
+                    else:
+                        header, *rows = csv.reader(output_file)
+                        self.assertEqual(NEOWriter.CsvHeaders['OrbitPath'], header)
+                self.assertEqual(list(map(NEOWriter.csv_row, self.results)), rows)
+
+
+class TestCompactModels(unittest.TestCase):
+    """
+    Test Class checking that the __slots__ NearEarthObject and OrbitPath keep the attributes of the csv file while
+    storing each value once.
+    """
+
+    def setUp(self):
+        self.neo_data_file = f'{PROJECT_ROOT}/data/neo_data.csv'
+
+        self.db = NEODatabase(filename=self.neo_data_file)
+        self.db.load_data()
+        with open(self.neo_data_file) as neo_data_file:
+            self.entries = list(csv.DictReader(neo_data_file))
+
+    def test_models_have_no_instance_dict(self):
+        neo = next(iter(self.db.neo_object_db.values()))
+        orbit = neo.orbits[0]
+        for instance in [neo, orbit]:
+            self.assertFalse(hasattr(instance, '__dict__'))
+            with self.assertRaises(AttributeError):
+                instance.unknown_attribute = None
+
+    def test_derived_attributes_match_csv_values(self):
+        for entry in self.entries[:100]:
+            neo = self.db.neo_object_db[entry['name']]
+            self.assertEqual(entry['id'], neo.id)
+            self.assertAlmostEqual(float(entry['estimated_diameter_min_kilometers']), neo.diameter_min_km)
+            self.assertAlmostEqual(float(entry['estimated_diameter_max_kilometers']), neo.diameter_max_km)
+            self.assertAlmostEqual(float(entry['estimated_diameter_min_meters']), neo.diameter_min_meter, places=3)
+            self.assertAlmostEqual(float(entry['estimated_diameter_max_meters']), neo.diameter_max_meter, places=3)
+            # The miles are converted as the miss distances of the NASA export are
+            self.assertAlmostEqual(neo.diameter_min_km * MILES_PER_KILOMETER, neo.diameter_min_miles)
+            self.assertAlmostEqual(neo.diameter_max_km * MILES_PER_KILOMETER, neo.diameter_max_miles)
+
+    def test_orbits_refer_to_their_neo_and_share_date_strings(self):
+        dates = {date: date for date in self.db.date_neo_db}
+        for neo in self.db.neo_object_db.values():
+            for orbit in neo.orbits:
+                self.assertIs(neo, orbit.neo)
+                self.assertEqual((neo.id, neo.name), (orbit.neo_id, orbit.neo_name))
+                # The orbits of a date share the string of the date_neo_db key
+                self.assertIs(dates[orbit.close_approach_date], orbit.close_approach_date)
+
+        # An orbit built without its NearEarthObject refers to the id and name of its row
+        orbit = OrbitPath(**self.entries[0])
+        self.assertEqual((self.entries[0]['id'], self.entries[0]['name']), (orbit.neo_id, orbit.neo_name))
+
+class MakeDirectory:
+    """
+    Object creating a directory when it is unpickled.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def __reduce__(self):
+        return os.mkdir, (self.path,)
+
+
+class TestNEODatabaseLoad(unittest.TestCase):
+    """
+    Test Class checking that the ways of loading a NEODatabase, in parallel or incrementally, build the same database
+    as the serial load_data.
+    """
+
+    def setUp(self):
+        self.neo_data_file = f'{PROJECT_ROOT}/data/neo_data.csv'
+
+        self.db = NEODatabase(filename=self.neo_data_file)
+        self.db.load_data()
+
+    def assert_same_database(self, db):
+        self.assertEqual(list(self.db.neo_object_db), list(db.neo_object_db))
+        for name, neo in self.db.neo_object_db.items():
+            other_neo = db.neo_object_db[name]
+            self.assertEqual(str(neo), str(other_neo))
+            self.assertEqual(list(map(str, neo.orbits)), list(map(str, other_neo.orbits)))
+            self.assertTrue(all(orbit.neo is other_neo for orbit in other_neo.orbits))
+
+        self.assertEqual(list(self.db.date_neo_db), list(db.date_neo_db))
+        for date, neos in db.date_neo_db.items():
+            self.assertEqual([neo.name for neo in self.db.date_neo_db[date]], [neo.name for neo in neos])
+            # Confirm the dates point at the single instance of each Near Earth Object
+            self.assertTrue(all(neo is db.neo_object_db[neo.name] for neo in neos))
+        self.assertEqual(self.db.sorted_dates, db.sorted_dates)
+
+    def test_parallel_load_matches_serial_load(self):
+        for workers in [2, 3]:
+            db = NEODatabase(filename=self.neo_data_file)
+            db.load_data(workers=workers)
+            self.assert_same_database(db)
+
+    def test_projected_load_matches_entry_load(self):
+        db = NEODatabase(filename=self.neo_data_file)
+        with open(self.neo_data_file) as neo_data_file:
+            for entry in csv.DictReader(neo_data_file):
+                db.add_entry(entry)
+        db.build_date_index()
+        self.assert_same_database(db)
+
+    @unittest.skipIf(pa is None, 'Arrow and Parquet files require pyarrow')
+    def test_arrow_and_parquet_load_matches_csv_load(self):
+        from pyarrow import csv as arrow_csv, feather, parquet
+        table = arrow_csv.read_csv(self.neo_data_file)
+
+        with tempfile.TemporaryDirectory() as directory:
+            feather.write_feather(table, f'{directory}/neo_data.arrow')
+            parquet.write_table(table, f'{directory}/neo_data.parquet')
+            for filename in [f'{directory}/neo_data.arrow', f'{directory}/neo_data.parquet']:
+                db = NEODatabase(filename=filename)
+                db.load_data()
+                self.assert_same_database(db)
+
+    def test_ingest_skips_loaded_approaches(self):
+        with open(self.neo_data_file) as neo_data_file:
+            header, *rows = neo_data_file.readlines()
+        half = len(rows) // 2
+
+        with tempfile.TemporaryDirectory() as directory:
+            first_file = f'{directory}/first.csv'
+            delta_file = f'{directory}/delta.csv'
+            with open(first_file, 'w') as first:
+                first.writelines([header, *rows[:half]])
+            with open(delta_file, 'w') as delta:
+                delta.writelines([header, *rows[half // 2:]])
+
+            db = NEODatabase(filename=first_file)
+            db.load_data()
+            loaded_version = db.version
+            self.assertEqual(db.ingest(delta_file), len(rows) - half)
+            self.assertEqual(db.version, loaded_version + 1)
+            self.assert_same_database(db)
+
+            # Ingesting the same delta again adds nothing
+            self.assertEqual(db.ingest(delta_file), 0)
+            self.assertEqual(db.version, loaded_version + 1)
+            self.assert_same_database(db)
+
+    def test_malformed_row_is_not_ingested(self):
+        with open(self.neo_data_file) as neo_data_file:
+            header, *rows = list(csv.reader(neo_data_file))
+        half = len(rows) // 2
+        new_neo_row = dict(zip(header, rows[-1]), id='9999999', name='(9999 ZZ)')
+        malformed_row = dict(new_neo_row, miss_distance_kilometers='far')
+
+        with tempfile.TemporaryDirectory() as directory:
+            first_file = f'{directory}/first.csv'
+            with open(first_file, 'w', newline='') as first:
+                csv.writer(first).writerows([header, *rows[:half]])
+            db = NEODatabase(filename=first_file, indexes=True, rollups=True)
+            db.load_data()
+            loaded_version = db.version
+
+            delta_file = f'{directory}/delta.csv'
+            with open(delta_file, 'w', newline='') as delta:
+                writer = csv.DictWriter(delta, fieldnames=header)
+                writer.writeheader()
+                writer.writerows([dict(zip(header, rows[half])), malformed_row])
+            with self.assertRaises(ValueError):
+                db.ingest(delta_file)
+
+            # The row before the malformed row is added, the malformed row leaves no trace
+            self.assertEqual(loaded_version + 1, db.version)
+            self.assertNotIn('(9999 ZZ)', db.neo_object_db)
+            self.assertFalse(any(neo.name == '(9999 ZZ)' for neo in db.diameter_index.objects))
+            self.assertFalse(any(key[0] == '9999999' for key in db.approach_keys))
+
+            # The corrected row is ingested
+            with open(delta_file, 'w', newline='') as delta:
+                writer = csv.DictWriter(delta, fieldnames=header)
+                writer.writeheader()
+                writer.writerow(new_neo_row)
+            self.assertEqual(1, db.ingest(delta_file))
+            self.assertEqual(1, len(db.neo_object_db['(9999 ZZ)'].orbits))
+
+    def test_ingest_updates_secondary_indexes(self):
+        with open(self.neo_data_file) as neo_data_file:
+            header, *rows = neo_data_file.readlines()
+        half = len(rows) // 2
+
+        with tempfile.TemporaryDirectory() as directory:
+            first_file = f'{directory}/first.csv'
+            with open(first_file, 'w') as first:
+                first.writelines([header, *rows[:half]])
+
+            db = NEODatabase(filename=first_file, indexes=True)
+            db.load_data()
+            # A few rows are inserted into the indexes one at a time, more are merged with them
+            with open(first_file, 'a') as first:
+                first.writelines(rows[half:half + 10])
+            self.assertEqual(db.ingest(tail=True), 10)
+            self.assertGreater(db.ingest(self.neo_data_file), SortedIndex.MERGE_THRESHOLD)
+
+        # The indexes and positions on each date updated by the ingest are those of the whole csv file
+        indexed_db = NEODatabase(filename=self.neo_data_file, indexes=True)
+        indexed_db.load_data()
+        for index in ['diameter_index', 'distance_index']:
+            self.assertEqual(getattr(indexed_db, index).keys, getattr(db, index).keys)
+            self.assertEqual(sorted(map(str, getattr(indexed_db, index).objects)),
+                             sorted(map(str, getattr(db, index).objects)))
+        self.assertEqual({date: {neo.name: position for neo, position in positions.items()}
+                          for date, positions in indexed_db.date_positions.items()},
+                         {date: {neo.name: position for neo, position in positions.items()}
+                          for date, positions in db.date_positions.items()})
+        query_selectors = Query(start_date='2020-01-01', end_date='2020-01-10', return_object='Path',
+                                filter=["distance:<=:384400"]).build_query()
+        self.assertEqual(list(map(str, NEOSearcher(indexed_db).get_objects(query_selectors))),
+                         list(map(str, NEOSearcher(db).get_objects(query_selectors))))
+
+    def test_ingest_adds_approaches_to_rollups(self):
+        with open(self.neo_data_file) as neo_data_file:
+            header, *rows = neo_data_file.readlines()
+        half = len(rows) // 2
+
+        with tempfile.TemporaryDirectory() as directory:
+            first_file = f'{directory}/first.csv'
+            with open(first_file, 'w') as first:
+                first.writelines([header, *rows[:half]])
+
+            db = NEODatabase(filename=first_file, rollups=True)
+            db.load_data()
+            db.ingest(self.neo_data_file)
+
+        # The rollups added to by the ingest are the rollups of the whole csv file
+        rollups_db = NEODatabase(filename=self.neo_data_file, rollups=True)
+        rollups_db.load_data()
+        rollups, ingested_rollups = rollups_db.date_rollups, db.date_rollups
+        self.assertEqual(rollups.dates, ingested_rollups.dates)
+        self.assertEqual(rollups.approach_sums, ingested_rollups.approach_sums)
+        self.assertEqual(rollups.date_neos, ingested_rollups.date_neos)
+        self.assertEqual(rollups.group_neos, ingested_rollups.group_neos)
+        for hazardous in rollups.Classes:
+            self.assertEqual(rollups.min_distances[hazardous].levels, ingested_rollups.min_distances[hazardous].levels)
+
+    def test_tail_ingest_reads_appended_rows(self):
+        with open(self.neo_data_file) as neo_data_file:
+            header, *rows = neo_data_file.readlines()
+        half = len(rows) // 2
+
+        with tempfile.TemporaryDirectory() as directory:
+            growing_file = f'{directory}/growing.csv'
+            with open(growing_file, 'w') as growing:
+                growing.writelines([header, *rows[:half]])
+
+            db = NEODatabase(filename=growing_file)
+            db.load_data()
+
+            # The last row is still being written: it is left for the next ingest
+            with open(growing_file, 'a') as growing:
+                growing.writelines(rows[half:-1])
+                growing.write(rows[-1][:10])
+            self.assertEqual(db.ingest(tail=True), len(rows) - half - 1)
+
+            with open(growing_file, 'a') as growing:
+                growing.write(rows[-1][10:])
+            self.assertEqual(db.ingest(tail=True), 1)
+            self.assertEqual(db.ingest(tail=True), 0)
+            self.assert_same_database(db)
+
+    def copy_neo_data_file(self, directory):
+        copied_file = f'{directory}/neo_data.csv'
+        with open(self.neo_data_file) as neo_data_file, open(copied_file, 'w') as copied:
+            copied.write(neo_data_file.read())
+        return copied_file
+
+    def test_snapshot_load_matches_csv_load(self):
+        with tempfile.TemporaryDirectory() as directory:
+            neo_data_file = self.copy_neo_data_file(directory)
+            NEODatabase(filename=neo_data_file, snapshot=True).load_data()
+            self.assertIsNotNone(read_snapshot(neo_data_file, 'dict'))
+
+            db = NEODatabase(filename=neo_data_file, snapshot=True)
+            db.load_data()
+            self.assert_same_database(db)
+
+    @unittest.skipIf(np is None, 'The columnar backend requires numpy')
+    def test_columnar_snapshot_load_matches_csv_load(self):
+        query = Query(number=10, start_date='2020-01-01', end_date='2020-01-10', return_object='Path').build_query()
+        results = list(map(str, NEOSearcher(self.db).get_objects(query)))
+
+        with tempfile.TemporaryDirectory() as directory:
+            neo_data_file = self.copy_neo_data_file(directory)
+            NEODatabase(filename=neo_data_file, columnar=True, snapshot=True).load_data()
+            self.assertIsNotNone(read_snapshot(neo_data_file, 'columnar'))
+            # A snapshot is only read by the backend it was written for
+            self.assertIsNone(read_snapshot(neo_data_file, 'dict'))
+
+            columnar_db = NEODatabase(filename=neo_data_file, columnar=True, snapshot=True)
+            columnar_db.load_data()
+            self.assertEqual(results, list(map(str, NEOSearcher(columnar_db).get_objects(query))))
+
+    @unittest.skipIf(np is None, 'The columnar backend requires numpy')
+    def test_unsupported_options_are_rejected_with_snapshot(self):
+        with tempfile.TemporaryDirectory() as directory:
+            neo_data_file = self.copy_neo_data_file(directory)
+            NEODatabase(filename=neo_data_file, columnar=True, snapshot=True).load_data()
+            self.assertIsNotNone(read_snapshot(neo_data_file, 'columnar'))
+
+            # The options the columnar backend does not support are rejected, even when its snapshot is read
+            for options, workers in [(dict(indexes=True), 1), (dict(rollups=True), 1), ({}, 2)]:
+                db = NEODatabase(filename=neo_data_file, columnar=True, snapshot=True, **options)
+                with self.assertRaises(UnsupportedFeature):
+                    db.load_data(workers=workers)
+
+    def test_snapshot_of_changed_csv_file_is_not_read(self):
+        with open(self.neo_data_file) as neo_data_file:
+            header, *rows = neo_data_file.readlines()
+        half = len(rows) // 2
+
+        with tempfile.TemporaryDirectory() as directory:
+            growing_file = f'{directory}/neo_data.csv'
+            with open(growing_file, 'w') as growing:
+                growing.writelines([header, *rows[:half]])
+            NEODatabase(filename=growing_file, snapshot=True).load_data()
+            self.assertIsNotNone(read_snapshot(growing_file, 'dict'))
+
+            with open(growing_file, 'a') as growing:
+                growing.writelines(rows[half:])
+            self.assertIsNone(read_snapshot(growing_file, 'dict'))
+            db = NEODatabase(filename=growing_file, snapshot=True)
+            db.load_data()
+            self.assert_same_database(db)
+
+    def test_corrupt_snapshot_is_not_read(self):
+        with tempfile.TemporaryDirectory() as directory:
+            neo_data_file = self.copy_neo_data_file(directory)
+            NEODatabase(filename=neo_data_file, snapshot=True).load_data()
+            with open(snapshot_filename(neo_data_file), 'rb') as snapshot_file:
+                snapshot = snapshot_file.read()
+
+            for corrupt_snapshot in [b'', b'garbage', snapshot[:len(snapshot) // 2], snapshot[:100] + b'\0' * 100]:
+                with open(snapshot_filename(neo_data_file), 'wb') as snapshot_file:
+                    snapshot_file.write(corrupt_snapshot)
+                self.assertIsNone(read_snapshot(neo_data_file, 'dict'))
+
+                db = NEODatabase(filename=neo_data_file, snapshot=True)
+                db.load_data()
+                self.assert_same_database(db)
+
+    def test_snapshot_cannot_run_code(self):
+        with tempfile.TemporaryDirectory() as directory:
+            neo_data_file = self.copy_neo_data_file(directory)
+            marker = f'{directory}/marker'
+            # A snapshot with a valid header whose state runs a command when it is unpickled
+            write_snapshot(neo_data_file, {'date_neo_db': MakeDirectory(marker)}, 'dict')
+
+            self.assertIsNone(read_snapshot(neo_data_file, 'dict'))
+            db = NEODatabase(filename=neo_data_file, snapshot=True)
+            db.load_data()
+            self.assertFalse(pathlib.Path(marker).exists())
+            self.assert_same_database(db)
+
+
+@unittest.skipIf(np is None, 'The columnar backend requires numpy')
+class TestColumnarBackend(unittest.TestCase):
+    """
+    Test Class checking that the NumPy backed columnar backend returns the same results as the dict backend.
+    """
+
+    def setUp(self):
+        self.neo_data_file = f'{PROJECT_ROOT}/data/neo_data.csv'
+
+        self.start_date = '2020-01-01'
+        self.end_date = '2020-01-10'
+
+    def assert_same_results(self, **query):
+        db = NEODatabase(filename=self.neo_data_file)
+        db.load_data()
+        columnar_db = NEODatabase(filename=self.neo_data_file, columnar=True)
+        columnar_db.load_data()
+
+        results = NEOSearcher(db).get_objects(Query(**query).build_query())
+        columnar_results = NEOSearcher(columnar_db).get_objects(Query(**query).build_query())
+
+        self.assertEqual(list(map(str, results)), list(map(str, columnar_results)))
+
+    def test_same_neos_between_dates(self):
+        self.assert_same_results(number=10, start_date=self.start_date, end_date=self.end_date, return_object='NEO')
+
+    def test_same_orbits_between_dates_with_diameter_and_hazardous_and_distance(self):
+        self.assert_same_results(
+            number=10, start_date=self.start_date, end_date=self.end_date, return_object='Path',
+            filter=["diameter:>:0.042", "is_hazardous:=:True", "distance:>:234989"]
+        )
+
+
+
+class TestCatalog(unittest.TestCase):
+    """
+    Test Class checking that a date-partitioned catalog only loads the partitions overlapping a query window, and
+    returns the results of a database loaded with the rows of these partitions.
+    """
+
+    def setUp(self):
+        self.neo_data_file = f'{PROJECT_ROOT}/data/neo_data.csv'
+
+    def test_query_loads_overlapping_partitions(self):
+        query = dict(start_date='2020-01-01', end_date='2020-01-10', filter=["diameter:>:0.042"])
+        query_selectors = Query(**query).build_query()
+        with tempfile.TemporaryDirectory() as directory:
+            partitions = build_catalog(self.neo_data_file, f'{directory}/catalog')
+            catalog = Catalog(f'{directory}/catalog')
+            selected = catalog.select_partitions(query_selectors.date_search)
+            self.assertEqual(['2020-01'], [partition.key for partition in selected])
+            self.assertEqual(len(catalog.select_partitions([])), len(partitions))
+
+            # The rows of the selected partitions, loaded as a csv file
+            with open(self.neo_data_file) as neo_data_file:
+                header, *rows = neo_data_file.readlines()
+            date_column = header.strip().split(',').index('close_approach_date')
+            partition_file = f'{directory}/partition.csv'
+            with open(partition_file, 'w') as neo_data_file:
+                neo_data_file.write(header)
+                neo_data_file.writelines(row for row in rows
+                                         if next(csv.reader([row]))[date_column].startswith('2020-01'))
+            db = NEODatabase(filename=partition_file)
+            db.load_data()
+
+            expected = list(map(str, NEOSearcher(db).get_objects(query_selectors)))
+            for _ in range(2):
+                results = NEOSearcher(catalog.database(query_selectors.date_search)).get_objects(query_selectors)
+                self.assertEqual(expected, list(map(str, results)))
+            self.assertEqual(catalog.stats()['reads'], 1)
+            self.assertEqual(catalog.stats()['hits'], 1)
+
+            # The queries on the same partition share its database
+            self.assertIs(catalog.database(query_selectors.date_search),
+                          catalog.database(Query(date='2020-01-20').build_query().date_search))
+            self.assertEqual(catalog.stats()['reads'], 1)
+
+    def test_overlapping_windows_share_partitions(self):
+        with tempfile.TemporaryDirectory() as directory:
+            partitions = build_catalog(self.neo_data_file, f'{directory}/catalog')
+            catalog = Catalog(f'{directory}/catalog')
+            # The orbits of a Near Earth Object are in the order of the partitions, then of the rows
+            db = NEODatabase(filename=f'{directory}/catalog')
+            db.add_rows(LOADED_COLUMNS, chain.from_iterable(
+                iter_loaded_rows(f'{directory}/catalog/{partition.filename}') for partition in partitions))
+            db.build_date_index()
+            catalog.database(Query(date='2020-01-05').build_query().date_search)
+
+            # The window over both partitions only reads the partition not read yet, and merges the two
+            for return_object in ['NEO', 'Path']:
+                query_selectors = Query(start_date='2019-12-20', end_date='2020-01-10',
+                                        return_object=return_object).build_query()
+                merged_db = catalog.database(query_selectors.date_search)
+                self.assertEqual([(str(result), list(map(str, getattr(result, 'orbits', []))))
+                                  for result in NEOSearcher(db).get_objects(query_selectors)],
+                                 [(str(result), list(map(str, getattr(result, 'orbits', []))))
+                                  for result in NEOSearcher(merged_db).get_objects(query_selectors)])
+            self.assertEqual(2, catalog.stats()['reads'])
+            self.assertEqual(3, catalog.stats()['hits'])
+
+            # The NEOs approaching in both partitions hold their orbits of both, referring back to them
+            self.assertTrue(any(len({orbit.close_approach_date[:7] for orbit in neo.orbits}) == 2
+                                for neo in merged_db.neo_object_db.values()))
+            for name, neo in merged_db.neo_object_db.items():
+                self.assertEqual(list(map(str, db.neo_object_db[name].orbits)), list(map(str, neo.orbits)))
+                self.assertTrue(all(orbit.neo is neo for orbit in neo.orbits))
+            for date, neos in merged_db.date_neo_db.items():
+                self.assertTrue(all(neo is merged_db.neo_object_db[neo.name] for neo in neos))
+
+    def test_partition_cache_follows_memory_budget(self):
+        with tempfile.TemporaryDirectory() as directory:
+            build_catalog(self.neo_data_file, f'{directory}/catalog')
+            uncached_catalog = Catalog(f'{directory}/catalog', memory_budget=0)
+            for _ in range(2):
+                uncached_catalog.database([])
+            self.assertEqual({'reads': 4, 'hits': 0, 'cached': 0, 'cached_bytes': 0},
+                             {key: uncached_catalog.stats()[key] for key in ['reads', 'hits', 'cached', 'cached_bytes']})
+
+            # The cache holds the estimated bytes of the partition databases
+            catalog = Catalog(f'{directory}/catalog')
+            catalog.database([])
+            self.assertEqual(sum(map(Catalog.estimate_bytes, [catalog.read_partition(partition)
+                                                              for partition in catalog.partitions])),
+                             catalog.stats()['cached_bytes'])
+            self.assertEqual(2, catalog.stats()['hits'])
+
+
+class TestSQLiteBackend(unittest.TestCase):
+    """
+    Test Class checking that the sqlite backend returns the same results as the dict backend.
+    """
+
+    def setUp(self):
+        self.neo_data_file = f'{PROJECT_ROOT}/data/neo_data.csv'
+
+        self.db = NEODatabase(filename=self.neo_data_file)
+        self.db.load_data()
+
+    def test_same_results_as_dict_backend(self):
+        queries = [
+            dict(date='2020-01-01'),
+            dict(number=10, start_date='2020-01-01', end_date='2020-01-10', return_object='Path'),
+            dict(start_date='2020-01-01', end_date='2020-01-10', filter=["diameter:>:0.042", "is_hazardous:=:True"]),
+            dict(number=25, start_date='2020-01-01', end_date='2020-01-10', return_object='Path',
+                 filter=["diameter:>:0.042", "is_hazardous:=:False", "distance:>:234989"]),
+            dict(number=5, filter=["distance:<=:50000000"]),
+        ]
+        with tempfile.TemporaryDirectory() as directory:
+            # The SQLite database file is written next to the csv file
+            neo_data_file = f'{directory}/neo_data.csv'
+            pathlib.Path(neo_data_file).write_bytes(pathlib.Path(self.neo_data_file).read_bytes())
+            for snapshot in [False, True, True]:
+                sqlite_db = NEODatabase(filename=neo_data_file, snapshot=snapshot, sqlite=True)
+                sqlite_db.load_data()
+                for query in queries:
+                    self.assertEqual(
+                        list(map(str, NEOSearcher(self.db).get_objects(Query(**query).build_query()))),
+                        list(map(str, NEOSearcher(sqlite_db).get_objects(Query(**query).build_query()))))
+                sqlite_db.sqlite_store.close()
+
+
+class TestStreamingSearcher(unittest.TestCase):
+    """
+    Test Class checking that a search scanning the data file returns the results of a search of the loaded database,
+    and stops reading a file sorted by date once the results are complete.
+    """
+
+    def setUp(self):
+        self.neo_data_file = f'{PROJECT_ROOT}/data/neo_data.csv'
+
+        self.db = NEODatabase(filename=self.neo_data_file)
+        self.db.load_data()
+
+    def test_same_results_as_loaded_database(self):
+        queries = [
+            dict(date='2020-01-01'),
+            dict(number=10, start_date='2020-01-01', end_date='2020-01-10', return_object='Path'),
+            dict(start_date='2020-01-01', end_date='2020-01-10', filter=["diameter:>:0.042", "is_hazardous:=:True"]),
+            dict(number=25, start_date='2020-01-01', end_date='2020-01-10', return_object='Path',
+                 filter=["diameter:>:0.042", "is_hazardous:=:False", "distance:>:234989"]),
+            dict(number=5, filter=["distance:<=:50000000"]),
+            dict(number=5, start_date='2020-01-05'),
+            dict(number=200, start_date='2020-01-01', end_date='2020-01-31', filter=["diameter:>:0.042"]),
+        ]
+        with tempfile.TemporaryDirectory() as directory:
+            # The rows of the data file sorted by close approach date
+            with open(self.neo_data_file) as neo_data_file:
+                header, *rows = list(csv.reader(neo_data_file))
+            date_column = header.index('close_approach_date')
+            sorted_file = f'{directory}/neo_data.csv'
+            with open(sorted_file, 'w', newline='') as neo_data_file:
+                csv.writer(neo_data_file).writerows([header] + sorted(rows, key=lambda row: row[date_column]))
+
+            sorted_db = NEODatabase(filename=sorted_file, snapshot=False)
+            sorted_db.load_data()
+
+            # The orbits of a NEO are in the order of the rows of its file
+            for db, searchers in [(self.db, [StreamingSearcher(self.neo_data_file)]),
+                                  (sorted_db, [StreamingSearcher(sorted_file),
+                                               StreamingSearcher(sorted_file, sorted_by_date=True)])]:
+                for query in queries:
+                    query_selectors = Query(**query).build_query()
+                    expected = [(str(result), list(map(str, getattr(result, 'orbits', []))))
+                                for result in NEOSearcher(db).get_objects(query_selectors)]
+                    for searcher in searchers:
+                        self.assertEqual(expected, [(str(result), list(map(str, getattr(result, 'orbits', []))))
+                                                    for result in searcher.get_objects(query_selectors)])
+
+            # The first scan of a sorted file stops once the first 5 NEOs are found
+            searcher = StreamingSearcher(sorted_file, sorted_by_date=True)
+            searcher.get_objects(Query(number=5, date='2020-01-01').build_query())
+            self.assertLess(searcher.rows_read, 2 * len(rows))
+
+
+
+class TestNEOServer(unittest.TestCase):
+    """
+    Test Class checking that the query server answers as the NEOSearcher, and that the refreshes of a growing csv file
+    are ingested while queries are being answered.
+    """
+
+    def setUp(self):
+        self.neo_data_file = f'{PROJECT_ROOT}/data/neo_data.csv'
+        self.query = dict(start_date='2020-01-01', end_date='2020-01-10', return_object='Path',
+                          filter=["distance:<=:5000000"])
+
+        self.db = NEODatabase(filename=self.neo_data_file)
+        self.db.load_data()
+
+    def start_server(self, db):
+        server = NEOServer(('127.0.0.1', 0), db, quiet=True)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server
+
+    def get(self, server, path, **params):
+        url = 'http://127.0.0.1:{}{}?{}'.format(server.server_address[1], path, urlencode(params, doseq=True))
+        try:
+            with urlopen(url) as response:
+                return response.status, response.read().decode('utf-8')
+        except HTTPError as e:
+            return e.code, e.read().decode('utf-8')
+
+    def test_query_response_matches_search(self):
+        server = self.start_server(self.db)
+        results = NEOSearcher(self.db).get_objects(Query(number=10, **self.query).build_query())
+
+        status, body = self.get(server, '/query', number=10, **self.query)
+        self.assertEqual(200, status)
+        self.assertEqual({'count': len(results), 'results': list(map(NEOWriter.to_dict, results))}, json.loads(body))
+
+        status, body = self.get(server, '/query', number=10, format='csv', **self.query)
+        self.assertEqual(200, status)
+        self.assertEqual([NEOWriter.CsvHeaders['OrbitPath']] + [list(map(str, NEOWriter.csv_row(result)))
+                                                                 for result in results],
+                         list(csv.reader(io.StringIO(body))))
+
+        self.assertEqual(400, self.get(server, '/query', date='2020-13-01')[0])
+        self.assertEqual(404, self.get(server, '/unknown')[0])
+
+    def test_refresh_ingests_appended_rows_during_queries(self):
+        with open(self.neo_data_file) as neo_data_file:
+            header, *rows = neo_data_file.readlines()
+        half = len(rows) // 2
+        expected_count = len(NEOSearcher(self.db).get_objects(Query(**self.query).build_query()))
+
+        with tempfile.TemporaryDirectory() as directory:
+            growing_file = f'{directory}/neo_data.csv'
+            with open(growing_file, 'w') as growing:
+                growing.writelines([header, *rows[:half]])
+            db = NEODatabase(filename=growing_file, indexes=True)
+            db.load_data()
+            server = self.start_server(db)
+            server.refresh_every(0.01)
+
+            # Queries keep being answered while the rows are appended and ingested
+            statuses = []
+
+            def query_until_stopped():
+                while not stopped.is_set():
+                    statuses.append(self.get(server, '/query', **self.query)[0])
+
+            stopped = threading.Event()
+            query_thread = threading.Thread(target=query_until_stopped)
+            query_thread.start()
+            try:
+                for start in range(half, len(rows), 100):
+                    with open(growing_file, 'a') as growing:
+                        growing.writelines(rows[start:start + 100])
+                    time.sleep(0.01)
+
+                deadline = time.monotonic() + 10
+                count = None
+                while count != expected_count and time.monotonic() < deadline:
+                    count = json.loads(self.get(server, '/query', **self.query)[1])['count']
+                    time.sleep(0.05)
+            finally:
+                stopped.set()
+                query_thread.join()
+
+        self.assertEqual(expected_count, count)
+        self.assertTrue(statuses)
+        self.assertEqual({200}, set(statuses))
+
+    def test_refresh_waits_for_running_searches(self):
+        with open(self.neo_data_file) as neo_data_file:
+            header, *rows = neo_data_file.readlines()
+        half = len(rows) // 2
+
+        with tempfile.TemporaryDirectory() as directory:
+            growing_file = f'{directory}/neo_data.csv'
+            with open(growing_file, 'w') as growing:
+                growing.writelines([header, *rows[:half]])
+            db = NEODatabase(filename=growing_file, indexes=True)
+            db.load_data()
+            loaded_version = db.version
+            server = self.start_server(db)
+            server.refresh_every(0.01)
+
+            # A running search holds the lock for reading: the appended rows are only ingested once it is done
+            with server.lock.reading():
+                with open(growing_file, 'a') as growing:
+                    growing.writelines(rows[half:])
+                time.sleep(0.2)
+                self.assertEqual(loaded_version, db.version)
+            deadline = time.monotonic() + 10
+            while db.version == loaded_version and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(loaded_version + 1, db.version)
+
+    def test_refresh_skips_malformed_row(self):
+        with open(self.neo_data_file) as neo_data_file:
+            header, *rows = neo_data_file.readlines()
+        half = len(rows) // 2
+        # A new approach, with a miss distance in miles that is not a number
+        fields = next(csv.reader([rows[half]]))
+        malformed_row = ','.join(['9999999', *fields[1:-1], 'far']) + '\n'
+
+        with tempfile.TemporaryDirectory() as directory:
+            growing_file = f'{directory}/neo_data.csv'
+            with open(growing_file, 'w') as growing:
+                growing.writelines([header, *rows[:half]])
+            db = NEODatabase(filename=growing_file)
+            db.load_data()
+            malformed_offset = os.path.getsize(growing_file)
+
+            log = io.StringIO()
+            with contextlib.redirect_stdout(log):
+                server = self.start_server(db)
+                server.refresh_every(0.01)
+                with open(growing_file, 'a') as growing:
+                    growing.writelines([malformed_row, rows[half]])
+
+                # The row appended after the malformed row is still ingested
+                deadline = time.monotonic() + 10
+                while len(db.approach_keys or ()) != half + 1 and time.monotonic() < deadline:
+                    time.sleep(0.01)
+                server.server_close()
+
+        self.assertEqual(half + 1, len(db.approach_keys))
+        self.assertIn(f'malformed row at byte {malformed_offset}', log.getvalue())
+
+    def test_waiting_writer_goes_before_new_readers(self):
+        lock = ReadWriteLock()
+        events = []
+
+        def write():
+            with lock.writing():
+                events.append('write')
+
+        def read():
+            with lock.reading():
+                events.append('read')
+
+        with lock.reading():
+            writer = threading.Thread(target=write)
+            writer.start()
+            while not lock.waiting_writers:
+                time.sleep(0.001)
+            reader = threading.Thread(target=read)
+            reader.start()
+            time.sleep(0.05)
+            self.assertEqual([], events)
+        writer.join()
+        reader.join()
+        self.assertEqual(['write', 'read'], events)
+
+
+class TestBenchmarkSuite(unittest.TestCase):
+    """
+    Test Class checking that the synthetic data generator is deterministic and NASA-shaped, and that the benchmark
+    suite covers the load, search and write paths and reports the regressions over a baseline.
+    """
+
+    def test_synthetic_csv_is_deterministic(self):
+        with tempfile.TemporaryDirectory() as directory:
+            files = [f'{directory}/first.csv', f'{directory}/second.csv', f'{directory}/other_seed.csv']
+            for filename, seed in zip(files, [42, 42, 7]):
+                self.assertEqual(2000, synthetic.write_neo_csv(filename, neo_count=200, approaches_per_neo=10,
+                                                               days=30, seed=seed))
+            contents = []
+            for filename in files:
+                with open(filename, 'rb') as neo_data_file:
+                    contents.append(neo_data_file.read())
+        self.assertEqual(contents[0], contents[1])
+        self.assertNotEqual(contents[0], contents[2])
+
+    def test_synthetic_csv_is_loaded_as_nasa_export(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filename = f'{directory}/neo_data.csv'
+            rows = synthetic.write_neo_csv(filename, neo_count=500, approaches_per_neo=4, start_date='2021-03-01',
+                                           days=20, hazardous_ratio=0.2)
+            with open(filename) as neo_data_file:
+                header = next(csv.reader(neo_data_file))
+            db = NEODatabase(filename=filename)
+            db.load_data()
+
+        self.assertEqual(synthetic.HEADER, header)
+        self.assertEqual(500 * 4, rows)
+        self.assertEqual(rows, sum(len(neo.orbits) for neo in db.neo_object_db.values()))
+        self.assertEqual(['2021-03-01', '2021-03-20'], [db.sorted_dates[0], db.sorted_dates[-1]])
+        # A NEO approaches at most once a day
+        self.assertTrue(all(len(neos) == len(set(neos)) for neos in db.date_neo_db.values()))
+        hazardous = sum(neo.is_potentially_hazardous_asteroid is True for neo in db.neo_object_db.values())
+        self.assertAlmostEqual(0.2, hazardous / len(db.neo_object_db), delta=0.05)
+
+    def test_suite_times_every_benchmark(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filename = f'{directory}/neo_data.csv'
+            synthetic.write_neo_csv(filename, neo_count=100, approaches_per_neo=5, days=10)
+            results = suite.run_suite(filename, '2020-01-01', 10, repeat=1)
+
+        filter_combinations = 2 ** len(suite.FILTERS)
+        self.assertEqual(500, results['load']['rows'])
+        self.assertEqual(len(DateSearch.list()) * len(suite.RETURN_OBJECTS) * filter_combinations,
+                         len([name for name in results if name.startswith('search/')]))
+        self.assertEqual({f'write/{output_format}/{return_object}' for output_format in suite.WRITE_FORMATS
+                          for return_object in suite.RETURN_OBJECTS},
+                         {name for name in results if name.startswith('write/')})
+        self.assertTrue(all(result['seconds'] >= 0 for result in results.values()))
+
+    def test_compare_reports_slower_benchmarks(self):
+        baseline = {'load': {'seconds': 1.0, 'rows': 10}, 'search': {'seconds': 0.5, 'rows': 10},
+                    'tiny': {'seconds': 0.0001, 'rows': 10}}
+        results = {'load': {'seconds': 1.1, 'rows': 10}, 'search': {'seconds': 0.7, 'rows': 10},
+                   'tiny': {'seconds': 0.001, 'rows': 10}, 'new': {'seconds': 1.0, 'rows': 10}}
+        with contextlib.redirect_stdout(io.StringIO()):
+            # Only the benchmarks slower than the threshold and slower than min_seconds in the baseline
+            self.assertEqual(['search'], suite.compare(results, baseline, threshold=0.2, min_seconds=0.001))
+            self.assertEqual(['load', 'search'], suite.compare(results, baseline, threshold=0.05, min_seconds=0.001))
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -1,7 +1,17 @@
+from contextlib import contextmanager
 from enum import Enum
 import csv
+import gzip
+import io
+from itertools import chain, islice
+import json
+from operator import attrgetter
 import os
 import pathlib
+import sys
+
+import arrow_io
+from models import Aggregate, NearEarthObject
 
 PROJECT_ROOT = pathlib.Path(__file__).parent.absolute()
 
@@ -11,6 +21,10 @@ class OutputFormat(Enum):
     """
     display = 'display'
     csv_file = 'csv_file'
+    jsonl = 'jsonl'
+    csv_gz = 'csv_gz'
+    arrow = 'arrow'
+    parquet = 'parquet'
 
     @staticmethod
     def list():
@@ -20,23 +34,99 @@ class OutputFormat(Enum):
         return list(map(lambda output: output.value, OutputFormat))
 
 
+# Extension of the default output file of each file OutputFormat
+OutputExtensions = {
+    'csv_file': '.csv',
+    'jsonl': '.jsonl',
+    'csv_gz': '.csv.gz',
+    'arrow': '.arrow',
+    'parquet': '.parquet',
+}
+
+# OutputFormats written to binary streams
+BinaryFormats = ['csv_gz', 'arrow', 'parquet']
+
+
 class NEOWriter(object):
     """
     Python object use to write the results from supported output formatting options.
+
+    - display: the str of each result, on stdout by default
+    - csv_file: the NEOWriter.CsvHeaders columns of the results
+    - jsonl: JSON Lines, one NEOWriter.to_dict object per result
+    - csv_gz: the csv_file columns, gzip compressed
+    - arrow, parquet: the NEOWriter.to_dict fields written column-wise to an Arrow IPC or Parquet file, requires pyarrow
+
+    Each format also writes the Aggregate rows of NEOSearcher.get_aggregates, one row per group of dates.
     """
 
+    BatchRows = 1024  # Number of lines joined into a single write
+    BufferSize = 1 << 20  # Bytes buffered before writing to an output file
+    CompressLevel = 6  # gzip level of csv_gz, faster than the default level 9 for a slightly larger file
+
+    CsvHeaders = {
+        "NearEarthObject": ["Neo Id", "Neo Name", "Orbits", "Orbit Date"],
+        "OrbitPath": ["Neo Name", "Miss Distance (km)", "Orbit Date"],
+        "Aggregate": ["Group", "Approaches", "NEOs", "Hazardous NEOs", "Hazardous Share", "Min Miss Distance (km)"],
+    }
+
     def __init__(self):
         # TODO: How can we use the OutputFormat in the NEOWriter?
         pass
 
+    @staticmethod
+    def csv_row(row):
+        """
+        :param row: NearEarthObject, OrbitPath or Aggregate result
+        :return: list of str representing the csv columns of the result, in the order of NEOWriter.CsvHeaders
+        """
+        if isinstance(row, Aggregate):
+            return list(map(str, row))
+        if isinstance(row, NearEarthObject):
+            return [str(row.id), str(row.name), str(len(row.orbits)), ", ".join(map(attrgetter("close_approach_date"), row.orbits))]
+        return [str(row.neo_name), str(row.miss_distance_kilometers), str(row.close_approach_date)]
+
+    @staticmethod
+    def to_dict(row):
+        """
+        :param row: NearEarthObject, OrbitPath or Aggregate result
+        :return: dict of the attributes of the result that can be serialized to JSON
+        """
+        if isinstance(row, Aggregate):
+            return row._asdict()
+        if isinstance(row, NearEarthObject):
+            return {
+                "id": row.id,
+                "name": row.name,
+                "diameter_min_km": row.diameter_min_km,
+                "diameter_max_km": row.diameter_max_km,
+                "is_potentially_hazardous_asteroid": row.is_potentially_hazardous_asteroid,
+                "orbits": list(map(NEOWriter.to_dict, row.orbits)),
+            }
+        return {
+            "neo_id": row.neo_id,
+            "neo_name": row.neo_name,
+            "orbiting_body": row.orbiting_body,
+            "close_approach_date": row.close_approach_date,
+            "miss_distance_kilometers": row.miss_distance_kilometers,
+            "miss_distance_miles": row.miss_distance_miles,
+        }
+
     def write(self, format, data, **kwargs):
         """
         Generic write interface that, depending on the OutputFormat selected calls the
         appropriate instance write function
 
+        The results are streamed to the output through buffered writes, so an iterator of results is written as the
+        results are produced, without building the whole output in memory. Output files are written to a temporary
+        file moved in place once complete, so a concurrent reader never sees a partially written output.
+
         :param format: str representing the OutputFormat
-        :param data: collection of NearEarthObject or OrbitPath results
-        :param kwargs: Additional attributes used for formatting output e.g. filename
+        :param data: collection or iterator of NearEarthObject or OrbitPath results, iterators are written as the
+                     results are produced
+        :param kwargs: Additional attributes used for formatting output e.g. filename, a path or a file object to
+                       write to, instead of stdout for display and of data/neo_output.<extension> for the files. File
+                       objects are text streams, except for the BinaryFormats which write to binary streams.
         :return: bool representing if write successful or not
         """
         # TODO: Using the OutputFormat, how can we organize our 'write' logic for output to stdout vs to csvfile
@@ -45,42 +135,89 @@ class NEOWriter(object):
 
         output_options = OutputFormat.list()
         if format in output_options:
+            # Peek at the first result so that iterators can be written without building a list of the results
+            data = iter(data)
+            first_row = next(data, None)
+            data = [] if first_row is None else chain([first_row], data)
+            filename = kwargs.get("filename")
+
             # Display in the console
             if format == "display":
                 if not data:
                     print("No Data to Display :(")
                 else:
-                    for row in data:
-                        print(row)
-            # Write to the CSV file
-            elif format == "csv_file":
-                if not data:
-                    print("No Data to Write :(")
-                else:
-                    output_type = type(data[0]).__name__
-                    # Write NearEarthObject Object
-                    if output_type == "NearEarthObject":
-                        output_filename = f'{PROJECT_ROOT}/data/neo_output.csv'
-                        print("Writing data to: {}".format(output_filename))
-                        header = ["Neo Id", "Neo Name", "Orbits", "Orbit Date"]
-                        with open(output_filename, mode='w') as neo_file:
-                            neo_writer = csv.writer(neo_file, delimiter=',')
-                            neo_writer.writerow(header)
-                            for row in data:
-                                neo_writer.writerow([str(row.id), str(row.name), str(len(row.orbits)), str(", ".join(map(lambda o: o.close_approach_date, row.orbits)))])
-                        print("Written data to: {}".format(output_filename))
-                    # Write OrbitPath Object
-                    elif output_type == "OrbitPath":
-                        output_filename = f'{PROJECT_ROOT}/data/neo_output.csv'
-                        print("Writing data to: {}".format(output_filename))
-                        header = ["Neo Name", "Miss Distance (km)", "Orbit Date"]
-                        with open(output_filename, mode='w') as orbit_file:
-                            orbit_writer = csv.writer(orbit_file, delimiter=',')
-                            orbit_writer.writerow(header)
-                            for row in data:
-                                orbit_writer.writerow([str(row.neo_name), str(row.miss_distance_kilometers), str(row.close_approach_date)])
-                        print("Written data to: {}".format(output_filename))
+                    with self.open_output(filename or sys.stdout, format) as output:
+                        NEOWriter.write_lines(output, map("{}\n".format, data))
+            # Write to a file
+            elif not data:
+                print("No Data to Write :(")
+            else:
+                output_filename = filename or f'{PROJECT_ROOT}/data/neo_output{OutputExtensions[format]}'
+                if format in ("arrow", "parquet"):
+                    arrow_io.require_pyarrow()
+                if not hasattr(output_filename, "write"):
+                    print("Writing data to: {}".format(output_filename))
+                with self.open_output(output_filename, format) as output:
+                    if format in ("arrow", "parquet"):
+                        arrow_io.write_results(output, format, data, first_row, NEOWriter.to_dict)
+                    elif format == "jsonl":
+                        encoder = json.JSONEncoder(separators=(",", ":"))
+                        NEOWriter.write_lines(output, map(lambda row: encoder.encode(NEOWriter.to_dict(row)) + "\n", data))
+                    else:
+                        # Write NearEarthObject or OrbitPath Object
+                        neo_writer = csv.writer(output, delimiter=',')
+                        neo_writer.writerow(NEOWriter.CsvHeaders[type(first_row).__name__])
+                        neo_writer.writerows(map(NEOWriter.csv_row, data))
+                if not hasattr(output_filename, "write"):
+                    print("Written data to: {}".format(output_filename))
 
             return True
         else:
-            raise Exception("format: `{}` not supported. Available format: `{}`".format(str(format), str(", ".join(output_options))))
\ No newline at end of file
+            raise Exception("format: `{}` not supported. Available format: `{}`".format(str(format), str(", ".join(output_options))))
+
+    @staticmethod
+    def write_lines(output, lines):
+        """
+        Writes lines in batches of NEOWriter.BatchRows lines, so that a line buffered stream such as a terminal is
+        written once per batch instead of once per line.
+
+        :param output: text stream to write to
+        :param lines: iterable of str lines, with their line endings
+        :return: None
+        """
+        lines = iter(lines)
+        batch = "".join(islice(lines, NEOWriter.BatchRows))
+        while batch:
+            output.write(batch)
+            batch = "".join(islice(lines, NEOWriter.BatchRows))
+
+    @contextmanager
+    def open_output(self, filename, format):
+        """
+        :param filename: str or path-like pathway of the output file, or file object to write to
+        :param format: str representing the OutputFormat
+        :return: context manager of the buffered text stream to write the output to, binary for arrow and parquet
+        """
+        if hasattr(filename, "write"):
+            if format != "csv_gz":
+                yield filename
+                return
+            with gzip.GzipFile(fileobj=filename, mode="wb", compresslevel=NEOWriter.CompressLevel) as gzip_file:
+                with io.TextIOWrapper(gzip_file, newline="") as output:
+                    yield output
+            return
+
+        temporary_filename = f'{filename}.{os.getpid()}.tmp'
+        try:
+            if format == "csv_gz":
+                output = gzip.open(temporary_filename, "wt", newline="", compresslevel=NEOWriter.CompressLevel)
+            elif format in BinaryFormats:
+                output = open(temporary_filename, "wb", buffering=NEOWriter.BufferSize)
+            else:
+                output = open(temporary_filename, "w", newline="", buffering=NEOWriter.BufferSize)
+            with output:
+                yield output
+            os.replace(temporary_filename, filename)
+        finally:
+            if os.path.exists(temporary_filename):
+                os.remove(temporary_filename)